@@ -0,0 +1,922 @@
+import os
+import sys
+import json
+import argparse
+import subprocess
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+from ply import read_ply, write_ply
+from utils import extract_points, stream_points, rss_bytes
+from preprocessing import chunk_point_cloud_fixed_size, chunk_point_cloud_sparse, match_blocks, octree_partition
+from config import IMPORT_TIME_BUDGET, IMPORT_RSS_BUDGET, BENCH_BASELINE, BENCH_TOLERANCE, CUBE_SIZE
+
+
+def make_synthetic_cloud(num_points=1_000_000, cube_size=CUBE_SIZE, seed=0):
+    """生成位于若干椭球面上的体素化合成点云（整数坐标，float64）"""
+    rng = np.random.default_rng(seed)
+    centers = rng.uniform(0.3 * cube_size, 0.7 * cube_size, size=(8, 3))
+    radii = rng.uniform(0.05 * cube_size, 0.25 * cube_size, size=(8, 3))
+    which = rng.integers(0, len(centers), size=num_points)
+    directions = rng.normal(size=(num_points, 3))
+    directions /= np.linalg.norm(directions, axis=1, keepdims=True)
+    points = centers[which] + directions * radii[which]
+    return np.clip(np.round(points), 0, cube_size - 1)
+
+
+def _chunk_point_cloud_mask_scan(points, block_size=100, cube_size=CUBE_SIZE, overlap=1):
+    """旧版逐块掩码扫描实现（CPU），作为基准与正确性参照"""
+    import torch
+    coords = torch.tensor(points, dtype=torch.float32)
+    stride = block_size - overlap
+    blocks = []
+    for x in torch.arange(0, cube_size, stride):
+        for y in torch.arange(0, cube_size, stride):
+            for z in torch.arange(0, cube_size, stride):
+                mask = (
+                    (coords[:, 0] >= x) & (coords[:, 0] < x + block_size) &
+                    (coords[:, 1] >= y) & (coords[:, 1] < y + block_size) &
+                    (coords[:, 2] >= z) & (coords[:, 2] < z + block_size)
+                )
+                blocks.append((coords[mask].numpy(), (x.item(), y.item(), z.item())))
+    return blocks
+
+
+def bench_chunk(num_points=1_000_000, block_size=160, cube_size=CUBE_SIZE, overlap=1):
+    """对比向量化切块与旧版掩码扫描切块"""
+    points = make_synthetic_cloud(num_points, cube_size)
+
+    start = time.perf_counter()
+    legacy = _chunk_point_cloud_mask_scan(points, block_size, cube_size, overlap)
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    blocks = chunk_point_cloud_fixed_size(points, block_size, cube_size, overlap)
+    new_time = time.perf_counter() - start
+
+    assert len(blocks) == len(legacy)
+    for (coords, origin), (ref_coords, ref_origin) in zip(blocks, legacy):
+        assert origin == ref_origin and np.array_equal(coords, ref_coords)
+
+    print(f"点数 {num_points}, 块数 {len(blocks)}")
+    print(f"掩码扫描: {legacy_time:.3f}s, 向量化: {new_time:.3f}s, 加速 {legacy_time / new_time:.1f}x")
+
+
+def check_ply_round_trip(points):
+    """PLY 读写往返校验：二进制/ASCII、有无颜色、各坐标类型"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "round_trip.ply")
+        for dtype in (np.float64, np.float32, np.int32, np.uint16):
+            expected = points.astype(dtype)
+            for binary in (True, False):
+                for with_colors in (False, True):
+                    write_ply(expected, path, binary=binary, with_colors=with_colors)
+                    loaded = read_ply(path)
+                    assert loaded.shape == expected.shape
+                    assert np.array_equal(loaded, expected), (dtype, binary, with_colors)
+                    if binary:
+                        assert loaded.dtype == expected.dtype
+
+
+def bench_ply(num_files=200, points_per_file=5000):
+    """对比 ply 模块与 open3d 的块文件读写吞吐"""
+    points = make_synthetic_cloud(points_per_file)
+    check_ply_round_trip(points)
+    print("PLY 往返校验通过")
+
+    writers = {
+        "ply 二进制": lambda p, path: write_ply(p.astype(np.float32), path),
+        "ply ASCII": lambda p, path: write_ply(p, path, binary=False, with_colors=True),
+    }
+    readers = {
+        "ply 二进制": lambda path: np.asarray(read_ply(path)).sum(),
+        "ply ASCII": lambda path: read_ply(path).sum(),
+    }
+    try:
+        import open3d as o3d
+
+        def o3d_write(p, path):
+            pcd = o3d.geometry.PointCloud()
+            pcd.points = o3d.utility.Vector3dVector(p)
+            pcd.colors = o3d.utility.Vector3dVector(np.zeros((len(p), 3)))
+            o3d.io.write_point_cloud(path, pcd, write_ascii=True)
+
+        writers["open3d ASCII"] = o3d_write
+        readers["open3d ASCII"] = lambda path: np.asarray(o3d.io.read_point_cloud(path).points).sum()
+    except ImportError:
+        print("未安装 open3d，跳过 open3d 对比")
+
+    total_points = num_files * points_per_file
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name, writer in writers.items():
+            paths = [os.path.join(tmp_dir, f"{name.replace(' ', '_')}_{i}.ply") for i in range(num_files)]
+            start = time.perf_counter()
+            for path in paths:
+                writer(points, path)
+            write_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for path in paths:
+                readers[name](path)
+            read_time = time.perf_counter() - start
+            size = sum(os.path.getsize(path) for path in paths)
+            print(f"{name}: 写 {total_points / write_time / 1e6:.2f} M点/s, "
+                  f"读 {total_points / read_time / 1e6:.2f} M点/s, 磁盘 {size / 1e6:.1f} MB")
+
+
+def write_pc_error_sample(path, num_pairs=500_000, seed=0):
+    """按 pc_error --singlePass=1 的输出格式生成一份点对样本"""
+    rng = np.random.default_rng(seed)
+    points_a = rng.integers(0, 1024, size=(num_pairs, 3))
+    points_b = points_a + rng.integers(-2, 3, size=(num_pairs, 3))
+    nn = rng.integers(0, num_pairs, size=num_pairs)
+    with open(path, 'w') as f:
+        f.write("infile1: A.ply\ninfile2: B.ply\n")
+        for i in range(num_pairs):
+            a, b = points_a[i], points_b[i]
+            f.write(f"Point A[{i}] ({a[0]}, {a[1]}, {a[2]}) -> B[{nn[i]}] ({b[0]}, {b[1]}, {b[2]})\n")
+        f.write("   mse1      (p2point): 1.0\n")
+
+
+def _measure(func):
+    """分两次运行：计时不受 tracemalloc 开销影响，峰值内存单独统计"""
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def bench_pc_error_output(sample=None, num_pairs=500_000):
+    """对比整段读取 + extract_points 与流式批量解析 stream_points"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if sample is None:
+            sample = os.path.join(tmp_dir, "pc_error_output.txt")
+            write_pc_error_sample(sample, num_pairs)
+        command = ["cat", sample]
+
+        def legacy():
+            output = subprocess.run(command, stdout=subprocess.PIPE, text=True, check=True).stdout
+            return extract_points(output)
+
+        pairs, legacy_time, legacy_peak = _measure(legacy)
+        (indices, points_a, points_b), stream_time, stream_peak = _measure(lambda: stream_points(command))
+
+    assert len(pairs) == len(indices)
+    assert np.array_equal(points_b, np.array([pairs[i][1] for i in indices]))
+    print(f"点对数 {len(indices)}")
+    print(f"extract_points: {legacy_time:.3f}s, 峰值内存 {legacy_peak / 1e6:.1f} MB")
+    print(f"stream_points:  {stream_time:.3f}s, 峰值内存 {stream_peak / 1e6:.1f} MB")
+
+
+def _load_blocks(block_dir=None, num_frames=4, num_points=1_000_000, block_size=160, cube_size=CUBE_SIZE):
+    """块坐标：给定块目录时读取目录中的块，否则对若干帧合成点云切块"""
+    if block_dir is not None:
+        from catalog import get_catalog
+        catalog = get_catalog(block_dir, refresh=True)
+        return [np.asarray(read_ply(catalog.path(name)), dtype=np.float32) for name in catalog.blocks()]
+    blocks = []
+    for seed in range(num_frames):
+        points = make_synthetic_cloud(num_points, cube_size, seed=seed)
+        blocks += [coords for _, coords, _ in chunk_point_cloud_sparse(points, block_size, cube_size)]
+    return blocks
+
+
+def _make_workload(use_network, wrap=None):
+    """训练一步的负载：use_network 时为 SimpleAustinNet（需要 MinkowskiEngine），否则为逐点 MLP 替身
+
+    wrap 给定时用它包装模型（如 distributed.wrap_model）。
+    """
+    import torch
+    torch.manual_seed(0)
+    if use_network:
+        import MinkowskiEngine as ME
+        from network import SimpleAustinNet
+        model = SimpleAustinNet()
+    else:
+        layers = [torch.nn.Linear(3, 32), torch.nn.ReLU()]
+        for _ in range(8):
+            layers += [torch.nn.Linear(32, 32), torch.nn.ReLU()]
+        model = torch.nn.Sequential(*layers, torch.nn.Linear(32, 3))
+    if wrap is not None:
+        model = wrap(model)
+
+    def forward(batch_blocks):
+        feats = torch.from_numpy(np.concatenate(batch_blocks))
+        if not use_network:
+            return model(feats), feats
+        coords = ME.utils.batched_coordinates([np.floor(b) for b in batch_blocks])
+        field = ME.TensorField(features=feats, coordinates=coords)
+        return model(field.sparse()).slice(field).F, feats
+    return forward, torch.optim.Adam(model.parameters())
+
+
+def _run_batches(batches, blocks, forward, optimizer):
+    """跑一个 epoch 的前向+反向，返回耗时与每批反向所需保存的激活字节数"""
+    import torch
+    saved = []
+
+    def pack(tensor):
+        saved[-1] += tensor.numel() * tensor.element_size()
+        return tensor
+
+    start = time.perf_counter()
+    for batch in batches:
+        saved.append(0)
+        with torch.autograd.graph.saved_tensors_hooks(pack, lambda tensor: tensor):
+            pred, target = forward([blocks[i] for i in batch])
+            loss = torch.nn.functional.mse_loss(pred, target)
+        optimizer.zero_grad()
+        loss.backward()
+        optimizer.step()
+    return time.perf_counter() - start, np.array(saved)
+
+
+def bench_batching(block_dir=None, num_frames=4, batch_size=None, max_points=200_000, epochs=2,
+                   use_network=False):
+    """对比固定 batch_size 与按点数预算组批的每批点数、吞吐与激活内存
+
+    固定批大小有两种取法：batch_size 缺省时取保证不超过同一点数预算的最大值（最大的 batch_size 个块之和
+    不超过 max_points，即为避免内存溢出实际只能选用的值）；另一种取与点数预算相同的每 epoch 批数。
+    点数预算的作用是限制单批点数（即峰值激活内存）的同时让批次装满：与前者相比每 epoch 的步数少得多，
+    与后者相比步数相同但每批点数不超过预算。吞吐取决于每批的固定开销，缺省的逐点 MLP 替身上三者基本持平，
+    对 SimpleAustinNet 需用 use_network 在装有 MinkowskiEngine 的环境中实测。
+    """
+    from dataset import BlockBudgetSampler
+    blocks = _load_blocks(block_dir, num_frames)
+    point_counts = np.array([len(b) for b in blocks])
+    nonempty_idx = np.flatnonzero(point_counts > 0)
+    nonempty = point_counts[nonempty_idx]
+    if batch_size is None:
+        batch_size = max(int(np.searchsorted(np.cumsum(np.sort(nonempty)[::-1]), max_points, side='right')), 1)
+    print(f"块数 {len(point_counts)}（非空 {len(nonempty)}），每块点数 中位数 {int(np.median(nonempty))}, "
+          f"最大 {nonempty.max()}")
+
+    def fixed_batches(size):
+        def make(epoch):
+            order = np.random.default_rng([0, epoch]).permutation(nonempty_idx)
+            return [order[i:i + size].tolist() for i in range(0, len(order), size)]
+        return make
+
+    budget_sampler = BlockBudgetSampler(point_counts, max_points)
+
+    def budget_batches(epoch):
+        budget_sampler.set_epoch(epoch)
+        return budget_sampler.batches()
+
+    matched_size = -(-len(nonempty) // len(budget_batches(0)))
+    print(f"负载: {'SimpleAustinNet' if use_network else '逐点 MLP 替身（每批开销可忽略，吞吐对比不代表稀疏卷积网络）'}")
+    print(f"{'组批方式':<28}{'批/epoch':>9}{'每批点数 中位数':>14}{'最大':>9}{'M点/s':>8}{'激活峰值 MB':>12}  超出预算")
+    for name, make_batches in ((f"固定 batch_size={batch_size}（不超预算）", fixed_batches(batch_size)),
+                               (f"固定 batch_size={matched_size}（同批数）", fixed_batches(matched_size)),
+                               (f"点数预算 max_points={max_points}", budget_batches)):
+        forward, optimizer = _make_workload(use_network)
+        elapsed, saved, sizes = 0.0, [], []
+        for epoch in range(epochs):
+            batches = make_batches(epoch)
+            t, s = _run_batches(batches, blocks, forward, optimizer)
+            elapsed += t
+            saved.append(s)
+            sizes += [int(point_counts[batch].sum()) for batch in batches]
+        over = sum(size > max_points for size in sizes)
+        print(f"{name:<28}{len(sizes) / epochs:>9.0f}{int(np.median(sizes)):>14}{max(sizes):>9}"
+              f"{sum(sizes) / elapsed / 1e6:>8.2f}{np.concatenate(saved).max() / 1e6:>12.1f}  "
+              f"{f'{over} 批' if over else '-'}")
+
+
+def _ddp_worker(rank, world_size, blocks, max_points, epochs, use_network, result_path):
+    """数据并行基准的单个进程：按 rank 分片批次，梯度经 DDP all-reduce"""
+    from dataset import BlockBudgetSampler
+    from distributed import wrap_model, all_reduce
+    forward, optimizer = _make_workload(use_network, wrap_model)
+    sampler = BlockBudgetSampler([len(b) for b in blocks], max_points, rank=rank, world_size=world_size)
+    samples, points, elapsed = 0, 0, 0.0
+    for epoch in range(epochs + 1):
+        sampler.set_epoch(epoch)
+        batches = sampler.batches()
+        t, _ = _run_batches(batches, blocks, forward, optimizer)
+        if epoch == 0:
+            # 第一个 epoch 作为预热，不计入
+            continue
+        elapsed += t
+        samples += sum(len(batch) for batch in batches)
+        points += sum(len(blocks[i]) for batch in batches for i in batch)
+    samples, points = all_reduce([samples, points])
+    elapsed, = all_reduce([elapsed], op='max')
+    if rank == 0:
+        with open(result_path, 'w') as f:
+            json.dump({'ranks': world_size, 'samples_per_s': samples / elapsed, 'points_per_s': points / elapsed}, f)
+
+
+def bench_ddp(rank_counts=(1, 2, 4), block_dir=None, num_frames=2, max_points=200_000, epochs=2,
+              use_network=False, threads=None):
+    """数据并行训练的扩展效率：不同进程数下的总吞吐（样本/s）与 吞吐 / (进程数 × 单进程吞吐)
+
+    threads 为每个进程的计算线程数，缺省平分本机核数；固定为 1 时衡量的是纯粹的进程级扩展。
+    """
+    from distributed import launch
+    blocks = _load_blocks(block_dir, num_frames)
+    print(f"块数 {len(blocks)}, 本机核数 {os.cpu_count()}")
+    print(f"{'进程数':>6}{'样本/s':>10}{'M点/s':>10}{'加速比':>8}{'扩展效率':>10}")
+    base = None
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for ranks in rank_counts:
+            result_path = os.path.join(tmp_dir, f"ranks{ranks}.json")
+            launch(_ddp_worker, ranks, blocks, max_points, epochs, use_network, result_path, threads=threads)
+            with open(result_path) as f:
+                result = json.load(f)
+            base = base or result['samples_per_s']
+            speedup = result['samples_per_s'] / base
+            print(f"{ranks:>6}{result['samples_per_s']:>10.1f}{result['points_per_s'] / 1e6:>10.2f}"
+                  f"{speedup:>8.2f}{speedup / ranks:>10.0%}")
+
+
+def bench_coords(num_points=1_000_000, block_size=160, cube_size=CUBE_SIZE, pair_blocks_limit=64):
+    """逐阶段对比浮点坐标（float64 读入、float32 切块与块文件）与紧凑整数坐标（COORD_DTYPE）的耗时、峰值内存与数据大小"""
+    from utils import load_ply
+    from pairing import pair_blocks
+    points = make_synthetic_cloud(num_points, cube_size)
+    shifted = np.clip(points + np.random.default_rng(1).integers(-1, 2, points.shape), 0, cube_size - 1)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        frame_a, frame_b = os.path.join(tmp_dir, "a.ply"), os.path.join(tmp_dir, "b.ply")
+        # 原始帧为 ASCII（与 8i 数据集一致）
+        write_ply(points, frame_a, binary=False)
+        write_ply(shifted, frame_b, binary=False)
+
+        print(f"{'阶段':<10}{'表示':<10}{'耗时 s':>9}{'峰值 MB':>10}{'数据 MB':>10}")
+        for name, compact in (("float", False), ("compact", True)):
+            def report(stage, elapsed, peak, nbytes):
+                print(f"{stage:<10}{name:<10}{elapsed:>9.3f}{peak / 1e6:>10.1f}{nbytes / 1e6:>10.1f}")
+
+            (a, b), elapsed, peak = _measure(lambda: (load_ply(frame_a, compact), load_ply(frame_b, compact)))
+            report("读取", elapsed, peak, a.nbytes + b.nbytes)
+
+            (chunks_a, chunks_b), elapsed, peak = _measure(
+                lambda: (chunk_point_cloud_sparse(a, block_size, cube_size),
+                         chunk_point_cloud_sparse(b, block_size, cube_size)))
+            report("网格切块", elapsed, peak, sum(c.nbytes for _, c, _ in chunks_a + chunks_b))
+
+            leaves, elapsed, peak = _measure(lambda: octree_partition(a, b, cube_size=cube_size))
+            report("八叉树", elapsed, peak, sum(la.nbytes + lb.nbytes for la, lb, _, _ in leaves))
+
+            matched = [(ca, cb) for _, ca, cb, _ in match_blocks(chunks_a, chunks_b)][:pair_blocks_limit]
+            pairs, elapsed, peak = _measure(lambda: pair_blocks([ca for ca, _ in matched], [cb for _, cb in matched]))
+            report("配对", elapsed, peak, sum(paired.nbytes for _, _, paired in pairs))
+
+            block_dir = os.path.join(tmp_dir, name)
+            os.makedirs(block_dir)
+
+            def save_blocks():
+                for i, ca, _ in chunks_a:
+                    write_ply(ca, os.path.join(block_dir, f"block_{i}.ply"))
+
+            _, elapsed, peak = _measure(save_blocks)
+            report("写块", elapsed, peak, sum(os.path.getsize(os.path.join(block_dir, f))
+                                              for f in os.listdir(block_dir)))
+            del a, b, chunks_a, chunks_b, leaves, pairs
+
+
+def _best_of(func, repeats):
+    """多次运行取最短耗时（受干扰最小，适合做回退判断），返回 (结果, 最短耗时, 中位耗时)"""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return result, min(times), float(np.median(times))
+
+
+def run_suite(num_points=800_000, resolution=1024, frames=2, block_size=160, repeats=3):
+    """在合成序列上逐阶段计时预处理流程
+
+    Returns:
+        {'config': 参数, 'environment': 运行环境, 'stages': {阶段: {'seconds', 'median', 'points', 'points_per_s'}}}
+    """
+    import platform
+    from utils import load_ply, save_ply, get_matching_paths
+    from catalog import get_catalog
+    from pairing import pair_blocks
+    from voxelize import voxelize
+    from synthetic import sequence_clouds, write_clouds
+
+    config = {'num_points': num_points, 'resolution': resolution, 'frames': frames, 'block_size': block_size}
+    stages = {}
+
+    def record(name, points, seconds, median):
+        stages[name] = {'seconds': seconds, 'median': median, 'points': int(points),
+                        'points_per_s': points / max(seconds, 1e-9)}
+        print(f"{name:<20}{seconds:>10.3f}{median:>10.3f}{points / max(seconds, 1e-9) / 1e6:>10.2f}")
+
+    print(f"{'阶段':<20}{'最短 s':>10}{'中位 s':>10}{'M点/s':>10}")
+    with tempfile.TemporaryDirectory() as root:
+        # 计时的正是随后写出的序列，与其他阶段一样取 repeats 次中的最短耗时
+        clouds, elapsed, median = _best_of(lambda: sequence_clouds(frames, num_points, resolution), repeats)
+        total = sum(len(a) + len(b) for _, a, b in clouds)
+        record("generate", total, elapsed, median)
+        write_clouds(root, clouds)
+        origin_paths = sorted(os.path.join(root, 'origin', f) for f in os.listdir(os.path.join(root, 'origin')))
+        compress_paths = sorted(os.path.join(root, 'compress', f) for f in os.listdir(os.path.join(root, 'compress')))
+
+        loaded, elapsed, median = _best_of(
+            lambda: [load_ply(p, compact=True) for p in origin_paths + compress_paths], repeats)
+        record("load_ply_ascii", total, elapsed, median)
+
+        binary_dir = os.path.join(root, 'binary')
+        os.makedirs(binary_dir)
+        _, elapsed, median = _best_of(lambda: [save_ply(points, os.path.join(binary_dir, f"{i}.ply"))
+                                               for i, points in enumerate(loaded)], repeats)
+        record("save_ply", total, elapsed, median)
+        _, elapsed, median = _best_of(
+            lambda: [np.array(load_ply(os.path.join(binary_dir, f"{i}.ply"), compact=True)) for i in range(len(loaded))],
+            repeats)
+        record("load_ply_binary", total, elapsed, median)
+
+        chunked, elapsed, median = _best_of(
+            lambda: [chunk_point_cloud_sparse(points, block_size, resolution) for points in loaded], repeats)
+        record("chunk_fixed_size", total, elapsed, median)
+        _, elapsed, median = _best_of(
+            lambda: [octree_partition(a, b, cube_size=resolution) for a, b in zip(loaded[:frames], loaded[frames:])],
+            repeats)
+        record("octree_partition", total, elapsed, median)
+
+        # 按训练数据的布局写出匹配的块，供目录查找与配对阶段使用
+        block_dirs = {kind: os.path.join(root, kind, 'blocks') for kind in ('origin', 'compress')}
+        for block_dir in block_dirs.values():
+            os.makedirs(block_dir)
+        matched, names = [], []
+        for frame in range(frames):
+            for i, a, b, _ in match_blocks(chunked[frame], chunked[frames + frame]):
+                matched.append((a, b))
+                names.append(f"synthetic_rec_{frame:04d}_block_{i}.ply")
+                save_ply(a, os.path.join(block_dirs['origin'], f"synthetic_vox10_{frame:04d}_block_{i}.ply"))
+                save_ply(b, os.path.join(block_dirs['compress'], names[-1]))
+        get_catalog(block_dirs['origin'], refresh=True)
+        _, elapsed, median = _best_of(
+            lambda: [get_matching_paths(name, block_dirs['origin'], block_dirs['compress']) for name in names],
+            repeats)
+        # 该阶段以块数计
+        record("get_matching_paths", len(names), elapsed, median)
+
+        block_points = sum(len(a) for a, _ in matched)
+        _, elapsed, median = _best_of(lambda: pair_blocks([b for _, b in matched], [a for a, _ in matched]),
+                                      repeats)
+        record("pair_blocks", block_points, elapsed, median)
+        _, elapsed, median = _best_of(lambda: [voxelize(b) for _, b in matched], repeats)
+        record("voxelize", block_points, elapsed, median)
+
+    environment = {'python': platform.python_version(), 'numpy': np.__version__, 'machine': platform.machine(),
+                   'cpu_count': os.cpu_count()}
+    return {'config': config, 'environment': environment, 'stages': stages}
+
+
+def compare_to_baseline(results, baseline, tolerance=BENCH_TOLERANCE, min_delta=0.01):
+    """逐阶段对比最短耗时与基线，返回回退的阶段名列表
+
+    耗时超过基线的 1 + tolerance 倍且多出 min_delta 秒以上才算回退，避免毫秒级阶段的计时抖动误报。
+    """
+    if baseline['config'] != results['config']:
+        raise ValueError(f"基线参数 {baseline['config']} 与本次 {results['config']} 不一致，无法比较")
+    regressions = []
+    print(f"{'阶段':<20}{'基线 s':>10}{'本次 s':>10}{'比值':>8}")
+    for name, stage in results['stages'].items():
+        if name not in baseline['stages']:
+            print(f"{name:<20}{'-':>10}{stage['seconds']:>10.3f}{'-':>8}  新阶段")
+            continue
+        base = baseline['stages'][name]['seconds']
+        ratio = stage['seconds'] / max(base, 1e-9)
+        regressed = ratio > 1 + tolerance and stage['seconds'] - base > min_delta
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<20}{base:>10.3f}{stage['seconds']:>10.3f}{ratio:>8.2f}{'  回退' if regressed else ''}")
+    return regressions
+
+
+def bench_suite(num_points=800_000, resolution=1024, frames=2, repeats=3, output=None, baseline=BENCH_BASELINE,
+                tolerance=BENCH_TOLERANCE, update_baseline=False):
+    """运行预处理基准套件，保存 JSON 结果并与基线比较
+
+    Returns:
+        回退的阶段名列表（没有基线或刚更新基线时为空）
+    """
+    results = run_suite(num_points, resolution, frames, repeats=repeats)
+    if output:
+        with open(output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"已保存 {output}")
+    if update_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(baseline)), exist_ok=True)
+        with open(baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"已更新基线 {baseline}")
+        return []
+    if not os.path.exists(baseline):
+        print(f"没有基线 {baseline}，用 --update-baseline 生成")
+        return []
+    with open(baseline) as f:
+        return compare_to_baseline(results, json.load(f), tolerance)
+
+
+def bench_partition(num_points=1_000_000, block_size=160, cube_size=CUBE_SIZE, max_points=20000, min_size=16):
+    """对比固定网格切块与自适应八叉树切块的块数与每块点数分布"""
+    points_a = make_synthetic_cloud(num_points, cube_size)
+    points_b = np.clip(points_a + np.random.default_rng(1).integers(-1, 2, points_a.shape), 0, cube_size - 1)
+
+    start = time.perf_counter()
+    grid_a = chunk_point_cloud_fixed_size(points_a, block_size, cube_size)
+    grid_b = chunk_point_cloud_fixed_size(points_b, block_size, cube_size)
+    grid_time = time.perf_counter() - start
+    grid = [len(a) for (a, _), (b, _) in zip(grid_a, grid_b) if len(a) and len(b)]
+
+    start = time.perf_counter()
+    leaves = octree_partition(points_a, points_b, max_points, min_size, cube_size)
+    octree_time = time.perf_counter() - start
+    octree = [len(a) for a, b, _, _ in leaves if len(a) and len(b)]
+    assert sum(len(a) for a, _, _, _ in leaves) == len(points_a)
+
+    for name, counts, total, elapsed in (("固定网格", grid, len(grid_a), grid_time),
+                                         ("八叉树", octree, len(leaves), octree_time)):
+        counts = np.array(counts)
+        print(f"{name}: 块数 {total}（匹配非空 {len(counts)}），每块点数 最大 {counts.max()} / "
+              f"中位数 {int(np.median(counts))} / 标准差 {counts.std():.0f}, 耗时 {elapsed:.2f}s")
+
+
+# 预处理 worker 与命令行工具依赖的轻量核心模块，导入时不应加载下列重量级依赖
+CORE_MODULES = ['ply', 'utils', 'pairing', 'catalog', 'cache', 'block_store', 'temporal', 'metrics',
+                'preprocessing', 'evaluate', 'inference']
+HEAVY_MODULES = ['torch', 'open3d', 'scipy', 'MinkowskiEngine']
+
+_IMPORT_PROBE = """
+import sys, json, time
+def rss():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) * 1024
+before = rss()
+start = time.perf_counter()
+for name in sys.argv[1:]:
+    __import__(name)
+print(json.dumps({'time': time.perf_counter() - start, 'rss': rss() - before,
+                  'heavy': [m for m in %r if m in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+
+def _probe_import(modules, repeats=3):
+    """在全新的解释器中导入模块，返回多次测量中耗时最短的一次"""
+    results = []
+    for _ in range(repeats):
+        output = subprocess.run([sys.executable, "-c", _IMPORT_PROBE, *modules], stdout=subprocess.PIPE,
+                                text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+        results.append(json.loads(output))
+    return min(results, key=lambda r: r['time'])
+
+
+def bench_imports(modules=None, time_budget=IMPORT_TIME_BUDGET, rss_budget=IMPORT_RSS_BUDGET, repeats=3):
+    """逐个测量核心模块的冷启动导入时间与常驻内存增量，检查是否超出预算或加载了重量级依赖
+
+    Returns:
+        全部模块满足预算时为 True
+    """
+    modules = modules or CORE_MODULES
+    print(f"{'模块':<16}{'导入 ms':>10}{'RSS MB':>10}  重量级依赖")
+    ok = True
+    for module in modules:
+        result = _probe_import([module], repeats)
+        failed = result['time'] > time_budget or result['rss'] > rss_budget or result['heavy']
+        ok = ok and not failed
+        print(f"{module:<16}{result['time'] * 1000:>10.0f}{result['rss'] / 1e6:>10.1f}  "
+              f"{', '.join(result['heavy']) or '-'}{'  超出预算' if failed else ''}")
+    total = _probe_import(modules, repeats)
+    print(f"全部导入: {total['time'] * 1000:.0f} ms, {total['rss'] / 1e6:.1f} MB"
+          f"（预算 {time_budget * 1000:.0f} ms / {rss_budget / 1e6:.0f} MB）")
+    return ok
+
+
+def run_model(variant, points_per_block, num_blocks=4, repeats=5):
+    """在当前进程中测量一个网络变体（需要 MinkowskiEngine），返回指标字典
+
+    峰值内存为前向期间 ru_maxrss 相对前向前常驻内存的增量，因此每个测量应在独立进程中运行。
+    FLOPs 代理为每点乘加数上界：所有卷积核参数之和（假设每个抽头都有邻点）。
+    """
+    import resource
+    import torch
+    import MinkowskiEngine as ME
+    from train import MODELS
+    from export import random_blocks, _run
+
+    torch.manual_seed(0)
+    model = MODELS[variant]().eval()
+    blocks = random_blocks(num_blocks, points_per_block)
+    num_points = sum(len(b) for b in blocks)
+    params = sum(p.numel() for p in model.parameters())
+    macs = sum(m.kernel.numel() for m in model.modules()
+               if isinstance(m, (ME.MinkowskiConvolution, ME.MinkowskiConvolutionTranspose)))
+
+    baseline = rss_bytes()
+    _run(model, blocks)
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        _run(model, blocks)
+        times.append(time.perf_counter() - start)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024 - baseline
+    latency = float(np.median(times))
+    return {
+        'variant': variant,
+        'points': num_points,
+        'params': params,
+        'macs_per_point': macs,
+        'latency': latency,
+        'points_per_s': num_points / latency,
+        'peak_memory': max(peak, 0),
+    }
+
+
+def bench_models(variants=None, densities=(2000, 10000, 40000), repeats=5, output=None):
+    """对各网络变体在不同点密度的合成块上测量参数量、FLOPs 代理、CPU 延迟、峰值内存与吞吐"""
+    if variants is None:
+        from network import VARIANTS
+        variants = ['SimpleAustinNet', 'AustinNet', *VARIANTS]
+    results = []
+    print(f"{'变体':<24}{'每块点数':>8}{'总点数':>8}{'参数量':>10}{'乘加/点':>10}{'延迟 ms':>10}"
+          f"{'峰值 MB':>10}{'点/s':>10}")
+    for variant in variants:
+        for density in densities:
+            command = [sys.executable, os.path.abspath(__file__), "model_run", "--variant", variant,
+                       "--points-per-block", str(density), "--repeats", str(repeats)]
+            completed = subprocess.run(command, stdout=subprocess.PIPE, text=True)
+            if completed.returncode != 0:
+                print(f"{variant:<24}{density:>8}  运行失败")
+                continue
+            result = json.loads(completed.stdout.strip().splitlines()[-1])
+            result['points_per_block'] = density
+            results.append(result)
+            print(f"{variant:<24}{density:>8}{result['points']:>8}{result['params']:>10}"
+                  f"{result['macs_per_point']:>10}{result['latency'] * 1000:>10.1f}"
+                  f"{result['peak_memory'] / 1e6:>10.1f}{result['points_per_s']:>10.0f}")
+    if output:
+        with open(output, 'w') as f:
+            json.dump(results, f, indent=2)
+    return results
+
+
+def run_checkpointing(model_name, stages, points_per_block, num_blocks=4, repeats=3):
+    """在当前进程中测量一次训练步（前向+反向）的耗时与峰值内存增量（需要 MinkowskiEngine）"""
+    import resource
+    import torch
+    import torch.nn.functional as F
+    from train import MODELS, forward_batch
+    from export import random_blocks
+    from network import set_checkpointing, checkpoint_stage_names
+    import MinkowskiEngine as ME
+
+    torch.manual_seed(0)
+    model = MODELS[model_name]().train()
+    set_checkpointing(model, stages)
+    blocks = random_blocks(num_blocks, points_per_block)
+    batch = {'coords': ME.utils.batched_coordinates([np.floor(b) for b in blocks]),
+             'feats': torch.from_numpy(np.concatenate(blocks))}
+
+    def step():
+        model.zero_grad()
+        F.mse_loss(forward_batch(model, batch, 'cpu'), batch['feats']).backward()
+
+    baseline = rss_bytes()
+    step()
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        step()
+        times.append(time.perf_counter() - start)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024 - baseline
+    return {'stages': list(stages), 'names': checkpoint_stage_names(model), 'time': float(np.median(times)), 'peak_memory': max(peak, 0)}
+
+
+def bench_checkpointing(model_name='SimpleAustinNet', points_per_block=20000, repeats=3):
+    """逐个阶段启用激活检查点，对比不启用时节省的内存与增加的时间（每个配置在独立进程中运行）"""
+    # 可选的阶段名由不启用检查点的那次子进程一并给出
+    command = [sys.executable, os.path.abspath(__file__), "checkpoint_run", "--model", model_name,
+               "--points-per-block", str(points_per_block), "--repeats", str(repeats)]
+
+    def run(stages):
+        completed = subprocess.run(command + ["--stages", *stages], stdout=subprocess.PIPE, text=True)
+        if completed.returncode != 0:
+            raise RuntimeError(f"测量失败: {stages}")
+        return json.loads(completed.stdout.strip().splitlines()[-1])
+
+    base = run([])
+    print(f"{model_name}, 每块 {points_per_block} 点: 不启用检查点 {base['time'] * 1000:.0f} ms, "
+          f"峰值内存增量 {base['peak_memory'] / 1e6:.0f} MB")
+    print(f"{'阶段':<20}{'节省内存 MB':>12}{'增加时间 ms':>12}{'MB/ms':>8}")
+    for stage in base['names'] + ['all']:
+        result = run([stage])
+        saved = (base['peak_memory'] - result['peak_memory']) / 1e6
+        added = (result['time'] - base['time']) * 1000
+        print(f"{stage:<20}{saved:>12.1f}{added:>12.1f}{saved / added if added > 0 else float('inf'):>8.2f}")
+
+
+def run_streaming(file_a, file_b, mode, block_size=160, cube_size=CUBE_SIZE, chunk_points=1_000_000):
+    """在当前进程中对一对帧做网格切块（'memory' 整帧读入；'streaming' 用 stream_partition），只统计不写块
+
+    峰值内存为 VmHWM 相对开始前常驻内存的增量，因此每种方式应在独立进程中运行。
+    """
+    from utils import load_ply
+    from preprocessing import stream_partition
+
+    baseline = rss_bytes()
+    start = time.perf_counter()
+    blocks, points = 0, 0
+    if mode == 'streaming':
+        with tempfile.TemporaryDirectory() as spill_dir:
+            for _, coords_a, coords_b, _ in stream_partition(file_a, file_b, block_size, cube_size,
+                                                              chunk_points=chunk_points, spill_dir=spill_dir):
+                blocks += 1
+                points += len(coords_a) + len(coords_b)
+    else:
+        chunks_a = chunk_point_cloud_sparse(load_ply(file_a, compact=True), block_size, cube_size)
+        chunks_b = chunk_point_cloud_sparse(load_ply(file_b, compact=True), block_size, cube_size)
+        for _, coords_a, coords_b, _ in match_blocks(chunks_a, chunks_b):
+            blocks += 1
+            points += len(coords_a) + len(coords_b)
+    elapsed = time.perf_counter() - start
+    peak = rss_bytes('VmHWM') - baseline
+    return {'mode': mode, 'blocks': blocks, 'points': points, 'time': elapsed, 'peak_memory': max(peak, 0)}
+
+
+def bench_streaming(num_points=8_000_000, resolution=2048, block_size=160, chunk_points=1_000_000):
+    """合成一帧高分辨率人体点云（二进制PLY），对比整帧读入切块与流式切块的峰值内存与耗时（各在独立进程中运行）"""
+    from synthetic import human_frame, vpcc_like
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        frame_a, frame_b = os.path.join(tmp_dir, "a.ply"), os.path.join(tmp_dir, "b.ply")
+        origin = human_frame(num_points, resolution)
+        write_ply(origin, frame_a)
+        write_ply(vpcc_like(origin, resolution), frame_b)
+        sizes = os.path.getsize(frame_a) + os.path.getsize(frame_b)
+        print(f"分辨率 {resolution}: 原始 {len(origin)} 点, 两帧文件共 {sizes / 1e6:.1f} MB, 每次读取 {chunk_points} 点")
+        del origin
+
+        print(f"{'方式':<12}{'块数':>8}{'点数':>12}{'耗时 s':>9}{'峰值 MB':>10}")
+        results = {}
+        for mode in ('memory', 'streaming'):
+            command = [sys.executable, os.path.abspath(__file__), "streaming_run", frame_a, frame_b, "--mode", mode,
+                       "--block-size", str(block_size), "--cube-size", str(resolution),
+                       "--chunk-points", str(chunk_points)]
+            completed = subprocess.run(command, stdout=subprocess.PIPE, text=True)
+            if completed.returncode != 0:
+                raise RuntimeError(f"测量失败: {mode}")
+            results[mode] = result = json.loads(completed.stdout.strip().splitlines()[-1])
+            print(f"{mode:<12}{result['blocks']:>8}{result['points']:>12}{result['time']:>9.2f}"
+                  f"{result['peak_memory'] / 1e6:>10.1f}")
+
+    memory, streaming = results['memory'], results['streaming']
+    if (memory['blocks'], memory['points']) != (streaming['blocks'], streaming['points']):
+        raise RuntimeError("流式切块与整帧切块的块数或点数不一致")
+    print(f"峰值内存降为 {streaming['peak_memory'] / max(memory['peak_memory'], 1):.1%}, "
+          f"耗时 {streaming['time'] / memory['time']:.2f}x")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="预处理性能基准")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    chunk = subparsers.add_parser("chunk", help="切块基准")
+    chunk.add_argument("--num-points", type=int, default=1_000_000)
+    chunk.add_argument("--block-size", type=int, default=160)
+    chunk.add_argument("--cube-size", type=int, default=CUBE_SIZE)
+    chunk.add_argument("--overlap", type=int, default=1)
+
+    ply = subparsers.add_parser("ply", help="PLY 读写基准")
+    ply.add_argument("--num-files", type=int, default=200)
+    ply.add_argument("--points-per-file", type=int, default=5000)
+
+    pc_error_output = subparsers.add_parser("pc_error_output", help="pc_error 输出解析基准")
+    pc_error_output.add_argument("--sample", help="录制的 pc_error 输出文件，缺省时生成合成样本")
+    pc_error_output.add_argument("--num-pairs", type=int, default=500_000)
+
+    batching = subparsers.add_parser("batching", help="固定 batch_size 与点数预算组批对比")
+    batching.add_argument("--block-dir", help="块目录（缺省时使用合成点云切块的点数分布）")
+    batching.add_argument("--frames", type=int, default=4, help="合成点云帧数")
+    batching.add_argument("--batch-size", type=int, help="固定批大小，缺省时取不超过点数预算的最大值")
+    batching.add_argument("--max-points", type=int, default=200_000)
+    batching.add_argument("--epochs", type=int, default=2)
+    batching.add_argument("--network", action="store_true", help="使用 SimpleAustinNet 作为负载（需要 MinkowskiEngine）")
+
+    partition = subparsers.add_parser("partition", help="固定网格切块与八叉树切块对比")
+    partition.add_argument("--num-points", type=int, default=1_000_000)
+    partition.add_argument("--block-size", type=int, default=160)
+    partition.add_argument("--max-points", type=int, default=20000)
+    partition.add_argument("--min-size", type=int, default=16)
+
+    suite = subparsers.add_parser("suite", help="合成数据上的预处理基准套件，耗时超过基线时返回非零")
+    suite.add_argument("--points", type=int, default=800_000, help="每帧量化前的采样点数")
+    suite.add_argument("--resolution", type=int, default=1024)
+    suite.add_argument("--frames", type=int, default=2)
+    suite.add_argument("--repeats", type=int, default=3)
+    suite.add_argument("--output", help="本次结果的 JSON 路径")
+    suite.add_argument("--baseline", default=BENCH_BASELINE)
+    suite.add_argument("--tolerance", type=float, default=BENCH_TOLERANCE)
+    suite.add_argument("--update-baseline", action="store_true", help="以本次结果作为新的基线")
+
+    coords = subparsers.add_parser("coords", help="浮点坐标与紧凑整数坐标的逐阶段耗时、内存与数据大小")
+    coords.add_argument("--points", type=int, default=1_000_000)
+    coords.add_argument("--block-size", type=int, default=160)
+
+    ddp = subparsers.add_parser("ddp", help="CPU 多进程数据并行训练的扩展效率（gloo 后端）")
+    ddp.add_argument("--ranks", type=int, nargs='+', default=[1, 2, 4])
+    ddp.add_argument("--block-dir", help="块目录（缺省为合成点云切块）")
+    ddp.add_argument("--frames", type=int, default=2, help="合成帧数")
+    ddp.add_argument("--max-points", type=int, default=200_000)
+    ddp.add_argument("--epochs", type=int, default=2)
+    ddp.add_argument("--threads", type=int, help="每个进程的计算线程数（缺省平分本机核数）")
+    ddp.add_argument("--network", action="store_true", help="使用 SimpleAustinNet（需要 MinkowskiEngine）")
+
+    imports = subparsers.add_parser("imports", help="核心模块的导入时间与内存，超出预算时返回非零")
+    imports.add_argument("--modules", nargs='+', help="缺省为全部核心模块")
+    imports.add_argument("--time-budget", type=float, default=IMPORT_TIME_BUDGET, help="秒")
+    imports.add_argument("--rss-budget", type=float, default=IMPORT_RSS_BUDGET / 1e6, help="MB")
+    imports.add_argument("--repeats", type=int, default=3)
+
+    models = subparsers.add_parser("models", help="网络变体的参数量、延迟、内存与吞吐（需要 MinkowskiEngine）")
+    models.add_argument("--variants", nargs='+', help="缺省为 SimpleAustinNet、AustinNet 与 network.VARIANTS 全部变体")
+    models.add_argument("--densities", nargs='+', type=int, default=[2000, 10000, 40000], help="每块点数")
+    models.add_argument("--repeats", type=int, default=5)
+    models.add_argument("--output", help="将结果保存为 JSON")
+
+    model_run = subparsers.add_parser("model_run", help="（内部）在独立进程中测量单个变体")
+    model_run.add_argument("--variant", required=True)
+    model_run.add_argument("--points-per-block", type=int, required=True)
+    model_run.add_argument("--repeats", type=int, default=5)
+
+    checkpointing = subparsers.add_parser("checkpointing", help="逐阶段激活检查点的内存/时间权衡（需要 MinkowskiEngine）")
+    checkpointing.add_argument("--model", default="SimpleAustinNet")
+    checkpointing.add_argument("--points-per-block", type=int, default=20000)
+    checkpointing.add_argument("--repeats", type=int, default=3)
+
+    checkpoint_run = subparsers.add_parser("checkpoint_run", help="（内部）在独立进程中测量单个检查点配置")
+    checkpoint_run.add_argument("--model", required=True)
+    checkpoint_run.add_argument("--stages", nargs='*', default=[])
+    checkpoint_run.add_argument("--points-per-block", type=int, required=True)
+    checkpoint_run.add_argument("--repeats", type=int, default=3)
+
+    streaming = subparsers.add_parser("streaming", help="整帧读入切块与流式切块的峰值内存与耗时对比")
+    streaming.add_argument("--points", type=int, default=8_000_000, help="合成帧量化前的采样点数")
+    streaming.add_argument("--resolution", type=int, default=2048)
+    streaming.add_argument("--block-size", type=int, default=160)
+    streaming.add_argument("--chunk-points", type=int, default=1_000_000)
+
+    streaming_run = subparsers.add_parser("streaming_run", help="（内部）在独立进程中测量一种切块方式")
+    streaming_run.add_argument("file_a")
+    streaming_run.add_argument("file_b")
+    streaming_run.add_argument("--mode", choices=["memory", "streaming"], required=True)
+    streaming_run.add_argument("--block-size", type=int, default=160)
+    streaming_run.add_argument("--cube-size", type=int, default=CUBE_SIZE)
+    streaming_run.add_argument("--chunk-points", type=int, default=1_000_000)
+
+    args = parser.parse_args()
+    if args.command == "chunk":
+        bench_chunk(args.num_points, args.block_size, args.cube_size, args.overlap)
+    elif args.command == "ply":
+        bench_ply(args.num_files, args.points_per_file)
+    elif args.command == "pc_error_output":
+        bench_pc_error_output(args.sample, args.num_pairs)
+    elif args.command == "partition":
+        bench_partition(args.num_points, args.block_size, max_points=args.max_points, min_size=args.min_size)
+    elif args.command == "suite":
+        regressions = bench_suite(args.points, args.resolution, args.frames, args.repeats, args.output,
+                                  args.baseline, args.tolerance, args.update_baseline)
+        if regressions:
+            raise SystemExit(f"性能回退: {', '.join(regressions)}")
+    elif args.command == "coords":
+        bench_coords(args.points, args.block_size)
+    elif args.command == "ddp":
+        bench_ddp(args.ranks, args.block_dir, args.frames, args.max_points, args.epochs, args.network, args.threads)
+    elif args.command == "imports":
+        if not bench_imports(args.modules, args.time_budget, args.rss_budget * 1e6, args.repeats):
+            raise SystemExit("核心模块导入超出预算")
+    elif args.command == "models":
+        bench_models(args.variants, args.densities, args.repeats, args.output)
+    elif args.command == "model_run":
+        print(json.dumps(run_model(args.variant, args.points_per_block, repeats=args.repeats)))
+    elif args.command == "checkpointing":
+        bench_checkpointing(args.model, args.points_per_block, args.repeats)
+    elif args.command == "checkpoint_run":
+        print(json.dumps(run_checkpointing(args.model, args.stages, args.points_per_block, repeats=args.repeats)))
+    elif args.command == "streaming":
+        bench_streaming(args.points, args.resolution, args.block_size, args.chunk_points)
+    elif args.command == "streaming_run":
+        print(json.dumps(run_streaming(args.file_a, args.file_b, args.mode, args.block_size, args.cube_size,
+                                       args.chunk_points)))
+    elif args.command == "batching":
+        bench_batching(args.block_dir, args.frames, args.batch_size, args.max_points, args.epochs,
+                       args.network)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+import os
+import json
+import numpy as np
+from ply import write_ply
+
+
+class BlockStore:
+    """分片块存储
+
+    每个分片（一帧）保存为一个连续坐标数组 `<shard>.npy`，
+    并附带偏移索引 `<shard>.json`，记录每个块的 (sequence, frame, block_id, origin, offset, count)。
+    读取时按需 memmap 分片，块数据为分片上的零拷贝切片。
+    每个分片索引单独成文件，多个进程写入不同帧时互不干扰。
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.entries = {}
+        self._shards = {}
+        os.makedirs(root, exist_ok=True)
+        for name in sorted(os.listdir(root)):
+            if name.endswith('.json'):
+                self._load_index(name[:-len('.json')])
+
+    def _load_index(self, shard):
+        with open(os.path.join(self.root, f"{shard}.json")) as f:
+            for entry in json.load(f):
+                entry['origin'] = tuple(entry['origin'])
+                self.entries[(entry['sequence'], entry['frame'], entry['block_id'])] = entry
+
+    def add_frame(self, sequence, frame, blocks):
+        """写入一帧的所有块
+
+        Args:
+            sequence: 序列名，如 soldier_vox10
+            frame: 帧号
+            blocks: [(block_id, coords, origin), ...]
+
+        Returns:
+            写出的分片数据与索引文件路径
+        """
+        shard = f"{sequence}_{frame:04d}"
+        coords = [np.asarray(c) for _, c, _ in blocks]
+        data = np.concatenate(coords) if coords else np.zeros((0, 3), dtype=np.float32)
+
+        entries, offset = [], 0
+        for (block_id, _, origin), c in zip(blocks, coords):
+            entries.append({
+                'sequence': sequence,
+                'frame': frame,
+                'block_id': int(block_id),
+                'origin': [int(v) for v in origin],
+                'shard': shard,
+                'offset': offset,
+                'count': len(c),
+            })
+            offset += len(c)
+
+        # 先写数据再写索引，索引存在即代表分片完整
+        data_path = os.path.join(self.root, f"{shard}.npy")
+        index_path = os.path.join(self.root, f"{shard}.json")
+        np.save(data_path, data)
+        with open(index_path + '.tmp', 'w') as f:
+            json.dump(entries, f)
+        os.replace(index_path + '.tmp', index_path)
+
+        self._shards.pop(shard, None)
+        for entry in entries:
+            entry['origin'] = tuple(entry['origin'])
+            self.entries[(sequence, frame, entry['block_id'])] = entry
+        return [data_path, index_path]
+
+    def _shard(self, shard):
+        if shard not in self._shards:
+            self._shards[shard] = np.load(os.path.join(self.root, f"{shard}.npy"), mmap_mode='r')
+        return self._shards[shard]
+
+    def get(self, sequence, frame, block_id):
+        """返回块坐标（分片 memmap 上的零拷贝切片）"""
+        entry = self.entries[(sequence, frame, block_id)]
+        return self._shard(entry['shard'])[entry['offset']:entry['offset'] + entry['count']]
+
+    def frame_blocks(self, sequence, frame):
+        """返回一帧的全部块索引条目，按块编号排序"""
+        return sorted(
+            (e for (s, f, _), e in self.entries.items() if s == sequence and f == frame),
+            key=lambda e: e['block_id'])
+
+    def export_ply(self, out_dir, binary=True):
+        """导出为原有的逐块PLY布局：<sequence>_<frame>_block_<i>.ply"""
+        os.makedirs(out_dir, exist_ok=True)
+        for (sequence, frame, block_id), entry in sorted(self.entries.items()):
+            write_ply(self.get(sequence, frame, block_id),
+                      os.path.join(out_dir, f"{sequence}_{frame:04d}_block_{block_id}.ply"), binary=binary)
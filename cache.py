@@ -0,0 +1,118 @@
+import os
+import json
+import time
+import hashlib
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """计算文件内容的 blake2b 摘要"""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        while chunk := f.read(chunk_size):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ResultCache:
+    """按输入内容哈希缓存预处理结果
+
+    键由任务类型、输入文件内容摘要和参数共同决定，参数或输入变化都会得到新键。
+    每个键记录其输出文件的大小和修改时间，输出缺失或被改动时缓存失效。
+    索引保存在 <cache_dir>/index.json，只应由调度进程读写。
+    每完成一个任务调用 maybe_save，索引按条数或时间间隔批量落盘，结束时再调用一次 save。
+    """
+
+    def __init__(self, cache_dir):
+        self.index_path = os.path.join(cache_dir, 'index.json')
+        os.makedirs(cache_dir, exist_ok=True)
+        self.entries, self.digests = {}, {}
+        self._unsaved, self._saved_at = 0, time.monotonic()
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path) as f:
+                    index = json.load(f)
+                self.entries, self.digests = index['entries'], index['digests']
+            except (OSError, json.JSONDecodeError, KeyError):
+                pass
+
+    def digest(self, path):
+        """文件摘要，大小和修改时间未变时复用上次的结果"""
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        cached = self.digests.get(path)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+        digest = file_digest(path)
+        self.digests[path] = [stat.st_size, stat.st_mtime_ns, digest]
+        return digest
+
+    def make_key(self, kind, input_paths, **params):
+        """由任务类型、输入内容和参数生成缓存键"""
+        payload = {
+            'kind': kind,
+            'inputs': [self.digest(path) for path in input_paths],
+            'params': params,
+        }
+        return f"{kind}-" + hashlib.blake2b(json.dumps(payload, sort_keys=True).encode(), digest_size=16).hexdigest()
+
+    def lookup(self, key):
+        """缓存有效（输出都存在且未被改动）时返回 True，否则移除该键"""
+        entry = self.entries.get(key)
+        if entry is None:
+            return False
+        for path, size, mtime_ns in entry['outputs']:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                break
+            if stat.st_size != size or stat.st_mtime_ns != mtime_ns:
+                break
+        else:
+            entry['last_used'] = time.time()
+            return True
+        del self.entries[key]
+        return False
+
+    def store(self, key, output_paths):
+        outputs = []
+        for path in output_paths:
+            stat = os.stat(path)
+            outputs.append([os.path.abspath(path), stat.st_size, stat.st_mtime_ns])
+        self.entries[key] = {
+            'outputs': outputs,
+            'bytes': sum(size for _, size, _ in outputs),
+            'last_used': time.time(),
+        }
+        self._unsaved += 1
+
+    def evict(self, max_bytes, kind=None):
+        """按最近最少使用淘汰，直到该类型缓存的输出总大小不超过 max_bytes，返回删除的字节数"""
+        keys = [key for key in self.entries if kind is None or key.startswith(f"{kind}-")]
+        total = sum(self.entries[key]['bytes'] for key in keys)
+        freed = 0
+        for key in sorted(keys, key=lambda k: self.entries[k]['last_used']):
+            if total <= max_bytes:
+                break
+            for path, _, _ in self.entries[key]['outputs']:
+                if os.path.exists(path):
+                    os.remove(path)
+            total -= self.entries[key]['bytes']
+            freed += self.entries[key]['bytes']
+            del self.entries[key]
+        return freed
+
+    def save(self):
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'entries': self.entries, 'digests': self.digests}, f)
+        os.replace(tmp_path, self.index_path)
+        self._unsaved, self._saved_at = 0, time.monotonic()
+
+    def maybe_save(self, every=100, interval=5.0):
+        """累计 every 条未保存的记录或距上次保存超过 interval 秒时才写出索引
+
+        每次 save 都重写整个索引，逐任务保存在上千个任务时总开销为平方级；中断时最多丢失最近一批记录，
+        对应的任务下次重跑即可。
+        """
+        if self._unsaved >= every or (self._unsaved and time.monotonic() - self._saved_at >= interval):
+            self.save()
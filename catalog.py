@@ -0,0 +1,137 @@
+import os
+import re
+import json
+import numpy as np
+from ply import read_ply
+from config import CUBE_SIZE
+
+CATALOG_FILE = '.catalog.json'
+
+# <sequence>_<frame>.ply 或 <sequence>_<frame>_block_<i>.ply
+NAME_PATTERN = re.compile(r'^(.*)_(\d{4})(?:_block_(\d+))?\.ply$')
+
+
+def block_origin(block_id, block_size, cube_size, overlap):
+    """由 chunk_point_cloud_fixed_size 的块编号反推块原点"""
+    stride = block_size - overlap
+    n_axis = -(-cube_size // stride)
+    kx, rem = divmod(block_id, n_axis * n_axis)
+    ky, kz = divmod(rem, n_axis)
+    return (kx * stride, ky * stride, kz * stride)
+
+
+class Catalog:
+    """数据集目录
+
+    扫描一次目录，为每个帧/块文件记录序列名、帧号、块编号、块原点、点数和包围盒，
+    持久化到目录下的 .catalog.json；再次加载时只重新读取大小或修改时间变化的文件。
+    配对查询通过 (帧号, 块编号) 字典完成，为 O(1)；帧号相同的不同序列（如 longdress 与 loot）放在同一目录时
+    键会重复，此时 find 报错而不是任取其一。
+    """
+
+    def __init__(self, directory, block_size=160, cube_size=CUBE_SIZE, overlap=1):
+        self.directory = directory
+        self.grid = (block_size, cube_size, overlap)
+        self.entries = {}
+        self._by_key = {}
+        self.refresh()
+
+    @property
+    def index_path(self):
+        return os.path.join(self.directory, CATALOG_FILE)
+
+    def _load_index(self):
+        if not os.path.exists(self.index_path):
+            return {}
+        try:
+            with open(self.index_path) as f:
+                index = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+        return index['entries'] if index.get('grid') == list(self.grid) else {}
+
+    def _scan_file(self, name, stat):
+        match = NAME_PATTERN.match(name)
+        points = read_ply(os.path.join(self.directory, name))
+        block_id = int(match.group(3)) if match.group(3) is not None else None
+        return {
+            'sequence': match.group(1),
+            'frame': int(match.group(2)),
+            'block_id': block_id,
+            'origin': block_origin(block_id, *self.grid) if block_id is not None else None,
+            'count': len(points),
+            'bbox': [np.min(points, axis=0).tolist(), np.max(points, axis=0).tolist()] if len(points) else None,
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+        }
+
+    def refresh(self):
+        """增量更新：新增/变化的文件重新读取，已删除的文件移出目录"""
+        previous = self._load_index()
+        entries, changed = {}, False
+        with os.scandir(self.directory) as it:
+            for item in it:
+                if not item.is_file() or not NAME_PATTERN.match(item.name):
+                    continue
+                stat = item.stat()
+                entry = previous.get(item.name)
+                if entry is None or entry['size'] != stat.st_size or entry['mtime_ns'] != stat.st_mtime_ns:
+                    entry = self._scan_file(item.name, stat)
+                    changed = True
+                entries[item.name] = entry
+        changed = changed or len(entries) != len(previous)
+
+        self.entries = entries
+        self._by_key = {}
+        for name in sorted(entries):
+            self._by_key.setdefault((entries[name]['frame'], entries[name]['block_id']), []).append(name)
+        duplicates = [names for names in self._by_key.values() if len(names) > 1]
+        if duplicates:
+            print(f"警告: {self.directory} 中有 {len(duplicates)} 个 (帧号, 块编号) 重复，"
+                  f"如 {', '.join(duplicates[0])}；按帧号配对前请将不同序列分开存放")
+        if changed:
+            self.save()
+        return self
+
+    def save(self):
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'grid': list(self.grid), 'entries': self.entries}, f)
+        os.replace(tmp_path, self.index_path)
+
+    def find(self, frame, block_id=None):
+        """按 (帧号, 块编号) 查找文件名，不存在时返回 None，有多个同键文件时抛出 ValueError"""
+        names = self.find_all(frame, block_id)
+        if len(names) > 1:
+            raise ValueError(f"{self.directory} 中帧号 {frame} 块编号 {block_id} 对应多个文件: {', '.join(names)}")
+        return names[0] if names else None
+
+    def find_all(self, frame, block_id=None):
+        """按 (帧号, 块编号) 查找所有同键文件名（按名称排序）"""
+        return list(self._by_key.get((frame, block_id), []))
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def frames(self):
+        """返回目录中的帧号（升序）"""
+        return sorted({e['frame'] for e in self.entries.values()})
+
+    def blocks(self, frame=None):
+        """返回块文件名列表，可按帧过滤，按 (帧号, 块编号) 排序"""
+        names = [name for name, e in self.entries.items()
+                 if e['block_id'] is not None and (frame is None or e['frame'] == frame)]
+        return sorted(names, key=lambda name: (self.entries[name]['frame'], self.entries[name]['block_id']))
+
+
+_CATALOGS = {}
+
+
+def get_catalog(directory, refresh=False):
+    """进程内复用的目录对象，refresh=True 时重新检查文件变化"""
+    catalog = _CATALOGS.get(directory)
+    if catalog is None:
+        catalog = _CATALOGS[directory] = Catalog(directory)
+    elif refresh:
+        catalog.refresh()
+    return catalog
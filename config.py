@@ -1,5 +1,10 @@
 PC_ERROR_DIR = "./pc_error_d" # pc_error 路径
 
+CUBE_SIZE = 1024 # 体素网格边长（vox10 为 1024，vox11 / vox12 为 2048 / 4096）
+RESOLUTION = 1023 # pc_error 与 PSNR 的峰值（通常为 CUBE_SIZE - 1）
+
+COORD_DTYPE = "uint16" # 体素坐标在内存与块文件中的整数类型（10 位坐标用 uint16；pc_error 不识别时改为 "int32"）
+
 # 测试脚本：./pc_error_d --fileA="data/train_dataset/compress/S26C03R03_rec_0536.ply" --fileB="data/train_dataset/origin/soldier_vox10_0536.ply" --resolution=1023 --dropdups=0 
 
 COMPRESS_DIR = "data/train_dataset/compress" # compress  点云路径
@@ -8,10 +13,30 @@ COMPRESS_BLOCK_DIR = "data/train_dataset/compress/blocks" # compress 分块点
 ORIGIN_DIR = "data/train_dataset/origin" # origin 点云路径
 ORIGIN_BLOCK_DIR = "data/train_dataset/origin/blocks" # origin 分块点云路径
 
+COMPRESS_BLOCK_STORE_DIR = "data/train_dataset/compress/block_store" # compress 分片块存储路径
+ORIGIN_BLOCK_STORE_DIR = "data/train_dataset/origin/block_store" # origin 分片块存储路径
+
 NEW_ORIGIN_DIR = "data/train_dataset/new_origin" # new_origin 点云路径
 NEW_ORIGIN_BLOCK_DIR = "data/train_dataset/new_origin/blocks" # new_origin 分块点云路径
 NEW_ORIGIN_ATOB_BLOCK_DIR = "data/train_dataset/new_origin_atob/blocks" # new_origin_atob 分块点云路径
 
+VOXEL_DIR = "data/train_dataset/compress/voxels" # compress 块体素化（量化 + 去重）结果路径
+
+SPILL_DIR = "data/train_dataset/spill" # 流式切块时按块分桶的临时目录（需有足够磁盘空间）
+
+MANIFEST_DIR = "data/train_dataset/manifests" # 预处理任务清单路径（断点续跑）
+CACHE_DIR = "data/train_dataset/cache" # 预处理内容哈希缓存索引路径
+CACHE_MAX_BYTES = 20 * 1024 ** 3 # new_origin / new_origin_atob 点对输出的缓存上限（字节）
+
+CHECKPOINT_DIR = "checkpoints" # 模型权重保存路径
+EVAL_CACHE_DIR = "data/eval_cache" # 评估结果缓存路径（按模型权重、帧内容与指标参数）
+
+BENCH_BASELINE = "benchmarks/preprocessing_baseline.json" # 预处理基准套件的基线结果（按机器用 --update-baseline 生成）
+BENCH_TOLERANCE = 0.25 # 阶段耗时超过基线的比例上限，超过即判为回退
+
+IMPORT_TIME_BUDGET = 1.0 # 轻量核心模块（I/O、配对、目录等）的导入时间上限（秒）
+IMPORT_RSS_BUDGET = 64_000_000 # 轻量核心模块导入后增加的常驻内存上限（字节）
+
 
 PREDICT_DIR = "YOUR_PREDICT_DIR" # predict 点云路径
 
@@ -0,0 +1,232 @@
+import os
+import time
+from collections import OrderedDict
+import numpy as np
+import torch
+from torch.utils.data import Dataset, DataLoader
+from config import COMPRESS_BLOCK_DIR, NEW_ORIGIN_BLOCK_DIR, VOXEL_DIR
+from catalog import get_catalog
+from block_store import BlockStore
+from utils import load_ply
+from voxelize import voxelize, voxel_path, load_voxels, source_digest
+
+
+class BlockPairDataset(Dataset):
+    """compress -> new_origin 块对数据集
+
+    输入块可以来自逐块PLY目录，也可以来自分片块存储（BlockStore）；目标为同名的 new_origin 块，
+    每个压缩点对应一个最近邻原始点。输入量化为去重后的整数体素坐标（特征为体素内点坐标的均值），
+    并附带每个点到体素的逆映射；目标仍为逐点坐标。坐标、特征与目标均相对块偏移。
+    voxel_dir 下有 `preprocessing.py voxelize` 预先算好的体素化结果、且其记录的输入块摘要与当前块一致时直接读取，
+    否则（缺失或块已重新切分）现场体素化。
+    cache_size > 0 时每个 worker 进程内保留最近使用的已解码样本（LRU）。
+    """
+
+    def __init__(self, compress_dir=COMPRESS_BLOCK_DIR, target_dir=NEW_ORIGIN_BLOCK_DIR, store_dir=None,
+                 cache_size=0, voxel_dir=VOXEL_DIR):
+        target_catalog = get_catalog(target_dir, refresh=True)
+        self.store_dir = store_dir
+        self._store = None
+        self.samples = []
+        if store_dir is None:
+            catalog = get_catalog(compress_dir, refresh=True)
+            for name in catalog.blocks():
+                if name in target_catalog.entries:
+                    self.samples.append((catalog.path(name), target_catalog.path(name), catalog.entries[name]['count']))
+        else:
+            store = BlockStore(store_dir)
+            for (sequence, frame, block_id), entry in sorted(store.entries.items()):
+                name = f"{sequence}_{frame:04d}_block_{block_id}.ply"
+                if name in target_catalog.entries:
+                    self.samples.append(((sequence, frame, block_id), target_catalog.path(name), entry['count']))
+        self.voxel_dir = voxel_dir
+        self._warned_stale = False
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+
+    def __len__(self):
+        return len(self.samples)
+
+    @property
+    def point_counts(self):
+        """每个样本的点数（无需读取数据）"""
+        return [count for _, _, count in self.samples]
+
+    def _load_input(self, source):
+        if self.store_dir is None:
+            return load_ply(source)
+        if self._store is None:
+            # 每个 worker 进程各自打开 memmap
+            self._store = BlockStore(self.store_dir)
+        return self._store.get(*source)
+
+    def _load_voxels(self, source, target_path):
+        points = self._load_input(source)
+        if self.voxel_dir is not None:
+            path = voxel_path(self.voxel_dir, target_path)
+            if os.path.exists(path):
+                voxels = load_voxels(path)
+                if voxels['source'] == source_digest(points):
+                    return voxels
+                if not self._warned_stale:
+                    print(f"警告: {path} 与当前输入块不一致（块已重新切分？），改为现场体素化；"
+                          f"请重新运行 preprocessing.py voxelize")
+                    self._warned_stale = True
+        return voxelize(points)
+
+    def _load(self, idx):
+        source, target_path, _ = self.samples[idx]
+        voxels = self._load_voxels(source, target_path)
+        target = np.asarray(load_ply(target_path), dtype=np.float32)
+        if len(voxels['inverse']) != len(target):
+            raise ValueError(f"块 {target_path} 的点数与输入不一致: {len(target)} != {len(voxels['inverse'])}")
+
+        offset = voxels['coords'].min(axis=0)
+        return {
+            'coords': voxels['coords'] - offset,
+            'feats': voxels['feats'] - offset.astype(np.float32),
+            'inverse': voxels['inverse'],
+            'targets': target - offset.astype(np.float32),
+            'offset': offset,
+        }
+
+    def __getitem__(self, idx):
+        if self.cache_size <= 0:
+            return self._load(idx)
+        if idx in self._cache:
+            self._cache.move_to_end(idx)
+            return self._cache[idx]
+        sample = self._load(idx)
+        self._cache[idx] = sample
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return sample
+
+
+class BlockBudgetSampler:
+    """按点数预算组批的 batch sampler
+
+    块的点数从几个到几十万不等，固定 batch_size 要么按最大的块取得很小（多数批次远低于内存预算、每 epoch 步数多），
+    要么在稠密块凑到一起时超出预算；按点数组批使每批点数（即峰值激活内存）不超过 max_points 且批次接近装满。
+    每个 epoch 先用 (seed, epoch) 打乱样本，再按 pool_size 个样本一组在组内按点数排序（分桶），
+    依次装入批次直到总点数达到 max_points，最后打乱批次顺序。
+    单个超过预算的块独占一个批次；点数为 0 的空块不参与训练。
+    数据并行时各 rank 用相同的 seed 得到相同的批次序列，再轮流取其中第 rank 个；
+    末尾不足 world_size 的批次丢弃，保证各 rank 的步数相同（否则梯度 all-reduce 会互相等待）。
+    """
+
+    def __init__(self, point_counts, max_points=200_000, max_batch_size=None, pool_size=256, shuffle=True,
+                 seed=0, rank=0, world_size=1):
+        self.point_counts = np.asarray(point_counts, dtype=np.int64)
+        self.max_points = max_points
+        self.max_batch_size = max_batch_size
+        self.pool_size = pool_size
+        self.shuffle = shuffle
+        self.seed = seed
+        self.rank = rank
+        self.world_size = world_size
+        self.epoch = 0
+
+    def set_epoch(self, epoch):
+        """设置 epoch，使每个 epoch 的打乱顺序不同且可复现"""
+        self.epoch = epoch
+
+    def batches(self):
+        """返回本 epoch 的全部批次（样本下标列表）"""
+        rng = np.random.default_rng([self.seed, self.epoch])
+        order = np.flatnonzero(self.point_counts > 0)
+        if self.shuffle:
+            order = rng.permutation(order)
+
+        batches = []
+        for start in range(0, len(order), self.pool_size):
+            pool = order[start:start + self.pool_size]
+            pool = pool[np.argsort(self.point_counts[pool], kind='stable')]
+            batch, total = [], 0
+            for idx in pool.tolist():
+                count = int(self.point_counts[idx])
+                if batch and (total + count > self.max_points or len(batch) == self.max_batch_size):
+                    batches.append(batch)
+                    batch, total = [], 0
+                batch.append(idx)
+                total += count
+            if batch:
+                batches.append(batch)
+
+        if self.shuffle:
+            batches = [batches[i] for i in rng.permutation(len(batches))]
+        if self.world_size > 1:
+            batches = batches[:len(batches) - len(batches) % self.world_size][self.rank::self.world_size]
+        return batches
+
+    def __iter__(self):
+        return iter(self.batches())
+
+    def __len__(self):
+        return len(self.batches())
+
+
+def collate_block_pairs(batch):
+    """合并为批：坐标前加批次索引列（与 ME.utils.batched_coordinates 相同的布局），逆映射平移到批内体素行号"""
+    coords = np.concatenate([
+        np.hstack([np.full((len(s['coords']), 1), i, dtype=np.int32), s['coords']])
+        for i, s in enumerate(batch)
+    ])
+    starts = np.cumsum([0] + [len(s['coords']) for s in batch])
+    return {
+        'coords': torch.from_numpy(coords),
+        'feats': torch.from_numpy(np.concatenate([s['feats'] for s in batch])),
+        'inverse': torch.from_numpy(np.concatenate([s['inverse'] + start for s, start in zip(batch, starts)])),
+        'targets': torch.from_numpy(np.concatenate([s['targets'] for s in batch])),
+        'offsets': torch.from_numpy(np.stack([s['offset'] for s in batch])),
+        'num_points': [len(s['targets']) for s in batch],
+    }
+
+
+def make_dataloader(dataset, batch_size=8, num_workers=4, prefetch_factor=4, shuffle=True, batch_sampler=None,
+                    sampler=None):
+    """多 worker 预取的 DataLoader，sampler 可为 DistributedSampler 等逐样本采样器"""
+    kwargs = {}
+    if num_workers > 0:
+        kwargs = {'prefetch_factor': prefetch_factor, 'persistent_workers': True}
+    if batch_sampler is not None:
+        return DataLoader(dataset, batch_sampler=batch_sampler, num_workers=num_workers,
+                          collate_fn=collate_block_pairs, **kwargs)
+    return DataLoader(dataset, batch_size=batch_size, shuffle=shuffle and sampler is None, sampler=sampler,
+                      num_workers=num_workers, collate_fn=collate_block_pairs, **kwargs)
+
+
+class EpochStats:
+    """统计一个 epoch 的样本吞吐与等待数据的时间"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.data_wait = 0.0
+        self.samples = 0
+        self.points = 0
+
+    def timed(self, loader):
+        """迭代 loader，累计每个批次的等待时间"""
+        iterator = iter(loader)
+        while True:
+            wait_start = time.perf_counter()
+            try:
+                batch = next(iterator)
+            except StopIteration:
+                return
+            self.data_wait += time.perf_counter() - wait_start
+            self.samples += len(batch['num_points'])
+            self.points += sum(batch['num_points'])
+            yield batch
+
+    def summary(self):
+        elapsed = max(time.perf_counter() - self.start, 1e-9)
+        return {
+            'elapsed': elapsed,
+            'samples': self.samples,
+            'points': self.points,
+            'samples_per_s': self.samples / elapsed,
+            'points_per_s': self.points / elapsed,
+            'data_wait': self.data_wait,
+            'data_wait_ratio': self.data_wait / elapsed,
+        }
@@ -0,0 +1,64 @@
+import os
+import socket
+import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
+from torch.nn.parallel import DistributedDataParallel
+
+
+def _free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _entry(rank, fn, world_size, threads, args):
+    dist.init_process_group('gloo', rank=rank, world_size=world_size)
+    torch.set_num_threads(threads)
+    try:
+        fn(rank, world_size, *args)
+    finally:
+        dist.destroy_process_group()
+
+
+def launch(fn, world_size, *args, threads=None):
+    """在本机启动 world_size 个进程（gloo 后端）执行 fn(rank, world_size, *args)
+
+    world_size <= 1 时直接在当前进程执行，不初始化进程组。
+    threads 为每个进程的 intra-op 线程数，缺省时平分本机核数，避免多个进程争抢同一批核。
+    fn 必须是模块顶层函数（spawn 需要序列化）。
+    """
+    if world_size <= 1:
+        if threads:
+            torch.set_num_threads(threads)
+        return fn(0, 1, *args)
+    os.environ['MASTER_ADDR'] = '127.0.0.1'
+    os.environ['MASTER_PORT'] = str(_free_port())
+    threads = threads or max(1, (os.cpu_count() or 1) // world_size)
+    mp.spawn(_entry, args=(fn, world_size, threads, args), nprocs=world_size, join=True)
+
+
+def is_main():
+    """单进程或 rank 0（只有它打印汇总与保存权重）"""
+    return not dist.is_initialized() or dist.get_rank() == 0
+
+
+def wrap_model(model, static_graph=False):
+    """多进程时包装为 DDP：反向时按桶 all-reduce 梯度并取平均"""
+    if dist.is_initialized() and dist.get_world_size() > 1:
+        return DistributedDataParallel(model, static_graph=static_graph)
+    return model
+
+
+def unwrap_model(model):
+    """取出 DDP 包装下的原模型，保存的 state_dict 与单进程训练一致"""
+    return model.module if isinstance(model, DistributedDataParallel) else model
+
+
+def all_reduce(values, op='sum'):
+    """对一组标量做跨进程归约（'sum' 或 'max'），单进程时原样返回"""
+    if not dist.is_initialized():
+        return list(values)
+    tensor = torch.tensor(values, dtype=torch.float64)
+    dist.all_reduce(tensor, op=dist.ReduceOp.SUM if op == 'sum' else dist.ReduceOp.MAX)
+    return tensor.tolist()
@@ -0,0 +1,312 @@
+import os
+import re
+import json
+import time
+import hashlib
+import argparse
+import subprocess
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from config import PC_ERROR_DIR, ORIGIN_DIR, COMPRESS_DIR, PREDICT_DIR, EVAL_CACHE_DIR, RESOLUTION
+from utils import load_ply, get_file_pairs, parse_frame_name
+from ply import read_ply
+from metrics import compute_metrics
+from cache import ResultCache
+
+# 例： "   mse1,PSNR (p2point): 70.12" / "   mseF      (p2plane): 0.31"
+PC_ERROR_METRIC = re.compile(r'^\s*mse([12F])(,PSNR)?\s*\((p2point|p2plane)\):\s*(\S+)')
+
+
+def load_normals(file_a, normals_file=None):
+    """fileA 的法向量：读取 normals_file，缺省时与 pc_error 一样读取 fileA 自身的 nx/ny/nz 属性，没有时返回 None"""
+    try:
+        return read_ply(normals_file or file_a, fields=('nx', 'ny', 'nz'))
+    except ValueError:
+        if normals_file:
+            raise
+        return None
+
+
+def evaluate_pair(file_a, file_b, resolution=RESOLUTION, dropdups=0, normals_file=None):
+    """进程内计算一对点云的 D1/D2 指标
+
+    normals_file 为 fileA 的法向量文件（含 nx/ny/nz 属性的PLY，与 pc_error 的 --inputNorm 相同），
+    fileA 与 normals_file 都没有法向量时在 fileA 上用 PCA 估计。
+    """
+    return compute_metrics(load_ply(file_a), load_ply(file_b), resolution=resolution, dropdups=dropdups,
+                           normals_a=load_normals(file_a, normals_file))
+
+
+def pc_error_metrics(file_a, file_b, resolution=RESOLUTION, dropdups=0, pc_error_path=PC_ERROR_DIR,
+                     normals_file=None):
+    """运行 pc_error 并解析其 MSE/PSNR 输出，键名与 compute_metrics 一致"""
+    command = [
+        pc_error_path,
+        f"--fileA={file_a}",
+        f"--fileB={file_b}",
+        f"--resolution={resolution}",
+        "--color=0",
+        f"--dropdups={dropdups}",
+    ]
+    if normals_file:
+        command.append(f"--inputNorm={normals_file}")
+    result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, check=True)
+    metrics = {}
+    for line in result.stdout.splitlines():
+        match = PC_ERROR_METRIC.match(line)
+        if match:
+            direction, is_psnr, kind, value = match.groups()
+            metrics[f"{'psnr' if is_psnr else 'mse'}{direction}_{kind}"] = float(value)
+    return metrics
+
+
+def conformance(pairs, resolution=RESOLUTION, dropdups=0, pc_error_path=PC_ERROR_DIR, rtol=1e-3, psnr_atol=0.01,
+                normals_files=None):
+    """逐对比较进程内指标与 pc_error 的结果，只比较 pc_error 实际输出的指标
+
+    normals_files 给定时为与 pairs 一一对应的 fileA 法向量文件，两边使用同一份法向量。
+
+    Returns:
+        是否全部一致
+    """
+    ok = True
+    for (file_a, file_b), normals_file in zip(pairs, normals_files or [None] * len(pairs)):
+        start = time.perf_counter()
+        native = evaluate_pair(file_a, file_b, resolution, dropdups, normals_file)
+        native_time = time.perf_counter() - start
+        start = time.perf_counter()
+        reference = pc_error_metrics(file_a, file_b, resolution, dropdups, pc_error_path, normals_file)
+        reference_time = time.perf_counter() - start
+
+        print(f"{file_a} <-> {file_b}  (native {native_time:.2f}s, pc_error {reference_time:.2f}s)")
+        for key, expected in sorted(reference.items()):
+            actual = native[key]
+            if key.startswith('psnr'):
+                match = abs(actual - expected) <= psnr_atol or actual == expected
+            else:
+                match = abs(actual - expected) <= rtol * max(abs(expected), 1e-6)
+            ok &= match
+            print(f"  {key:<16} native {actual:>12.6f}  pc_error {expected:>12.6f}  {'OK' if match else 'MISMATCH'}")
+    return ok
+
+
+def record_expected(expected_path, pc_error_path=PC_ERROR_DIR):
+    """用 pc_error 重新记录一致性测试的期望值，原地改写 expected_path（tests/data/conformance/expected.json）
+
+    每个 case 的 file_a / file_b 相对 expected_path 所在目录，按其 resolution / dropdups 运行 pc_error，
+    metrics 替换为 pc_error 的输出，source 记为 "pc_error"。
+    """
+    data_dir = os.path.dirname(os.path.abspath(expected_path))
+    with open(expected_path) as f:
+        expected = json.load(f)
+    for case in expected['cases']:
+        case['metrics'] = pc_error_metrics(os.path.join(data_dir, case['file_a']), os.path.join(data_dir, case['file_b']),
+                                           case['resolution'], case['dropdups'], pc_error_path)
+        case['source'] = 'pc_error'
+        print(f"{case['file_a']} <-> {case['file_b']}: {len(case['metrics'])} 项")
+    with open(expected_path, 'w') as f:
+        json.dump(expected, f, indent=2, ensure_ascii=False)
+        f.write('\n')
+
+
+def weights_digest(checkpoint_path):
+    """模型权重的内容摘要：按参数名顺序对 state_dict 中的张量求 blake2b，与权重文件中的 epoch 等附加信息无关"""
+    import torch
+    checkpoint = torch.load(checkpoint_path, map_location='cpu', weights_only=False)
+    state = checkpoint.state_dict() if isinstance(checkpoint, torch.nn.Module) else checkpoint['model']
+    h = hashlib.blake2b(digest_size=16)
+    for name in sorted(state):
+        h.update(name.encode())
+        h.update(state[name].detach().cpu().contiguous().numpy().tobytes())
+    return h.hexdigest()
+
+
+# 每个评估 worker 进程内的预测函数，由 _init_worker 加载一次
+_predict = None
+
+
+def _init_worker(checkpoint_path, model_name, threads):
+    """加载模型并设置计算线程数；基线评估（无权重）不需要 torch，不导入"""
+    global _predict
+    if checkpoint_path is None:
+        return
+    import torch
+    from inference import load_model, make_predictor
+    torch.set_num_threads(threads)
+    _predict = make_predictor(load_model(checkpoint_path, model_name), 'cpu')
+
+
+def evaluate_frame(compress_path, origin_path, predict_path, resolution=RESOLUTION, dropdups=0, inference_params=None):
+    """预测一帧（未加载模型时直接评估 compress 帧）并计算其与 origin 帧的指标，附带各阶段耗时"""
+    start = time.perf_counter()
+    points = load_ply(compress_path)
+    if _predict is not None:
+        from inference import infer_frame
+        infer_frame(_predict, points, predict_path, **(inference_params or {}))
+        points = load_ply(predict_path)
+    predict_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = compute_metrics(points, load_ply(origin_path), resolution=resolution, dropdups=dropdups)
+    result.update(points=len(points), predict_time=predict_time, metric_time=time.perf_counter() - start)
+    return result
+
+
+def run_evaluation(pairs, checkpoint_path=None, model_name='SimpleAustinNet', resolution=RESOLUTION, dropdups=0,
+                   workers=1, output_dir=PREDICT_DIR, use_cache=True, **inference_params):
+    """并行评估多帧，结果按 (模型权重, 帧内容, 指标参数) 缓存
+
+    Args:
+        pairs: [(origin 帧路径, compress 帧路径), ...]
+        checkpoint_path: 模型权重；为 None 时评估 compress 帧本身（基线）
+        workers: 进程数，每个进程加载一次模型，计算线程平分本机核数
+        use_cache: 权重、帧内容与参数都未变的帧直接读取上次的结果
+        inference_params: 传给 inference.infer_frame 的切块参数（block_size、halo、merge 等），同样计入缓存键
+
+    Returns:
+        按输入顺序的逐帧结果列表，每项含指标、耗时、序列名、帧号与是否命中缓存
+    """
+    weights = weights_digest(checkpoint_path) if checkpoint_path is not None else None
+    results_dir = os.path.join(EVAL_CACHE_DIR, 'results')
+    os.makedirs(results_dir, exist_ok=True)
+    if checkpoint_path is not None:
+        os.makedirs(output_dir, exist_ok=True)
+    cache = ResultCache(EVAL_CACHE_DIR) if use_cache else None
+
+    rows, pending = [None] * len(pairs), {}
+    for i, (origin_path, compress_path) in enumerate(pairs):
+        sequence, frame = parse_frame_name(origin_path)
+        rows[i] = {'sequence': sequence, 'frame': frame, 'file': os.path.basename(compress_path), 'cached': False}
+        key = None
+        if cache is not None:
+            model_params = {'model': model_name, **inference_params} if weights is not None else {}
+            key = cache.make_key('evaluate', [compress_path, origin_path], weights=weights, resolution=resolution,
+                                 dropdups=dropdups, **model_params)
+            if cache.lookup(key):
+                with open(os.path.join(results_dir, f"{key}.json")) as f:
+                    rows[i].update(json.load(f), cached=True)
+                continue
+        pending[i] = (key, (compress_path, origin_path, os.path.join(output_dir, os.path.basename(compress_path)),
+                            resolution, dropdups, inference_params))
+    print(f"共 {len(pairs)} 帧，命中缓存 {len(pairs) - len(pending)} 帧")
+
+    def finish(i, key, result):
+        rows[i].update(result)
+        if cache is not None:
+            path = os.path.join(results_dir, f"{key}.json")
+            with open(path, 'w') as f:
+                json.dump(result, f)
+            cache.store(key, [path])
+            cache.maybe_save()
+
+    threads = max(1, (os.cpu_count() or 1) // max(min(workers, len(pending)), 1))
+    try:
+        if workers <= 1:
+            _init_worker(checkpoint_path, model_name, threads)
+            for i, (key, args) in pending.items():
+                finish(i, key, evaluate_frame(*args))
+        elif pending:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(checkpoint_path, model_name, threads)) as pool:
+                futures = {pool.submit(evaluate_frame, *args): (i, key) for i, (key, args) in pending.items()}
+                for future in as_completed(futures):
+                    finish(*futures[future], future.result())
+    finally:
+        if cache is not None:
+            cache.save()
+    return rows
+
+
+def print_tables(rows):
+    """逐帧与逐序列的 D1/D2（对称，F）PSNR 及耗时"""
+    print(f"{'序列':<20}{'帧':>6}{'点数':>10}{'D1 PSNR':>10}{'D2 PSNR':>10}{'预测 s':>9}{'指标 s':>9}  缓存")
+    for row in rows:
+        print(f"{row['sequence']:<20}{row['frame']:>6}{row['points']:>10}{row['psnrF_p2point']:>10.4f}"
+              f"{row['psnrF_p2plane']:>10.4f}{row['predict_time']:>9.2f}{row['metric_time']:>9.2f}"
+              f"  {'是' if row['cached'] else '-'}")
+
+    print(f"\n{'序列':<20}{'帧数':>6}{'点数':>10}{'D1 PSNR':>10}{'D2 PSNR':>10}{'预测 s':>9}{'指标 s':>9}")
+    for sequence in sorted({row['sequence'] for row in rows}):
+        group = [row for row in rows if row['sequence'] == sequence]
+        print(f"{sequence:<20}{len(group):>6}{sum(r['points'] for r in group):>10}"
+              f"{sum(r['psnrF_p2point'] for r in group) / len(group):>10.4f}"
+              f"{sum(r['psnrF_p2plane'] for r in group) / len(group):>10.4f}"
+              f"{sum(r['predict_time'] for r in group):>9.2f}{sum(r['metric_time'] for r in group):>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="点云几何质量评估（D1/D2 MSE 与 PSNR）")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    metrics = subparsers.add_parser("metrics", help="计算一对或多对点云的指标")
+    metrics.add_argument("--fileA", nargs='+', required=True)
+    metrics.add_argument("--fileB", nargs='+', required=True)
+    metrics.add_argument("--resolution", type=int, default=RESOLUTION)
+    metrics.add_argument("--dropdups", type=int, default=0)
+    metrics.add_argument("--normals", nargs='+', help="与 --fileA 一一对应的法向量PLY（nx/ny/nz，同 pc_error 的 --inputNorm）")
+
+    check = subparsers.add_parser("conformance", help="与 pc_error 的结果逐项比对")
+    check.add_argument("--fileA", nargs='+', required=True)
+    check.add_argument("--fileB", nargs='+', required=True)
+    check.add_argument("--resolution", type=int, default=RESOLUTION)
+    check.add_argument("--dropdups", type=int, default=0)
+    check.add_argument("--pc-error", default=PC_ERROR_DIR)
+    check.add_argument("--normals", nargs='+', help="与 --fileA 一一对应的法向量PLY（nx/ny/nz）")
+
+    record = subparsers.add_parser("record", help="用 pc_error 重新记录一致性测试的期望值")
+    record.add_argument("--expected", default=os.path.join("tests", "data", "conformance", "expected.json"))
+    record.add_argument("--pc-error", default=PC_ERROR_DIR)
+
+    run = subparsers.add_parser("run", help="并行预测并评估多帧（结果按模型权重与帧内容缓存）")
+    run.add_argument("--checkpoint", help="train.py 保存的权重或 export.py 导出的模型（缺省评估 compress 帧本身）")
+    run.add_argument("--model", default="SimpleAustinNet")
+    run.add_argument("--origin-dir", default=ORIGIN_DIR)
+    run.add_argument("--compress-dir", default=COMPRESS_DIR)
+    run.add_argument("--output-dir", default=PREDICT_DIR, help="预测帧的保存目录")
+    run.add_argument("--resolution", type=int, default=RESOLUTION)
+    run.add_argument("--dropdups", type=int, default=0)
+    run.add_argument("--workers", type=int, default=os.cpu_count())
+    run.add_argument("--no-cache", action="store_true")
+    run.add_argument("--block-size", type=int, default=160)
+    run.add_argument("--halo", type=int, default=8)
+    run.add_argument("--merge", choices=["owner", "average"], default="owner")
+    run.add_argument("--output", help="逐帧结果另存为 JSON")
+
+    args = parser.parse_args()
+    if args.command == "record":
+        record_expected(args.expected, args.pc_error)
+        return
+    if args.command == "run":
+        start = time.perf_counter()
+        pairs = [(os.path.join(args.origin_dir, file_a), os.path.join(args.compress_dir, file_b))
+                 for file_a, file_b in get_file_pairs(args.origin_dir, args.compress_dir)]
+        rows = run_evaluation(pairs, args.checkpoint, args.model,
+                              args.resolution, args.dropdups, args.workers, args.output_dir, not args.no_cache,
+                              block_size=args.block_size, halo=args.halo, merge=args.merge)
+        print_tables(rows)
+        print(f"总耗时 {time.perf_counter() - start:.2f}s")
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(rows, f, indent=2)
+        return
+    if len(args.fileA) != len(args.fileB):
+        parser.error("--fileA 与 --fileB 的数量必须一致")
+    if args.normals and len(args.normals) != len(args.fileA):
+        parser.error("--normals 与 --fileA 的数量必须一致")
+    pairs = list(zip(args.fileA, args.fileB))
+    normals_files = args.normals or [None] * len(pairs)
+
+    if args.command == "metrics":
+        for (file_a, file_b), normals_file in zip(pairs, normals_files):
+            start = time.perf_counter()
+            result = evaluate_pair(file_a, file_b, args.resolution, args.dropdups, normals_file)
+            print(f"{file_a} <-> {file_b}  ({time.perf_counter() - start:.2f}s)")
+            for key, value in result.items():
+                print(f"  {key:<16} {value:.6f}")
+    else:
+        ok = conformance(pairs, args.resolution, args.dropdups, args.pc_error, normals_files=normals_files)
+        print("一致" if ok else "不一致")
+        raise SystemExit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
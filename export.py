@@ -0,0 +1,214 @@
+import copy
+import time
+import argparse
+import numpy as np
+import torch
+import torch.nn as nn
+import MinkowskiEngine as ME
+from network import AustinInception, AustinPyramid, AustinUNet
+
+
+def fold_batch_norm(conv, norm):
+    """将 MinkowskiBatchNorm 的推理时仿射变换折叠进前面的卷积（原地修改 conv）
+
+    ME 卷积核的最后一维为输出通道，偏置形状为 (1, out_channels)；原来没有偏置的卷积会补上偏置。
+    """
+    bn = norm.bn
+    scale = bn.weight.detach() / torch.sqrt(bn.running_var + bn.eps)
+    shift = bn.bias.detach() - bn.running_mean * scale
+    with torch.no_grad():
+        conv.kernel.mul_(scale)
+        if conv.bias is None:
+            conv.bias = nn.Parameter(shift.view(1, -1).clone())
+        else:
+            conv.bias.copy_(conv.bias * scale.view(1, -1) + shift.view(1, -1))
+    return conv
+
+
+def _fold_pairs(module, pairs):
+    """按 (卷积名, BN 名) 折叠，并将 BN 替换为 Identity"""
+    for conv_name, norm_name in pairs:
+        fold_batch_norm(getattr(module, conv_name), getattr(module, norm_name))
+        setattr(module, norm_name, nn.Identity())
+
+
+def _sparse_like(x, features):
+    """沿用 x 的坐标映射构造新的稀疏张量"""
+    return ME.SparseTensor(features=features, coordinate_map_key=x.coordinate_map_key,
+                           coordinate_manager=x.coordinate_manager)
+
+
+class FusedInception(nn.Module):
+    """折叠 BN 后的 AustinInception，可选将 1x1 的 conv1 并入同样读取 x 的 3x3 conv4
+
+    两者的步长与膨胀相同，conv1 等价于只有中心抽头非零的 3x3 卷积，合并后一次卷积输出两路通道。
+    合并减少一次核映射与一次调度，但中心以外的零抽头也参与计算，适合调度开销占主导的场合（如 GPU 小块）。
+    """
+
+    def __init__(self, block, fuse_center_tap=False):
+        super(FusedInception, self).__init__()
+        _fold_pairs(block, [(f"conv{i}", f"norm{i}") for i in range(1, 6)])
+        self.conv2, self.conv3, self.conv5, self.relu = block.conv2, block.conv3, block.conv5, block.relu
+        self.split = None
+        if not fuse_center_tap:
+            self.conv1, self.conv4 = block.conv1, block.conv4
+            return
+
+        conv1, conv4 = block.conv1, block.conv4
+        self.split = conv1.out_channels
+        self.conv14 = ME.MinkowskiConvolution(
+            conv4.in_channels, conv1.out_channels + conv4.out_channels,
+            kernel_size=conv4.kernel_generator.kernel_size, stride=conv4.kernel_generator.kernel_stride,
+            dilation=conv4.kernel_generator.kernel_dilation, bias=True, dimension=conv4.dimension)
+        with torch.no_grad():
+            kernel = torch.zeros_like(self.conv14.kernel)
+            kernel[:, :, self.split:] = conv4.kernel
+            # 奇数核的零偏移位于中间抽头
+            kernel[kernel.shape[0] // 2, :, :self.split] = conv1.kernel.view(conv1.in_channels, -1)
+            self.conv14.kernel.copy_(kernel)
+            self.conv14.bias.copy_(torch.cat([conv1.bias, conv4.bias], dim=1))
+
+    def forward(self, x):
+        if self.split is None:
+            out = self.relu(self.conv1(x))
+            out1 = self.relu(self.conv4(x))
+        else:
+            both = self.relu(self.conv14(x))
+            out = _sparse_like(both, both.F[:, :self.split])
+            out1 = _sparse_like(both, both.F[:, self.split:])
+
+        out = self.relu(self.conv2(out))
+        out = self.relu(self.conv3(out))
+        out1 = self.relu(self.conv5(out1))
+
+        out2 = ME.cat(out, out1)
+        out2 += x
+        return out2
+
+
+class FusedPyramid(nn.Module):
+    """折叠 BN 后的 AustinPyramid，aspp5 分支提前到广播之前
+
+    aspp5 读取的是全局池化后再广播到每个点的特征，同一样本内所有点的输入相同；
+    因此先对每个样本的池化特征做 1x1 卷积（及 ReLU），再广播，计算量由点数降为样本数。
+    """
+
+    def __init__(self, block):
+        super(FusedPyramid, self).__init__()
+        branches = [1, *range(2, len(block.dilations) + 2)]
+        _fold_pairs(block, [(f"aspp{i}", f"aspp{i}_bn") for i in branches + [5]] + [("conv2", "bn2")])
+        self.branches = nn.ModuleList(getattr(block, f"aspp{i}") for i in branches)
+        self.conv2, self.pooling, self.broadcast, self.relu = block.conv2, block.pooling, block.broadcast, block.relu
+
+        aspp5 = block.aspp5
+        self.aspp5 = ME.MinkowskiLinear(aspp5.in_channels, aspp5.out_channels, bias=True)
+        with torch.no_grad():
+            self.aspp5.linear.weight.copy_(aspp5.kernel.view(aspp5.in_channels, -1).t())
+            self.aspp5.linear.bias.copy_(aspp5.bias.view(-1))
+
+    def forward(self, x):
+        branches = [self.relu(branch(x)) for branch in self.branches]
+        x5 = self.relu(self.aspp5(self.pooling(x)))
+        x5 = self.broadcast(x, x5)
+
+        x6 = ME.cat(*branches, x5)
+        x6 = self.relu(self.conv2(x6))
+        return x6 + x
+
+
+def export_for_inference(model, fuse_center_taps=False):
+    """将训练好的 AustinNet / SimpleAustinNet / AustinUNet 转为等价的推理模型
+
+    所有 卷积 -> BN 折叠为带偏置的卷积，Inception / Pyramid 块替换为 FusedInception / FusedPyramid。
+    返回新模型，原模型不变。
+    """
+    model = copy.deepcopy(model).eval()
+    if isinstance(model, AustinUNet):
+        for convs, norms in ((model.enc_convs, model.enc_norms), (model.dec_convs, model.dec_norms)):
+            for i, (conv, norm) in enumerate(zip(convs, norms)):
+                fold_batch_norm(conv, norm)
+                norms[i] = nn.Identity()
+    else:
+        for name, module in list(model.named_children()):
+            if isinstance(module, ME.MinkowskiBatchNorm):
+                _fold_pairs(model, [(name.replace('norm', 'conv'), name)])
+
+    for module in list(model.modules()):
+        if isinstance(module, nn.Sequential):
+            for i, block in enumerate(module):
+                if isinstance(block, AustinInception):
+                    module[i] = FusedInception(block, fuse_center_taps)
+                elif isinstance(block, AustinPyramid):
+                    module[i] = FusedPyramid(block)
+    return model.eval()
+
+
+def random_blocks(num_blocks=4, points_per_block=20000, block_size=160, seed=0):
+    """生成若干块球面上的体素点，用于等价性检查与延迟测量"""
+    rng = np.random.default_rng(seed)
+    blocks = []
+    for _ in range(num_blocks):
+        directions = rng.normal(size=(points_per_block, 3))
+        directions /= np.linalg.norm(directions, axis=1, keepdims=True)
+        points = np.round(block_size / 2 + directions * rng.uniform(0.2, 0.45) * block_size)
+        blocks.append(np.unique(points, axis=0).astype(np.float32))
+    return blocks
+
+
+def _run(model, blocks):
+    from train import forward_batch
+    coords = ME.utils.batched_coordinates([np.floor(b) for b in blocks])
+    batch = {'coords': coords, 'feats': torch.from_numpy(np.concatenate(blocks))}
+    with torch.no_grad():
+        return forward_batch(model, batch, 'cpu')
+
+
+def check_equivalence(model, exported, blocks, atol=1e-3):
+    """对比原模型与导出模型的输出，返回最大绝对误差"""
+    expected, actual = _run(model.eval(), blocks), _run(exported, blocks)
+    error = (expected - actual).abs().max().item()
+    print(f"最大绝对误差: {error:.2e}（阈值 {atol:g}）")
+    return error <= atol
+
+
+def compare_latency(model, exported, blocks, repeats=5):
+    """CPU 上对比两者的前向延迟（去掉第一次预热）"""
+    results = {}
+    for name, m in (("原模型", model.eval()), ("导出模型", exported)):
+        _run(m, blocks)
+        times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            _run(m, blocks)
+            times.append(time.perf_counter() - start)
+        results[name] = float(np.median(times))
+        print(f"{name}: 中位延迟 {results[name] * 1000:.1f} ms")
+    print(f"加速 {results['原模型'] / results['导出模型']:.2f}x")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="导出推理用模型：折叠 BN 并融合分支")
+    parser.add_argument("--checkpoint", required=True, help="train.py 保存的权重文件")
+    parser.add_argument("--model", default="SimpleAustinNet")
+    parser.add_argument("--output", required=True, help="导出模型的保存路径（整个模块）")
+    parser.add_argument("--fuse-center-taps", action="store_true", help="将 Inception 的 1x1 conv1 并入 3x3 conv4")
+    parser.add_argument("--points-per-block", type=int, default=20000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    from train import MODELS
+    model = MODELS[args.model]()
+    model.load_state_dict(torch.load(args.checkpoint, map_location='cpu')['model'])
+    exported = export_for_inference(model, args.fuse_center_taps)
+
+    blocks = random_blocks(points_per_block=args.points_per_block)
+    if not check_equivalence(model, exported, blocks):
+        raise SystemExit("导出模型与原模型输出不一致")
+    compare_latency(model, exported, blocks, args.repeats)
+    torch.save(exported, args.output)
+    print(f"已保存 {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,217 @@
+import os
+import time
+import argparse
+import numpy as np
+from config import COMPRESS_DIR, PREDICT_DIR, CHECKPOINT_DIR, CUBE_SIZE
+from utils import load_ply
+from ply import PlyWriter, write_ply
+from preprocessing import block_assignments
+from catalog import NAME_PATTERN
+from temporal import BlockHistory
+from voxelize import voxelize
+
+
+def iter_frame_blocks(points, block_size=160, cube_size=CUBE_SIZE, halo=0):
+    """按不重叠的核心块遍历整帧，每块附带 halo 宽的上下文
+
+    每个点只属于一个核心块 floor(c / block_size)（即“拥有”该点的块），避免 overlap 切块产生重复点；
+    网络输入为核心块向外扩展 halo 后范围内的全部点，使块边界上的点也有完整的邻域。
+
+    Yields:
+        (point_idx, owned, block_id)：输入点在整帧中的下标、其中哪些点由本块拥有，以及核心块编号
+    """
+    points = np.asarray(points)
+    point_idx, block_ids, n_axis = block_assignments(points + halo, block_size + 2 * halo, cube_size,
+                                                      overlap=2 * halo)
+    owner = np.floor(points / block_size).astype(np.int64)
+    owner = (owner[:, 0] * n_axis + owner[:, 1]) * n_axis + owner[:, 2]
+
+    counts = np.bincount(block_ids, minlength=n_axis ** 3)
+    bounds = np.concatenate(([0], np.cumsum(counts)))
+    for b in np.flatnonzero(counts):
+        idx = point_idx[bounds[b]:bounds[b + 1]]
+        owned = owner[idx] == b
+        if owned.any():
+            yield idx, owned, int(b)
+
+
+def batch_blocks(blocks, max_points=200_000):
+    """将块按总点数预算依次组批，单个超过预算的块独占一批"""
+    batch, total = [], 0
+    for block in blocks:
+        if batch and total + len(block[0]) > max_points:
+            yield batch
+            batch, total = [], 0
+        batch.append(block)
+        total += len(block[0])
+    if batch:
+        yield batch
+
+
+def make_predictor(model, device='cpu'):
+    """包装网络为批量预测函数：输入若干块的坐标，返回每个点的预测坐标
+
+    与训练一致，坐标按块最小角平移后体素化去重，预测结果按逆映射散回每个点并平移回原位置。
+    """
+    import torch
+    from train import forward_batch
+    model.eval()
+
+    def predict(blocks):
+        offsets = [np.floor(b.min(axis=0)) for b in blocks]
+        voxels = [voxelize(b - o) for b, o in zip(blocks, offsets)]
+        coords = np.concatenate([
+            np.hstack([np.full((len(v['coords']), 1), i, dtype=np.int32), v['coords']])
+            for i, v in enumerate(voxels)
+        ])
+        starts = np.cumsum([0] + [len(v['coords']) for v in voxels])
+        batch = {'coords': torch.from_numpy(coords),
+                 'feats': torch.from_numpy(np.concatenate([v['feats'] for v in voxels])),
+                 'inverse': torch.from_numpy(np.concatenate([v['inverse'] + s for v, s in zip(voxels, starts)]))}
+        with torch.no_grad():
+            pred = forward_batch(model, batch, device).cpu().numpy()
+        bounds = np.cumsum([0] + [len(b) for b in blocks])
+        return [pred[bounds[i]:bounds[i + 1]] + offsets[i] for i in range(len(blocks))]
+
+    return predict
+
+
+def _predict_batch(predict, points, batch, history=None):
+    """预测一批块；给定 history 时占用与上一帧相同（或变化在阈值内且无新体素）的块直接复用上一帧结果"""
+    if history is None:
+        return predict([points[idx] for idx, _, _ in batch])
+
+    lookups = [history.lookup(block_id, points[idx]) for idx, _, block_id in batch]
+    need = [j for j, (_, missing, _) in enumerate(lookups) if missing.any()]
+    preds = [results for results, _, _ in lookups]
+    if need:
+        start = time.perf_counter()
+        for j, pred in zip(need, predict([points[batch[j][0]] for j in need])):
+            preds[j] = pred
+        history.record_compute(sum(len(batch[j][0]) for j in need), time.perf_counter() - start)
+    for j, (pred, (_, _, state)) in enumerate(zip(preds, lookups)):
+        history.store(state, pred, 0 if j in need else len(pred))
+    return preds
+
+
+def infer_frame(predict, points, out_path, block_size=160, cube_size=CUBE_SIZE, halo=8, max_points=200_000,
+                merge='owner', history=None):
+    """对整帧逐块推理并写出结果
+
+    Args:
+        predict: 批量预测函数（见 make_predictor）
+        points: 整帧输入点
+        out_path: 输出PLY路径
+        halo: 块外扩的上下文宽度（体素）
+        max_points: 每批的点数预算，决定推理时的峰值内存
+        merge: 'owner' 只保留拥有块的预测并逐批流式写出；
+               'average' 对 halo 区域内多个块的预测取平均，按输入顺序在帧末写出
+        history: 可选的 temporal.BlockHistory，逐帧调用时复用上一帧中未变化块的预测
+
+    Returns:
+        {'points', 'blocks', 'batches'} 统计
+    """
+    points = np.asarray(points, dtype=np.float32)
+    if len(points) and (points.min() < 0 or points.max() >= cube_size):
+        raise ValueError(f"点坐标超出 [0, {cube_size}) 范围")
+    stats = {'points': len(points), 'blocks': 0, 'batches': 0}
+    blocks = iter_frame_blocks(points, block_size, cube_size, halo)
+
+    if merge == 'owner':
+        with PlyWriter(out_path, len(points)) as writer:
+            for batch in batch_blocks(blocks, max_points):
+                preds = _predict_batch(predict, points, batch, history)
+                for (_, owned, _), pred in zip(batch, preds):
+                    writer.write(pred[owned])
+                stats['blocks'] += len(batch)
+                stats['batches'] += 1
+        return stats
+
+    if merge != 'average':
+        raise ValueError(f"未知的合并方式: {merge}")
+    total = np.zeros((len(points), 3), dtype=np.float64)
+    hits = np.zeros(len(points), dtype=np.int64)
+    for batch in batch_blocks(blocks, max_points):
+        preds = _predict_batch(predict, points, batch, history)
+        for (idx, _, _), pred in zip(batch, preds):
+            # 块内下标互不重复，可直接按下标累加
+            total[idx] += pred
+            hits[idx] += 1
+        stats['blocks'] += len(batch)
+        stats['batches'] += 1
+    write_ply((total / hits[:, None]).astype(np.float32), out_path)
+    return stats
+
+
+def load_model(checkpoint_path, model_name='SimpleAustinNet', device='cpu'):
+    """加载 train.py 保存的权重（按 model_name 构建网络）或 export.py 导出的整个推理模型"""
+    import torch
+    from train import MODELS
+    checkpoint = torch.load(checkpoint_path if os.path.exists(checkpoint_path)
+                            else os.path.join(CHECKPOINT_DIR, checkpoint_path), map_location=device,
+                            weights_only=False)
+    if isinstance(checkpoint, torch.nn.Module):
+        # export.py 导出的推理模型
+        return checkpoint.to(device)
+    model = MODELS[model_name]().to(device)
+    model.load_state_dict(checkpoint['model'])
+    return model
+
+
+def report_history(sequence, history):
+    """打印一个序列的时序复用统计"""
+    if history is None:
+        return
+    stats = history.summary()
+    print(f"序列 {sequence}: 块复用率 {stats['hit_rate']:.1%}（完全相同 {stats['exact']} 块）, "
+          f"复用 {stats['reused_points']}/{stats['points']} 点, 估计节省 {stats['time_saved']:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="整帧逐块推理：compress 帧 -> 优化后的帧")
+    parser.add_argument("--checkpoint", required=True, help="train.py 保存的权重文件或 export.py 导出的模型")
+    parser.add_argument("--model", default="SimpleAustinNet")
+    parser.add_argument("--input", nargs='+', help="输入帧（缺省为 COMPRESS_DIR 下全部帧）")
+    parser.add_argument("--output-dir", default=PREDICT_DIR)
+    parser.add_argument("--block-size", type=int, default=160)
+    parser.add_argument("--cube-size", type=int, default=CUBE_SIZE)
+    parser.add_argument("--halo", type=int, default=8, help="块外扩的上下文宽度（体素）")
+    parser.add_argument("--max-points", type=int, default=200_000, help="每批点数预算")
+    parser.add_argument("--merge", choices=["owner", "average"], default="owner")
+    parser.add_argument("--temporal", action="store_true", help="复用同一序列相邻帧中未变化块的预测")
+    parser.add_argument("--max-change", type=float, default=0.0, help="时序复用允许的块占用变化比例")
+    args = parser.parse_args()
+
+    import torch
+    device = 'cuda' if torch.cuda.is_available() else 'cpu'
+    predict = make_predictor(load_model(args.checkpoint, args.model, device), device)
+
+    inputs = args.input or [os.path.join(COMPRESS_DIR, f) for f in sorted(os.listdir(COMPRESS_DIR))
+                            if f.endswith('.ply')]
+    os.makedirs(args.output_dir, exist_ok=True)
+    start, total_points = time.perf_counter(), 0
+    sequence, history = None, None
+    for path in inputs:
+        if args.temporal:
+            match = NAME_PATTERN.match(os.path.basename(path))
+            if history is None or match is None or match.group(1) != sequence:
+                report_history(sequence, history)
+                sequence, history = match.group(1) if match else None, BlockHistory(args.max_change)
+            else:
+                history.next_frame()
+        frame_start = time.perf_counter()
+        out_path = os.path.join(args.output_dir, os.path.basename(path))
+        stats = infer_frame(predict, load_ply(path), out_path, args.block_size, args.cube_size, args.halo,
+                            args.max_points, args.merge, history)
+        total_points += stats['points']
+        print(f"{path} -> {out_path}: {stats['points']} 点, {stats['blocks']} 块, {stats['batches']} 批, "
+              f"{time.perf_counter() - frame_start:.2f}s")
+
+    report_history(sequence, history)
+
+    elapsed = time.perf_counter() - start
+    print(f"共 {len(inputs)} 帧, {len(inputs) / elapsed:.2f} 帧/s, {total_points / elapsed:.0f} 点/s")
+
+
+if __name__ == '__main__':
+    main()
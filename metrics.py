@@ -0,0 +1,179 @@
+import numpy as np
+from pairing import drop_duplicates
+from config import RESOLUTION
+
+
+def build_tree(points):
+    """构建 KD 树（同一点云的最近邻查询与法向量估计共用一棵树）"""
+    from scipy.spatial import cKDTree
+    return cKDTree(np.asarray(points, dtype=np.float64), balanced_tree=False, compact_nodes=False)
+
+
+def estimate_normals(points, knn=12, tree=None, chunk_size=200_000):
+    """用 k 近邻协方差的最小特征向量估计法向量（分块批量计算，限制内存）"""
+    points = np.asarray(points, dtype=np.float64)
+    tree = tree if tree is not None else build_tree(points)
+    knn = min(knn, len(points))
+    normals = np.empty_like(points)
+    for start in range(0, len(points), chunk_size):
+        _, idx = tree.query(points[start:start + chunk_size], k=knn, workers=-1)
+        neighbors = points[idx.reshape(len(idx), -1)]
+        centered = neighbors - neighbors.mean(axis=1, keepdims=True)
+        cov = np.matmul(centered.transpose(0, 2, 1), centered)
+        _, vectors = np.linalg.eigh(cov)
+        normals[start:start + chunk_size] = vectors[:, :, 0]
+    return normals
+
+
+def psnr(mse, peak):
+    """几何 PSNR，与 pc_error 一致：10 * log10(3 * peak^2 / mse)"""
+    if mse <= 0:
+        return float('inf')
+    return float(10 * np.log10(3 * peak ** 2 / mse))
+
+
+def nearest_ties(tree, queries, max_k=30, step=5):
+    """每个查询点的全部等距最近邻（与 pc_error 一样逐步增大 k，最多 max_k 个）
+
+    Returns:
+        (query_idx, neighbor_idx)，一一对应的索引对，按查询点升序
+    """
+    query_idx = np.arange(len(queries))
+    pending, pairs = query_idx, []
+    k = step
+    while len(pending):
+        k = min(k, tree.n)
+        dist, idx = tree.query(queries[pending], k=k, workers=-1)
+        dist, idx = dist.reshape(len(pending), -1), idx.reshape(len(pending), -1)
+        tied = dist == dist[:, :1]
+        # 第 k 个邻居仍与最近邻等距时可能还有更多并列，增大 k 重查
+        more = tied[:, -1] & (k + step <= max_k) & (k < tree.n)
+        done = ~more
+        rows, cols = np.nonzero(tied[done])
+        pairs.append((pending[done][rows], idx[done][rows, cols]))
+        pending, k = pending[more], k + step
+    query_idx = np.concatenate([q for q, _ in pairs])
+    neighbor_idx = np.concatenate([n for _, n in pairs])
+    order = np.argsort(query_idx, kind='stable')
+    return query_idx[order], neighbor_idx[order]
+
+
+def _average_into(normals, targets, sources, values, align):
+    """把 values[sources] 按 targets 分组取平均写入 normals（align 时先翻转到与 normals[targets] 同侧）"""
+    contributions = values[sources]
+    if align:
+        flip = np.einsum('ni,ni->n', contributions, normals[targets]) < 0
+        contributions = np.where(flip[:, None], -contributions, contributions)
+    sums = np.zeros_like(normals)
+    np.add.at(sums, targets, contributions)
+    counts = np.bincount(targets, minlength=len(normals))
+    covered = counts > 0
+    normals[covered] = sums[covered] / counts[covered, None]
+    return covered
+
+
+def transfer_normals(points_ref, normals_ref, points, tree_ref=None, tree=None, average=True, align=False):
+    """把参考点云的法向量映射到另一个点云上（对应 pc_error 的 scaleNormals）
+
+    每个参考点的法向量累加到它在目标点云中的最近点上取平均，没有参考点落到的目标点取它在参考点云中最近点的法向量。
+    average=True 时（pc_error 的 averageNormals=1）等距的最近点都参与：参考点落到所有并列最近的目标点上，
+    兜底时对所有并列最近参考点的法向量取平均；average=False 时只取 KD 树返回的一个最近点。
+    align=True 时先把参与平均的法向量翻转到与该目标点的最近参考法向量同侧，
+    用于没有统一朝向的 PCA 法向量（否则相反朝向的法向量相加会互相抵消）。
+    """
+    points_ref = np.asarray(points_ref, dtype=np.float64)
+    normals_ref = np.asarray(normals_ref, dtype=np.float64)
+    points = np.asarray(points, dtype=np.float64)
+    tree_ref = tree_ref if tree_ref is not None else build_tree(points_ref)
+    tree = tree if tree is not None else build_tree(points)
+
+    _, nearest = tree_ref.query(points, k=1, workers=-1)
+    normals = normals_ref[nearest]
+    fallback = normals.copy()
+    if average:
+        _average_into(fallback, *nearest_ties(tree_ref, points), normals_ref, align)
+        owner_ref, owner = nearest_ties(tree, points_ref)
+    else:
+        _, owner = tree.query(points_ref, k=1, workers=-1)
+        owner_ref = np.arange(len(points_ref))
+    covered = _average_into(normals, owner, owner_ref, normals_ref, align)
+    normals[~covered] = fallback[~covered]
+    return normals
+
+
+def one_direction(points_a, points_b, normals_b, tree_b=None):
+    """A->B 单向误差：遍历 A，在 B 中找最近邻，D2 使用 B 上的法向量
+
+    与 pc_error 的缺省设置（neighborsProc=1）一样，B 中有多个等距最近邻时对它们的点到面误差取平均。
+
+    Returns:
+        (D1 MSE, D2 MSE)
+    """
+    points_a = np.asarray(points_a, dtype=np.float64)
+    points_b = np.asarray(points_b, dtype=np.float64)
+    tree_b = tree_b if tree_b is not None else build_tree(points_b)
+    query_idx, idx = nearest_ties(tree_b, points_a)
+    error = points_a[query_idx] - points_b[idx]
+    plane = np.einsum('ni,ni->n', error, np.asarray(normals_b)[idx]) ** 2
+    counts = np.bincount(query_idx, minlength=len(points_a))
+    point = np.bincount(query_idx, np.einsum('ni,ni->n', error, error), len(points_a)) / counts
+    plane = np.bincount(query_idx, plane, len(points_a)) / counts
+    return float(point.mean()), float(plane.mean())
+
+
+def _drop_duplicates_with(points, normals=None):
+    """去除重复点（同 pairing.drop_duplicates），给定法向量时一并取出对应行"""
+    if normals is None:
+        return drop_duplicates(points), None
+    points, first = np.unique(np.asarray(points), axis=0, return_index=True)
+    return points, np.asarray(normals)[first]
+
+
+def compute_metrics(points_a, points_b, resolution=RESOLUTION, dropdups=0, normals_a=None, normals_b=None,
+                    single_pass=False, average_normals=True, independent_normals=False):
+    """计算点到点 (D1) 和点到面 (D2) 的 MSE/PSNR
+
+    键名与 pc_error 的输出对应：1 为 A->B，2 为 B->A，F 为两者取较大的 MSE（对称）。
+    与 pc_error 一样只在参考点云 A 上取法向量（pc_error 的 --inputNorm），B 的法向量由 transfer_normals
+    从 A 映射过去，两个方向的 D2 使用同一个法向量场；A 没有给定法向量时用 k 近邻 PCA 估计。
+
+    Args:
+        points_a / points_b: 两个点云（pc_error 的 fileA / fileB）
+        resolution: PSNR 峰值
+        dropdups: 非 0 时先去除重复点（给定的法向量保留每组重复点中第一个点的）
+        normals_a: A 的法向量，缺省时由 k 近邻 PCA 估计
+        normals_b: 直接指定 B 的法向量，不从 A 映射
+        single_pass: 只计算 A->B
+        average_normals: 映射时对落到同一个 B 点的 A 法向量取平均（pc_error 的缺省行为）
+        independent_normals: 回退方案，A、B 各自独立做 PCA 估计法向量（旧行为，与 pc_error 的 D2 不可比）
+    """
+    if dropdups:
+        points_a, normals_a = _drop_duplicates_with(points_a, normals_a)
+        points_b, normals_b = _drop_duplicates_with(points_b, normals_b)
+    points_a = np.asarray(points_a, dtype=np.float64)
+    points_b = np.asarray(points_b, dtype=np.float64)
+
+    tree_a, tree_b = build_tree(points_a), build_tree(points_b)
+    estimated = normals_a is None
+    if estimated:
+        normals_a = estimate_normals(points_a, tree=tree_a)
+    if normals_b is None:
+        if independent_normals:
+            normals_b = estimate_normals(points_b, tree=tree_b)
+        else:
+            normals_b = transfer_normals(points_a, normals_a, points_b, tree_a, tree_b, average_normals,
+                                         align=estimated)
+
+    results = {}
+    mse1 = one_direction(points_a, points_b, normals_b, tree_b)
+    directions = [('1', mse1)]
+    if not single_pass:
+        mse2 = one_direction(points_b, points_a, normals_a, tree_a)
+        directions += [('2', mse2), ('F', tuple(max(x, y) for x, y in zip(mse1, mse2)))]
+
+    for name, (p2point, p2plane) in directions:
+        results[f'mse{name}_p2point'] = p2point
+        results[f'psnr{name}_p2point'] = psnr(p2point, resolution)
+        results[f'mse{name}_p2plane'] = p2plane
+        results[f'psnr{name}_p2plane'] = psnr(p2plane, resolution)
+    return results
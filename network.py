@@ -1,4 +1,6 @@
+import torch
 import torch.nn as nn
+from torch.utils.checkpoint import checkpoint
 import MinkowskiEngine as ME
 import MinkowskiEngine.MinkowskiFunctional as MEF
 
@@ -69,29 +71,28 @@ class AustinPyramid(nn.Module):
     def __init__(self,
                  channels,
                  bn_momentum=0.1,
-                 dimension=3):
+                 dimension=3,
+                 dilations=(6, 12, 18)):
         super(AustinPyramid, self).__init__()
         assert dimension > 0
+        # 膨胀卷积分支依次命名为 aspp2 ~ aspp4，aspp5 固定为全局池化分支
+        assert 1 <= len(dilations) <= 3
+        self.dilations = tuple(dilations)
 
         self.aspp1 = ME.MinkowskiConvolution(
             channels, channels // 4, kernel_size=1, stride=1, dilation=1, bias=True, dimension=dimension)
-        self.aspp2 = ME.MinkowskiConvolution(
-            channels, channels // 4, kernel_size=3, stride=1, dilation=6, bias=True, dimension=dimension)
-        self.aspp3 = ME.MinkowskiConvolution(
-            channels, channels // 4, kernel_size=3, stride=1, dilation=12, bias=True, dimension=dimension)
-        self.aspp4 = ME.MinkowskiConvolution(
-            channels, channels // 4, kernel_size=3, stride=1, dilation=18, bias=True, dimension=dimension)
+        self.aspp1_bn = ME.MinkowskiBatchNorm(channels // 4, momentum=bn_momentum)
+        for i, dilation in enumerate(self.dilations, start=2):
+            setattr(self, f"aspp{i}", ME.MinkowskiConvolution(
+                channels, channels // 4, kernel_size=3, stride=1, dilation=dilation, bias=True, dimension=dimension))
+            setattr(self, f"aspp{i}_bn", ME.MinkowskiBatchNorm(channels // 4, momentum=bn_momentum))
         self.aspp5 = ME.MinkowskiConvolution(
             channels, channels // 4, kernel_size=1, stride=1, dilation=1, bias=True, dimension=dimension)
-
-        self.aspp1_bn = ME.MinkowskiBatchNorm(channels // 4, momentum=bn_momentum)
-        self.aspp2_bn = ME.MinkowskiBatchNorm(channels // 4, momentum=bn_momentum)
-        self.aspp3_bn = ME.MinkowskiBatchNorm(channels // 4, momentum=bn_momentum)
-        self.aspp4_bn = ME.MinkowskiBatchNorm(channels // 4, momentum=bn_momentum)
         self.aspp5_bn = ME.MinkowskiBatchNorm(channels // 4, momentum=bn_momentum)
 
         self.conv2 = ME.MinkowskiConvolution(
-            channels // 4 * 5, channels, kernel_size=1, stride=1, dilation=1, bias=True, dimension=dimension)
+            channels // 4 * (len(self.dilations) + 2), channels, kernel_size=1, stride=1, dilation=1, bias=True,
+            dimension=dimension)
         self.bn2 = ME.MinkowskiBatchNorm(channels, momentum=bn_momentum)
 
         self.pooling = ME.MinkowskiGlobalPooling()
@@ -103,17 +104,11 @@ class AustinPyramid(nn.Module):
         x1 = self.aspp1_bn(x1)
         x1 = self.relu(x1)
 
-        x2 = self.aspp2(x)
-        x2 = self.aspp2_bn(x2)
-        x2 = self.relu(x2)
-
-        x3 = self.aspp3(x)
-        x3 = self.aspp3_bn(x3)
-        x3 = self.relu(x3)
-
-        x4 = self.aspp4(x)
-        x4 = self.aspp4_bn(x4)
-        x4 = self.relu(x4)
+        dilated = []
+        for i in range(2, len(self.dilations) + 2):
+            xi = getattr(self, f"aspp{i}")(x)
+            xi = getattr(self, f"aspp{i}_bn")(xi)
+            dilated.append(self.relu(xi))
 
         x5 = self.pooling(x)
         x5 = self.broadcast(x, x5)
@@ -121,7 +116,7 @@ class AustinPyramid(nn.Module):
         x5 = self.aspp5_bn(x5)
         x5 = self.relu(x5)
 
-        x6 = ME.cat(x1, x2, x3, x4, x5)
+        x6 = ME.cat(x1, *dilated, x5)
         x6 = self.conv2(x6)
         x6 = self.bn2(x6)
         x6 = self.relu(x6)
@@ -468,3 +463,186 @@ class SimpleAustinNet(ME.MinkowskiNetwork):
         out_cls = out_cls + x
         return out_cls
 
+
+
+class AustinUNet(ME.MinkowskiNetwork):
+    """按配置构建 AustinNet 风格的 U-Net
+
+    编码器每层为 卷积 -> BN -> 若干 Inception(I) / Pyramid(P) 块 -> ReLU（第一层卷积核为 5，其余为 3），
+    解码器自深向浅每步为 转置卷积 -> BN -> 块 -> ReLU，输出与上一层编码器特征拼接，最后一步与第一层相加。
+    SimpleAustinNet 对应 channels=(16, 32, 64)、decoder_channels=(32, 16)、layers='IPI'。
+
+    Args:
+        channels: 各层编码器通道数（层数即深度），均需为 4 的倍数
+        decoder_channels: 各解码步的输出通道数（自深向浅，共 depth - 1 个），缺省为对应跳连层的通道数；
+            最后一个必须等于 channels[0]
+        layers: 每层的块序列，如 'IPI'；可为所有层共用的字符串，或每层一个的列表
+        dilations: Pyramid 膨胀卷积分支的膨胀率（1 ~ 3 个）
+    """
+    BLOCKS = {'I': AustinInception, 'P': AustinPyramid}
+
+    def __init__(self,
+                 channels=(16, 32, 64),
+                 decoder_channels=None,
+                 layers='IPI',
+                 dilations=(6, 12, 18),
+                 in_channels=3,
+                 out_channels=3,
+                 bn_momentum=0.1,
+                 D=3):
+        ME.MinkowskiNetwork.__init__(self, D)
+        depth = len(channels)
+        assert depth >= 2
+        decoder_channels = list(decoder_channels or channels[-2::-1])
+        layers = [layers] * depth if isinstance(layers, str) else list(layers)
+        assert len(decoder_channels) == depth - 1 and decoder_channels[-1] == channels[0]
+        assert len(layers) == depth
+        self.dilations = tuple(dilations)
+
+        self.enc_convs, self.enc_norms, self.enc_blocks = nn.ModuleList(), nn.ModuleList(), nn.ModuleList()
+        for level in range(depth):
+            self.enc_convs.append(ME.MinkowskiConvolution(
+                in_channels=in_channels if level == 0 else channels[level - 1],
+                out_channels=channels[level],
+                kernel_size=5 if level == 0 else 3,
+                stride=1,
+                dilation=1,
+                bias=False,
+                dimension=D))
+            self.enc_norms.append(ME.MinkowskiBatchNorm(channels[level], momentum=bn_momentum))
+            self.enc_blocks.append(self.make_layer(layers[level], channels[level], bn_momentum, D))
+
+        self.dec_convs, self.dec_norms, self.dec_blocks = nn.ModuleList(), nn.ModuleList(), nn.ModuleList()
+        for step in range(depth - 1):
+            level = depth - 1 - step
+            self.dec_convs.append(ME.MinkowskiConvolutionTranspose(
+                in_channels=channels[-1] if step == 0 else channels[level] + decoder_channels[step - 1],
+                out_channels=decoder_channels[step],
+                kernel_size=3,
+                stride=1,
+                dilation=1,
+                bias=False,
+                dimension=D))
+            self.dec_norms.append(ME.MinkowskiBatchNorm(decoder_channels[step], momentum=bn_momentum))
+            self.dec_blocks.append(self.make_layer(layers[level - 1], decoder_channels[step], bn_momentum, D))
+
+        self.conv1_tr = ME.MinkowskiConvolution(
+            in_channels=channels[0],
+            out_channels=channels[0],
+            kernel_size=3,
+            stride=1,
+            dilation=1,
+            bias=False,
+            dimension=D)
+
+        self.final = ME.MinkowskiConvolution(
+            in_channels=channels[0],
+            out_channels=out_channels,
+            kernel_size=1,
+            stride=1,
+            dilation=1,
+            bias=True,
+            dimension=D)
+
+    def make_layer(self, pattern, channels, bn_momentum, D):
+        layers = []
+        for kind in pattern:
+            if kind == 'P':
+                layers.append(AustinPyramid(channels=channels, bn_momentum=bn_momentum, dimension=D,
+                                            dilations=self.dilations))
+            else:
+                layers.append(self.BLOCKS[kind](channels=channels, bn_momentum=bn_momentum, dimension=D))
+        return nn.Sequential(*layers)
+
+    def forward(self, x):
+        # 编码器路径，保留每层输出用于跳连
+        skips = []
+        out = x
+        for conv, norm, block in zip(self.enc_convs, self.enc_norms, self.enc_blocks):
+            out = block(norm(conv(out)))
+            skips.append(out)
+            out = MEF.relu(out)
+
+        # 解码器路径
+        for step, (conv, norm, block) in enumerate(zip(self.dec_convs, self.dec_norms, self.dec_blocks)):
+            out = MEF.relu(block(norm(conv(out))))
+            skip = skips[len(skips) - 2 - step]
+            out = ME.cat(out, skip) if step < len(self.dec_convs) - 1 else out + skip
+
+        out = self.conv1_tr(out)
+        out = MEF.relu(out)
+
+        out_cls = self.final(out)
+        out_cls = out_cls + x
+        return out_cls
+
+
+# 网络变体配置，可通过 train.py --model 选用
+VARIANTS = {
+    'UNet-simple': dict(channels=(16, 32, 64)),
+    'UNet-austin': dict(channels=(32, 32, 64, 128, 256), decoder_channels=(256, 128, 64, 32)),
+    'UNet-shallow': dict(channels=(16, 32)),
+    'UNet-IP': dict(channels=(16, 32, 64), layers='IP'),
+    'UNet-I': dict(channels=(16, 32, 64), layers='I'),
+    'UNet-narrow-dilation': dict(channels=(16, 32, 64), dilations=(2, 4, 6)),
+    'UNet-wide': dict(channels=(32, 64, 128)),
+}
+
+
+class CheckpointedSequential(nn.Sequential):
+    """训练时不保存内部激活、在反向时重算的 make_layer 阶段
+
+    阶段内的 Inception / Pyramid 块都是步长 1 的卷积，输出与输入共用坐标映射，
+    因此只需对特征矩阵做检查点，坐标映射与核映射在重算时复用。
+    ME 的自定义算子不经过 saved_tensors_hooks，所以使用 reentrant 模式（首次前向在 no_grad 下运行）；
+    重算时将 BN 的 momentum 暂时置 0，避免同一批次重复更新 running 统计量。
+    通过修改实例的 __class__ 启用，参数名与 state_dict 不变。
+    """
+
+    def forward(self, x):
+        if not (self.training and torch.is_grad_enabled()):
+            return super(CheckpointedSequential, self).forward(x)
+
+        calls = []
+
+        def run(features):
+            inputs = ME.SparseTensor(features=features, coordinate_map_key=x.coordinate_map_key,
+                                     coordinate_manager=x.coordinate_manager)
+            norms = [m.bn for m in self.modules() if isinstance(m, ME.MinkowskiBatchNorm)]
+            momentums = [bn.momentum for bn in norms]
+            if calls:
+                for bn in norms:
+                    bn.momentum = 0.0
+            try:
+                out = super(CheckpointedSequential, self).forward(inputs)
+            finally:
+                for bn, momentum in zip(norms, momentums):
+                    bn.momentum = momentum
+            calls.append(out.coordinate_map_key)
+            return out.F
+
+        features = checkpoint(run, x.F, use_reentrant=True)
+        return ME.SparseTensor(features=features, coordinate_map_key=calls[0],
+                               coordinate_manager=x.coordinate_manager)
+
+
+def checkpoint_stage_names(model):
+    """模型中可做检查点的 make_layer 阶段名"""
+    return [name for name, module in model.named_modules() if isinstance(module, nn.Sequential)]
+
+
+def set_checkpointing(model, stages=()):
+    """对指定的 make_layer 阶段启用激活检查点，其余阶段恢复正常；stages 为 'all' 时全部启用
+
+    Returns:
+        启用检查点的阶段名列表
+    """
+    names = checkpoint_stage_names(model)
+    selected = names if stages == 'all' or 'all' in stages else list(stages)
+    unknown = set(selected) - set(names)
+    if unknown:
+        raise ValueError(f"未知的阶段: {sorted(unknown)}，可选: {names}")
+    for name, module in model.named_modules():
+        if isinstance(module, nn.Sequential):
+            module.__class__ = CheckpointedSequential if name in selected else nn.Sequential
+    return selected
@@ -0,0 +1,132 @@
+import argparse
+import numpy as np
+from config import PC_ERROR_DIR, RESOLUTION
+
+
+def drop_duplicates(points):
+    """按坐标字典序排序并去除重复点，对应 pc_error 的 --dropdups=1"""
+    return np.unique(np.asarray(points), axis=0)
+
+
+def nearest_neighbors(points_a, points_b, k=1):
+    """对 A 中每个点在 B 中求 k 近邻，返回 (平方距离, B 中索引)"""
+    from scipy.spatial import cKDTree
+    tree = cKDTree(np.asarray(points_b, dtype=np.float64), balanced_tree=False, compact_nodes=False)
+    dist, idx = tree.query(np.asarray(points_a, dtype=np.float64), k=k, workers=-1)
+    return dist ** 2, idx
+
+
+def pair_points(points_a, points_b, dropdups=0):
+    """进程内计算 pc_error 的 A->B 点对
+
+    Args:
+        points_a: 遍历的点云（pc_error 的 fileA）
+        points_b: 搜索最近邻的点云（pc_error 的 fileB）
+        dropdups: 非 0 时两侧先去重，点序与 pc_error 去重后的 A[i] 一致
+
+    Returns:
+        (indices_a, paired_a, paired_b)，paired_b[i] 为 paired_a[i] 在 B 中的最近邻
+    """
+    if dropdups:
+        points_a, points_b = drop_duplicates(points_a), drop_duplicates(points_b)
+    points_a, points_b = np.asarray(points_a), np.asarray(points_b)
+    if len(points_a) == 0 or len(points_b) == 0:
+        empty = np.zeros((0, 3), dtype=points_b.dtype)
+        return np.zeros(0, dtype=np.int64), empty, empty
+    _, idx = nearest_neighbors(points_a, points_b)
+    return np.arange(len(points_a)), points_a, points_b[idx]
+
+
+def pair_blocks(blocks_a, blocks_b, dropdups=0):
+    """一次处理整帧的所有块对，结果与逐块调用 pair_points 相同
+
+    各块沿 x 轴平移到互不相交的区间后合并成一棵 KD 树，
+    块间距离大于任何块内距离，因此最近邻不会跨块。
+
+    Returns:
+        [(indices_a, paired_a, paired_b), ...]，与输入块一一对应
+    """
+    if dropdups:
+        blocks_a = [drop_duplicates(b) for b in blocks_a]
+        blocks_b = [drop_duplicates(b) for b in blocks_b]
+    blocks_a = [np.asarray(b) for b in blocks_a]
+    blocks_b = [np.asarray(b) for b in blocks_b]
+
+    results = [None] * len(blocks_a)
+    valid = [j for j, (a, b) in enumerate(zip(blocks_a, blocks_b)) if len(a) and len(b)]
+    if valid:
+        all_points = np.concatenate([blocks_a[j] for j in valid] + [blocks_b[j] for j in valid]).astype(np.float64)
+        spacing = 4 * (np.ptp(all_points, axis=0).max() + 1)
+
+        def stack(blocks):
+            shifted = [blocks[j].astype(np.float64) + np.array([k * spacing, 0, 0]) for k, j in enumerate(valid)]
+            return np.concatenate(shifted), np.cumsum([0] + [len(blocks[j]) for j in valid])
+
+        flat_a, bounds_a = stack(blocks_a)
+        flat_b, bounds_b = stack(blocks_b)
+        _, idx = nearest_neighbors(flat_a, flat_b)
+        for k, j in enumerate(valid):
+            local = idx[bounds_a[k]:bounds_a[k + 1]] - bounds_b[k]
+            results[j] = (np.arange(len(blocks_a[j])), blocks_a[j], blocks_b[j][local])
+
+    # 任一侧为空的块没有点对
+    for j, result in enumerate(results):
+        if result is None:
+            results[j] = pair_points(blocks_a[j], blocks_b[j])
+    return results
+
+
+def validate_against_pc_error(file_a, file_b, pc_error_path=PC_ERROR_DIR, dropdups=0, atol=1e-3, resolution=RESOLUTION):
+    """在样本块上对比进程内点对与 pc_error 输出
+
+    由于最近邻可能存在等距并列，比较的是 A 点坐标与最近邻距离，而不是 B 点本身。
+
+    Returns:
+        dict: 点对数量、坐标/距离不一致的点数
+    """
+    from utils import load_ply, stream_points
+    command = [
+        pc_error_path,
+        f"--fileA={file_a}",
+        f"--fileB={file_b}",
+        f"--resolution={resolution}",
+        "--color=0",
+        f"--dropdups={dropdups}",
+        "--singlePass=1"
+    ]
+    ref_indices, ref_a, ref_b = stream_points(command)
+
+    indices, paired_a, paired_b = pair_points(load_ply(file_a), load_ply(file_b), dropdups)
+    summary = {'native_pairs': len(indices), 'pc_error_pairs': len(ref_indices)}
+    if len(ref_indices) != len(indices) or not np.array_equal(ref_indices, indices):
+        summary['index_mismatch'] = True
+        return summary
+    # 紧凑整数坐标相减会回绕，先转为 float64
+    paired_a, paired_b = paired_a.astype(np.float64), paired_b.astype(np.float64)
+    ref_a, ref_b = np.asarray(ref_a, dtype=np.float64), np.asarray(ref_b, dtype=np.float64)
+    native_dist = np.sum((paired_a - paired_b) ** 2, axis=1)
+    ref_dist = np.sum((ref_a - ref_b) ** 2, axis=1)
+    summary['coord_mismatch'] = int(np.sum(np.any(np.abs(paired_a - ref_a) > atol, axis=1)))
+    summary['dist_mismatch'] = int(np.sum(np.abs(native_dist - ref_dist) > atol))
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="对比进程内最近邻点对与 pc_error 输出")
+    parser.add_argument("--fileA", required=True)
+    parser.add_argument("--fileB", required=True)
+    parser.add_argument("--dropdups", type=int, default=0)
+    parser.add_argument("--pc-error", default=PC_ERROR_DIR)
+    parser.add_argument("--resolution", type=int, default=RESOLUTION)
+    args = parser.parse_args()
+
+    summary = validate_against_pc_error(args.fileA, args.fileB, args.pc_error, args.dropdups,
+                                        resolution=args.resolution)
+    print(summary)
+    ok = not summary.get('index_mismatch') and summary['coord_mismatch'] == 0 and summary['dist_mismatch'] == 0
+    print("一致" if ok else "不一致")
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,265 @@
+import itertools
+import numpy as np
+
+# PLY 属性类型与 numpy 类型的对应关系
+PLY_TO_NUMPY = {
+    'char': 'i1', 'int8': 'i1',
+    'uchar': 'u1', 'uint8': 'u1',
+    'short': 'i2', 'int16': 'i2',
+    'ushort': 'u2', 'uint16': 'u2',
+    'int': 'i4', 'int32': 'i4',
+    'uint': 'u4', 'uint32': 'u4',
+    'float': 'f4', 'float32': 'f4',
+    'double': 'f8', 'float64': 'f8',
+}
+
+# 写出时使用的属性类型名（pc_error 与 open3d 均可识别）
+NUMPY_TO_PLY = {
+    'i1': 'char', 'u1': 'uchar',
+    'i2': 'short', 'u2': 'ushort',
+    'i4': 'int', 'u4': 'uint',
+    'f4': 'float', 'f8': 'double',
+}
+
+FORMAT_TO_ENDIAN = {
+    'binary_little_endian': '<',
+    'binary_big_endian': '>',
+}
+
+
+def read_header(f):
+    """解析PLY文件头
+
+    Returns:
+        (fmt, elements, header_size)，elements 为 [(name, count, [(prop, type), ...]), ...]，
+        列表属性的 type 为 None
+    """
+    if f.readline().strip() != b'ply':
+        raise ValueError("不是有效的PLY文件")
+    fmt = None
+    elements = []
+    while True:
+        line = f.readline()
+        if not line:
+            raise ValueError("PLY文件头不完整")
+        tokens = line.decode('ascii').split()
+        if not tokens or tokens[0] in ('comment', 'obj_info'):
+            continue
+        if tokens[0] == 'end_header':
+            break
+        if tokens[0] == 'format':
+            fmt = tokens[1]
+        elif tokens[0] == 'element':
+            elements.append((tokens[1], int(tokens[2]), []))
+        elif tokens[0] == 'property':
+            if tokens[1] == 'list':
+                elements[-1][2].append((tokens[-1], None))
+            else:
+                elements[-1][2].append((tokens[2], tokens[1]))
+    return fmt, elements, f.tell()
+
+
+def read_header_count(file_path, element='vertex'):
+    """只读文件头，返回指定元素的数量（不存在时返回 0）"""
+    with open(file_path, 'rb') as f:
+        _, elements, _ = read_header(f)
+    return next((count for name, count, _ in elements if name == element), 0)
+
+
+def _element_dtype(properties, endian):
+    """由属性列表构造结构化 dtype"""
+    if any(ptype is None for _, ptype in properties):
+        raise ValueError("二进制PLY中列表属性不在 vertex 之前时无法直接映射")
+    return np.dtype([(name, endian + PLY_TO_NUMPY[ptype]) for name, ptype in properties])
+
+
+def read_ply(file_path, mmap=True, fields=('x', 'y', 'z')):
+    """读取PLY顶点坐标（或 fields 指定的另外三个属性，如法向量 ('nx', 'ny', 'nz')），返回 (N, 3) 数组
+
+    二进制文件按文件头的属性布局直接映射（mmap=True 时使用 np.memmap，否则 np.frombuffer），
+    三个属性相邻且类型一致时返回零拷贝视图，dtype 与文件一致；ASCII 文件解析为 float64。
+    """
+    with open(file_path, 'rb') as f:
+        fmt, elements, header_size = read_header(f)
+
+        offset, skip_rows = header_size, 0
+        for name, count, properties in elements:
+            if name == 'vertex':
+                break
+            skip_rows += count
+            if fmt != 'ascii':
+                offset += count * _element_dtype(properties, '<').itemsize
+        else:
+            raise ValueError(f"{file_path} 中没有 vertex 元素")
+
+        if fmt == 'ascii':
+            for _ in range(skip_rows):
+                f.readline()
+            names = [prop for prop, _ in properties]
+            missing = [axis for axis in fields if axis not in names]
+            if missing:
+                raise ValueError(f"{file_path} 的 vertex 缺少属性 {missing}")
+            usecols = [names.index(axis) for axis in fields]
+            if count == 0:
+                return np.zeros((0, 3), dtype=np.float64)
+            points = np.loadtxt(f, dtype=np.float64, usecols=usecols, max_rows=count, ndmin=2)
+            return points.reshape(-1, 3)
+
+        if fmt not in FORMAT_TO_ENDIAN:
+            raise ValueError(f"不支持的PLY格式: {fmt}")
+        dtype = _element_dtype(properties, FORMAT_TO_ENDIAN[fmt])
+        missing = [axis for axis in fields if axis not in dtype.names]
+        if missing:
+            raise ValueError(f"{file_path} 的 vertex 缺少属性 {missing}")
+        if count == 0:
+            return np.zeros((0, 3), dtype=dtype[fields[0]])
+
+    if mmap:
+        buffer = np.memmap(file_path, dtype=np.uint8, mode='r', offset=offset, shape=(count * dtype.itemsize,))
+    else:
+        with open(file_path, 'rb') as f:
+            f.seek(offset)
+            buffer = np.frombuffer(f.read(count * dtype.itemsize), dtype=np.uint8)
+
+    fx, fy, fz = fields
+    coord_type = dtype[fx]
+    x_offset = dtype.fields[fx][1]
+    contiguous = (
+        dtype[fy] == coord_type and dtype[fz] == coord_type
+        and dtype.fields[fy][1] == x_offset + coord_type.itemsize
+        and dtype.fields[fz][1] == x_offset + 2 * coord_type.itemsize
+    )
+    if contiguous:
+        return np.ndarray(shape=(count, 3), dtype=coord_type, buffer=buffer,
+                          offset=x_offset, strides=(dtype.itemsize, coord_type.itemsize))
+
+    vertices = buffer.view(dtype)
+    return np.stack([vertices[fx], vertices[fy], vertices[fz]], axis=1)
+
+
+def iter_ply(file_path, chunk_points=1_000_000):
+    """分块读取PLY顶点坐标，每次产出至多 chunk_points 个点的 (n, 3) 数组，内存占用与文件大小无关
+
+    二进制文件按行直接读取对应字节，类型与文件一致；ASCII 文件逐块解析为 float64。
+    """
+    with open(file_path, 'rb') as f:
+        fmt, elements, header_size = read_header(f)
+        skip_rows, offset = 0, header_size
+        for name, count, properties in elements:
+            if name == 'vertex':
+                break
+            skip_rows += count
+            if fmt != 'ascii':
+                offset += count * _element_dtype(properties, '<').itemsize
+        else:
+            raise ValueError(f"{file_path} 中没有 vertex 元素")
+
+        if fmt == 'ascii':
+            for _ in range(skip_rows):
+                f.readline()
+            names = [prop for prop, _ in properties]
+            usecols = [names.index(axis) for axis in ('x', 'y', 'z')]
+            remaining = count
+            while remaining > 0:
+                lines = list(itertools.islice(f, min(chunk_points, remaining)))
+                if not lines:
+                    raise ValueError(f"{file_path} 的顶点数少于文件头声明的 {count}")
+                remaining -= len(lines)
+                yield np.loadtxt(lines, dtype=np.float64, usecols=usecols, ndmin=2).reshape(-1, 3)
+            return
+
+        if fmt not in FORMAT_TO_ENDIAN:
+            raise ValueError(f"不支持的PLY格式: {fmt}")
+        dtype = _element_dtype(properties, FORMAT_TO_ENDIAN[fmt])
+        f.seek(offset)
+        for start in range(0, count, chunk_points):
+            vertices = np.fromfile(f, dtype=dtype, count=min(chunk_points, count - start))
+            yield np.stack([vertices['x'], vertices['y'], vertices['z']], axis=1)
+
+
+def write_ply(points, file_path, binary=True, with_colors=False):
+    """写出点云坐标为PLY文件
+
+    Args:
+        points: (N, 3) 坐标数组，属性类型沿用数组的 dtype
+        file_path: 输出路径
+        binary: True 写二进制小端格式，False 写 ASCII
+        with_colors: 是否附加全零 uchar 颜色（兼容需要颜色属性的旧流程）
+    """
+    points = np.asarray(points)
+    if points.dtype.kind not in 'iuf':
+        points = points.astype(np.float64)
+    coord_type = points.dtype.newbyteorder('<')
+    ply_type = NUMPY_TO_PLY[coord_type.str[1:]]
+
+    header = [
+        'ply',
+        f"format {'binary_little_endian' if binary else 'ascii'} 1.0",
+        f"element vertex {len(points)}",
+        f"property {ply_type} x",
+        f"property {ply_type} y",
+        f"property {ply_type} z",
+    ]
+    if with_colors:
+        header += ['property uchar red', 'property uchar green', 'property uchar blue']
+    header.append('end_header')
+
+    with open(file_path, 'wb') as f:
+        f.write(('\n'.join(header) + '\n').encode('ascii'))
+        if binary:
+            if with_colors:
+                vertices = np.zeros(len(points), dtype=[('xyz', coord_type, 3), ('rgb', 'u1', 3)])
+                vertices['xyz'] = points
+            else:
+                vertices = np.ascontiguousarray(points, dtype=coord_type)
+            vertices.tofile(f)
+        else:
+            columns = points if not with_colors else np.hstack([points, np.zeros((len(points), 3), points.dtype)])
+            coord_fmt = '%d' if points.dtype.kind in 'iu' else ('%.9g' if points.dtype.itemsize == 4 else '%.17g')
+            np.savetxt(f, columns, fmt=[coord_fmt] * 3 + ['%d'] * (3 if with_colors else 0))
+
+
+class PlyWriter:
+    """流式写出二进制PLY：文件头按预先给定的点数写出，之后分批追加坐标
+
+    用于逐块输出整帧结果，内存占用只取决于单批数据。关闭时校验实际写出的点数。
+    """
+
+    def __init__(self, file_path, count, dtype=np.float32):
+        self.file_path = file_path
+        self.count = count
+        self.written = 0
+        self.dtype = np.dtype(dtype).newbyteorder('<')
+        ply_type = NUMPY_TO_PLY[self.dtype.str[1:]]
+        header = [
+            'ply',
+            'format binary_little_endian 1.0',
+            f"element vertex {count}",
+            f"property {ply_type} x",
+            f"property {ply_type} y",
+            f"property {ply_type} z",
+            'end_header',
+        ]
+        self._file = open(file_path, 'wb')
+        self._file.write(('\n'.join(header) + '\n').encode('ascii'))
+
+    def write(self, points):
+        points = np.ascontiguousarray(points, dtype=self.dtype).reshape(-1, 3)
+        if self.written + len(points) > self.count:
+            raise ValueError(f"写出点数超过文件头声明的 {self.count}")
+        points.tofile(self._file)
+        self.written += len(points)
+
+    def close(self):
+        self._file.close()
+        if self.written != self.count:
+            raise ValueError(f"{self.file_path} 写出 {self.written} 个点，与文件头声明的 {self.count} 不一致")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._file.close()
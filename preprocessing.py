@@ -1,86 +1,486 @@
 import os
 import re
-import torch
 import time
-import subprocess
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import numpy as np
-from config import COMPRESS_DIR, COMPRESS_BLOCK_DIR, ORIGIN_DIR, ORIGIN_BLOCK_DIR, PC_ERROR_DIR, NEW_ORIGIN_BLOCK_DIR, NEW_ORIGIN_ATOB_BLOCK_DIR
-from utils import load_ply, save_ply, get_file_pairs, extract_points, get_matching_paths
-
-def chunk_point_cloud_fixed_size(points, block_size=100, cube_size=1024, overlap=1, device='cuda'):
-    """将点云数据切分为固定大小的块"""
-    if torch.cuda.is_available():
-        device = 'cuda'
-    elif torch.backends.mps.is_available():  # For Apple Silicon
-        device = 'mps'
-    else:
-        device = 'cpu'
-    points = torch.tensor(points, device=device, dtype=torch.float32)
-    coords = points
+from config import COMPRESS_DIR, COMPRESS_BLOCK_DIR, ORIGIN_DIR, ORIGIN_BLOCK_DIR, PC_ERROR_DIR, NEW_ORIGIN_BLOCK_DIR, NEW_ORIGIN_ATOB_BLOCK_DIR, ORIGIN_BLOCK_STORE_DIR, COMPRESS_BLOCK_STORE_DIR, MANIFEST_DIR, CACHE_DIR, CACHE_MAX_BYTES, VOXEL_DIR, CUBE_SIZE, RESOLUTION, SPILL_DIR, COORD_DTYPE
+from utils import load_ply, save_ply, compact_coords, get_file_pairs, stream_points, get_matching_paths, parse_frame_name, Manifest
+from ply import read_header_count, iter_ply
+from block_store import BlockStore
+from catalog import get_catalog, NAME_PATTERN
+from cache import ResultCache
+from pairing import pair_blocks, pair_points, drop_duplicates
+from temporal import BlockHistory
+from voxelize import voxelize, voxel_path, save_voxels, source_digest
+
+def block_assignments(points, block_size, cube_size, overlap):
+    """一次性计算每个点所属的全部块
 
+    块原点为 arange(0, cube_size, stride) 的三维网格，点 c 落入块 k 当且仅当
+    k * stride <= c < k * stride + block_size，overlap 区域内的点会同时属于相邻块。
+
+    Returns:
+        (point_idx, block_ids, n_axis)，按 (块编号, 点索引) 升序排列，
+        块编号为 (kx * n_axis + ky) * n_axis + kz
+    """
     stride = block_size - overlap
-    x_range = torch.arange(0, cube_size, stride, device=device)
-    y_range = torch.arange(0, cube_size, stride, device=device)
-    z_range = torch.arange(0, cube_size, stride, device=device)
+    if stride <= 0:
+        raise ValueError(f"overlap ({overlap}) 必须小于 block_size ({block_size})")
+    n_axis = -(-cube_size // stride)  # 与 arange(0, cube_size, stride) 的长度一致
+    n = len(points)
+    if n == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, n_axis
+
+    # 整数坐标直接做整数运算，不生成 float64 临时数组
+    coords = np.asarray(points)
+    coords = coords.astype(np.int64) if coords.dtype.kind in 'iu' else coords.astype(np.float64)
+    k_max = (coords // stride).astype(np.int64)  # 满足 origin <= c 的最大块号
+    k_min = ((coords - block_size) // stride).astype(np.int64) + 1  # 满足 c < origin + block_size 的最小块号
+    reach = -(-block_size // stride)  # 单轴上一个点最多同时落入的块数
+    point_idx = np.arange(n, dtype=np.int64)
+
+    keys = []
+    for dx in range(reach):
+        for dy in range(reach):
+            for dz in range(reach):
+                k = k_max - np.array([dx, dy, dz])
+                valid = np.all((k >= k_min) & (k >= 0) & (k < n_axis), axis=1)
+                kv = k[valid]
+                block_ids = (kv[:, 0] * n_axis + kv[:, 1]) * n_axis + kv[:, 2]
+                keys.append(block_ids * n + point_idx[valid])
+
+    # 单次排序完成分组，块内保持原始点顺序
+    keys = np.sort(np.concatenate(keys))
+    return keys % n, keys // n, n_axis
+
+def chunk_point_cloud_sparse(points, block_size=100, cube_size=CUBE_SIZE, overlap=1):
+    """将点云切分为固定大小的块，只返回非空块
+
+    一次向量化计算所有点的块编号，再按块编号排序分组，代替逐块的全量掩码扫描。
+    整数坐标保持原类型（如 uint16），浮点坐标转为 float32。
+
+    Returns:
+        [(block_id, coords, origin), ...]，按块编号升序，块编号与 block_assignments 一致
+    """
+    points = _coords_array(points)
+    stride = block_size - overlap
+    point_idx, block_ids, n_axis = block_assignments(points, block_size, cube_size, overlap)
+    grouped = points[point_idx]
+    ids, starts = np.unique(block_ids, return_index=True)
+    ends = np.append(starts[1:], len(block_ids))
 
     blocks = []
-    for x in x_range:
-        for y in y_range:
-            for z in z_range:
-                mask = (
-                    (coords[:, 0] >= x) & (coords[:, 0] < x + block_size) &
-                    (coords[:, 1] >= y) & (coords[:, 1] < y + block_size) &
-                    (coords[:, 2] >= z) & (coords[:, 2] < z + block_size)
-                )
-                block_coords = coords[mask]
-                if len(block_coords) >= 0:
-                    blocks.append((block_coords.cpu().numpy(), (x.item(), y.item(), z.item())))
-                del block_coords
-                torch.cuda.empty_cache()
-    
-    print(f"总切块数: {len(blocks)}")
+    for b, start, end in zip(ids.tolist(), starts.tolist(), ends.tolist()):
+        kx, rem = divmod(b, n_axis * n_axis)
+        ky, kz = divmod(rem, n_axis)
+        blocks.append((b, grouped[start:end], (kx * stride, ky * stride, kz * stride)))
     return blocks
 
-def process_point_cloud_pair(file_A, file_B, block_size, cube_size):
-    """处理一对点云文件"""
+def chunk_point_cloud_fixed_size(points, block_size=100, cube_size=CUBE_SIZE, overlap=1, verbose=False):
+    """将点云数据切分为固定大小的块，返回网格中全部块（含空块）
+
+    在 chunk_point_cloud_sparse 的结果上补齐空块，返回 (coords, origin) 列表，顺序为 x、y、z 由外到内；
+    只需要非空块时直接用 chunk_point_cloud_sparse。verbose 时打印总切块数。
+    """
+    points = _coords_array(points)
+    stride = block_size - overlap
+    n_axis = -(-cube_size // stride)
+    occupied = {b: coords for b, coords, _ in chunk_point_cloud_sparse(points, block_size, cube_size, overlap)}
+    empty = points[:0]
+
+    blocks = []
+    for b in range(n_axis ** 3):
+        kx, rem = divmod(b, n_axis * n_axis)
+        ky, kz = divmod(rem, n_axis)
+        blocks.append((occupied.get(b, empty), (kx * stride, ky * stride, kz * stride)))
+
+    if verbose:
+        print(f"总切块数: {len(blocks)}")
+    return blocks
+
+def match_blocks(blocks_A, blocks_B):
+    """按块编号匹配两组 chunk_point_cloud_sparse 的结果，返回两侧都非空的 [(block_id, coords_A, coords_B, origin), ...]"""
+    lookup_B = {b: coords for b, coords, _ in blocks_B}
+    return [(b, coords_A, lookup_B[b], origin) for b, coords_A, origin in blocks_A if b in lookup_B]
+
+def _coords_array(points):
+    """整数坐标保持原类型，其余转为 float32"""
+    points = np.asarray(points)
+    return points if points.dtype.kind in 'iu' else points.astype(np.float32)
+
+def _spill_blocks(file_path, bucket_dir, block_size, cube_size, overlap, chunk_points, dtype):
+    """分块读取点云，按所属网格块把坐标追加到 <bucket_dir>/<块编号>.bin，返回 {块编号: 点数}
+
+    块内点序与整帧切块一致（按原始点顺序），内存占用只取决于 chunk_points。
+    """
+    os.makedirs(bucket_dir, exist_ok=True)
+    counts = {}
+    for chunk in iter_ply(file_path, chunk_points):
+        chunk = compact_coords(chunk)
+        if chunk.dtype.kind == 'f':
+            raise ValueError(f"{file_path} 含非整数坐标，流式切块只支持体素化点云")
+        point_idx, block_ids, _ = block_assignments(chunk, block_size, cube_size, overlap)
+        grouped = chunk[point_idx].astype(dtype)
+        ids, starts = np.unique(block_ids, return_index=True)
+        ends = np.append(starts[1:], len(block_ids))
+        for b, start, end in zip(ids.tolist(), starts.tolist(), ends.tolist()):
+            with open(os.path.join(bucket_dir, f"{b}.bin"), 'ab') as f:
+                grouped[start:end].tofile(f)
+            counts[b] = counts.get(b, 0) + end - start
+    return counts
+
+def stream_partition(file_A, file_B, block_size=160, cube_size=CUBE_SIZE, overlap=1, chunk_points=1_000_000,
+                     spill_dir=SPILL_DIR):
+    """流式网格切块：分块读取两个点云并分桶写到磁盘，再逐个产出两侧都非空的匹配块
+
+    结果与 chunk_point_cloud_sparse 对两个点云分别切块后按块编号匹配（match_blocks）相同，
+    但峰值内存只取决于 chunk_points 和单个块的大小，与整帧点数无关，适合 vox11/vox12 等大帧。
+
+    Yields:
+        (block_id, coords_A, coords_B, origin)，按块编号升序
+    """
+    # 分桶文件用 COORD_DTYPE（uint16 可容纳到 vox16 的坐标，vox10-vox12 都适用）；只有配置为更窄的类型时才改用 int32
+    dtype = np.dtype(COORD_DTYPE)
+    if cube_size - 1 > np.iinfo(dtype).max:
+        dtype = np.dtype(np.int32)
+    stride = block_size - overlap
+    n_axis = -(-cube_size // stride)
+    os.makedirs(spill_dir, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=spill_dir) as tmp_dir:
+        dirs = [os.path.join(tmp_dir, side) for side in ('A', 'B')]
+        counts = [_spill_blocks(path, d, block_size, cube_size, overlap, chunk_points, dtype)
+                  for path, d in zip((file_A, file_B), dirs)]
+        for b in sorted(counts[0].keys() & counts[1].keys()):
+            coords = []
+            for d in dirs:
+                path = os.path.join(d, f"{b}.bin")
+                coords.append(np.fromfile(path, dtype=dtype).reshape(-1, 3))
+                os.remove(path)
+            kx, rem = divmod(b, n_axis * n_axis)
+            ky, kz = divmod(rem, n_axis)
+            yield b, coords[0], coords[1], (kx * stride, ky * stride, kz * stride)
+
+def _morton_codes(points, bits):
+    """交织整数坐标的各位得到 Morton 码（同一位上 x 最高、z 最低）"""
+    coords = points.astype(np.uint64) if points.dtype.kind in 'iu' else np.floor(points).astype(np.uint64)
+    codes = np.zeros(len(coords), dtype=np.uint64)
+    for bit in range(bits):
+        for axis in range(3):
+            codes |= ((coords[:, axis] >> np.uint64(bit)) & np.uint64(1)) << np.uint64(3 * bit + 2 - axis)
+    return codes
+
+def octree_partition(points_A, points_B, max_points=20000, min_size=16, cube_size=CUBE_SIZE):
+    """对一对点云做匹配的自适应八叉树切块
+
+    两个点云按同一棵八叉树划分：节点内任一点云的点数超过 max_points 且子节点边长不小于 min_size 时
+    继续细分，两者都为空的节点直接丢弃，因此只在有点的空间内细分。
+    点按 Morton 码排序后每个八叉树节点都是连续区间，节点点数由二分查找得到，不需要逐点掩码。
+
+    Returns:
+        [(coords_A, coords_B, origin, size), ...]，按 Morton 顺序排列，块之间不重叠
+    """
+    bits = max(int(np.ceil(np.log2(cube_size))), 1)
+    sorted_points, sorted_codes = [], []
+    for points in (points_A, points_B):
+        points = _coords_array(points)
+        if len(points) and (points.min() < 0 or points.max() >= 2 ** bits):
+            raise ValueError(f"点坐标超出 [0, {2 ** bits}) 范围")
+        codes = _morton_codes(points, bits)
+        order = np.argsort(codes, kind='stable')
+        sorted_points.append(points[order])
+        sorted_codes.append(codes[order])
+
+    children = np.array([[(k >> 2) & 1, (k >> 1) & 1, k & 1] for k in range(8)], dtype=np.int64)
+    starts, origins, size = np.zeros(1, dtype=np.uint64), np.zeros((1, 3), dtype=np.int64), 2 ** bits
+    leaves = []
+    while len(starts):
+        span = np.uint64(size ** 3)
+        bounds = [(np.searchsorted(codes, starts), np.searchsorted(codes, starts + span)) for codes in sorted_codes]
+        counts = np.stack([end - begin for begin, end in bounds], axis=1)
+        occupied = counts.max(axis=1) > 0
+        split = occupied & (counts.max(axis=1) > max_points) & (size // 2 >= min_size)
+        for i in np.flatnonzero(occupied & ~split):
+            leaves.append((starts[i], [p[begin[i]:end[i]] for p, (begin, end) in zip(sorted_points, bounds)],
+                           tuple(int(v) for v in origins[i]), size))
+        size //= 2
+        starts = (starts[split][:, None] + np.arange(8, dtype=np.uint64) * np.uint64(size ** 3)).ravel()
+        origins = (origins[split][:, None, :] + children * size).reshape(-1, 3)
+
+    leaves.sort(key=lambda leaf: leaf[0])
+    return [(coords_A, coords_B, origin, size) for _, (coords_A, coords_B), origin, size in leaves]
+
+def process_point_cloud_pair(file_A, file_B, block_size, cube_size, store_A=None, store_B=None, partition='grid',
+                             max_points=20000, min_size=16, streaming=False, chunk_points=1_000_000):
+    """处理一对点云文件
+
+    默认将匹配的块逐个保存为PLY；传入 store_A/store_B (BlockStore) 时改为写入分片块存储。
+    partition='octree' 时改用 octree_partition 自适应切块（忽略 block_size），块编号为八叉树叶子的 Morton 序号。
+    streaming=True 时用 stream_partition 分块读取并经磁盘分桶，逐块产出、逐块保存，不把整帧读入内存
+    （只支持网格切块与逐块PLY输出，结果与非流式相同）。
+    返回 {'frame', 'blocks', 'points', 'outputs'} 统计。
+    """
     print('处理文件对：', file_A, file_B)
-    
-    # 加载点云
-    points_A = load_ply(os.path.join(ORIGIN_DIR, file_A))
-    points_B = load_ply(os.path.join(COMPRESS_DIR, file_B))
-    print(f"原始点云数量: {points_A.shape[0]}, 压缩点云数量: {points_B.shape[0]}")
 
-    # 切分点云
-    chunks_A = chunk_point_cloud_fixed_size(points_A, block_size, cube_size)
-    chunks_B = chunk_point_cloud_fixed_size(points_B, block_size, cube_size)
+    # 切分点云，得到 [(块编号, 块A, 块B, 原点), ...]
+    path_A, path_B = os.path.join(ORIGIN_DIR, file_A), os.path.join(COMPRESS_DIR, file_B)
+    if streaming:
+        if partition != 'grid' or store_A is not None:
+            raise ValueError("流式切块只支持网格切块与逐块PLY输出")
+        print(f"原始点云数量: {read_header_count(path_A)}, 压缩点云数量: {read_header_count(path_B)}")
+        # 逐块产出，整帧不进入内存
+        chunks = stream_partition(path_A, path_B, block_size, cube_size, chunk_points=chunk_points)
+    else:
+        # 加载点云
+        points_A, points_B = load_ply(path_A, compact=True), load_ply(path_B, compact=True)
+        print(f"原始点云数量: {points_A.shape[0]}, 压缩点云数量: {points_B.shape[0]}")
+
+        if partition == 'octree':
+            leaves = octree_partition(points_A, points_B, max_points, min_size, cube_size)
+            print(f"八叉树叶子块数: {len(leaves)}")
+            chunks = [(i, chunk_A, chunk_B, origin) for i, (chunk_A, chunk_B, origin, _) in enumerate(leaves)]
+        else:
+            chunks = match_blocks(chunk_point_cloud_sparse(points_A, block_size, cube_size),
+                                  chunk_point_cloud_sparse(points_B, block_size, cube_size))
+            print(f"网格匹配块数: {len(chunks)}")
 
     # 保存匹配的块
-    nums_a, nums_b = 0, 0
-    for i, ((chunk_A, index_A), (chunk_B, index_B)) in enumerate(zip(chunks_A, chunks_B)):
-        if index_A == index_B and len(chunk_B) > 0 and len(chunk_A) > 0:
+    nums_a, nums_b, num_blocks = 0, 0, 0
+    outputs = []
+    matched_A, matched_B = [], []
+    for i, chunk_A, chunk_B, origin in chunks:
+        if len(chunk_B) > 0 and len(chunk_A) > 0:
             nums_a += len(chunk_A)
             nums_b += len(chunk_B)
+            num_blocks += 1
             
+            if store_A is not None:
+                matched_A.append((i, chunk_A, origin))
+                matched_B.append((i, chunk_B, origin))
+                continue
+
             # 保存块
-            save_ply(chunk_A, os.path.join(ORIGIN_BLOCK_DIR, 
-                    f"{file_A.replace('.ply', '')}_block_{i}.ply"))
-            save_ply(chunk_B, os.path.join(COMPRESS_BLOCK_DIR, 
-                    f"{file_B.replace('.ply', '')}_block_{i}.ply"))
+            outputs.append(os.path.join(ORIGIN_BLOCK_DIR, f"{file_A.replace('.ply', '')}_block_{i}.ply"))
+            save_ply(chunk_A, outputs[-1])
+            outputs.append(os.path.join(COMPRESS_BLOCK_DIR, f"{file_B.replace('.ply', '')}_block_{i}.ply"))
+            save_ply(chunk_B, outputs[-1])
+
+    if store_A is not None:
+        outputs += store_A.add_frame(*parse_frame_name(file_A), matched_A)
+        outputs += store_B.add_frame(*parse_frame_name(file_B), matched_B)
     
     print(f"切块后总点数：原始 {nums_a}, 压缩 {nums_b}")
+    return {'frame': file_B, 'blocks': num_blocks, 'points': nums_a + nums_b, 'outputs': outputs}
+
+def run_units(units, worker, manifest, workers=1, cache=None, keys=None):
+    """在进程池上执行任务，完成的任务立即写入清单，中断后重跑会跳过已完成的任务
+
+    Args:
+        units: {unit_id: worker 参数元组}
+        worker: 顶层函数，返回 {'frame', 'blocks', 'points', 'outputs'}
+        manifest: Manifest 任务清单
+        workers: 进程数，<= 1 时在当前进程顺序执行
+        cache: ResultCache，给定时以内容哈希键 keys[unit_id] 判断是否跳过，代替清单
+        keys: {unit_id: 缓存键}
 
-def process_all_point_clouds(block_size=160, cube_size=1024):
-    """处理所有点云文件"""
+    Returns:
+        失败的 unit_id 列表（未写入清单，下次运行会重试）
+    """
+    if cache is not None:
+        pending = {unit_id: args for unit_id, args in units.items() if not cache.lookup(keys[unit_id])}
+    else:
+        pending = {unit_id: args for unit_id, args in units.items() if not manifest.is_done(unit_id)}
+    print(f"共 {len(units)} 个任务，跳过已完成 {len(units) - len(pending)} 个")
+
+    frames, blocks, points = set(), 0, 0
+    failed = []
+    start = time.perf_counter()
+
+    def finish(unit_id, stats):
+        nonlocal blocks, points
+        outputs = stats.pop('outputs', [])
+        if cache is not None:
+            cache.store(keys[unit_id], outputs)
+            cache.maybe_save()
+        manifest.mark_done(unit_id, stats)
+        frames.add(stats['frame'])
+        blocks += stats['blocks']
+        points += stats['points']
+
+    try:
+        if workers <= 1:
+            for unit_id, args in pending.items():
+                try:
+                    finish(unit_id, worker(*args))
+                except Exception as e:
+                    print(f"任务 {unit_id} 失败: {e}")
+                    failed.append(unit_id)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {pool.submit(worker, *args): unit_id for unit_id, args in pending.items()}
+                for future in as_completed(futures):
+                    unit_id = futures[future]
+                    try:
+                        finish(unit_id, future.result())
+                    except Exception as e:
+                        print(f"任务 {unit_id} 失败: {e}")
+                        failed.append(unit_id)
+    finally:
+        # 中断时也写出已完成任务的缓存记录
+        if cache is not None:
+            cache.save()
+
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    print(f"完成 {len(pending) - len(failed)} 个任务，失败 {len(failed)} 个，耗时 {elapsed:.1f}s")
+    print(f"吞吐: {len(frames) / elapsed:.2f} 帧/s, {blocks / elapsed:.1f} 块/s, {points / elapsed:.0f} 点/s")
+    return failed
+
+def partition_unit(file_A, file_B, block_size, cube_size, use_store, partition='grid', max_points=20000,
+                   min_size=16, streaming=False, chunk_points=1_000_000):
+    """切块任务：处理一对帧"""
+    store_A = BlockStore(ORIGIN_BLOCK_STORE_DIR) if use_store else None
+    store_B = BlockStore(COMPRESS_BLOCK_STORE_DIR) if use_store else None
+    return process_point_cloud_pair(file_A, file_B, block_size, cube_size, store_A, store_B, partition, max_points,
+                                    min_size, streaming, chunk_points)
+
+def process_all_point_clouds(block_size=160, cube_size=CUBE_SIZE, use_store=False, workers=1, use_cache=True,
+                             partition='grid', max_points=20000, min_size=16, streaming=False,
+                             chunk_points=1_000_000):
+    """处理所有点云文件
+
+    Args:
+        use_store: True 时写入分片块存储（ORIGIN_BLOCK_STORE_DIR / COMPRESS_BLOCK_STORE_DIR），
+            可再用 BlockStore.export_ply 导出为原有的逐块PLY布局
+        workers: 并行进程数
+        use_cache: 输入内容与参数未变且输出完好的帧对直接跳过
+        partition: 'grid' 固定网格切块；'octree' 自适应八叉树切块（每块最多 max_points 点，最小边长 min_size）
+        streaming: 流式切块，每次只读 chunk_points 个点，经 SPILL_DIR 分桶（输出与非流式相同，共用清单与缓存）
+    """
     # 确保输出目录存在
     os.makedirs(ORIGIN_BLOCK_DIR, exist_ok=True)
     os.makedirs(COMPRESS_BLOCK_DIR, exist_ok=True)
     
     # 获取文件对并处理
     file_pairs = get_file_pairs(ORIGIN_DIR, COMPRESS_DIR)
-    for file_A, file_B in file_pairs:
-        process_point_cloud_pair(file_A, file_B, block_size, cube_size)
+    units = {f"{file_A}|{file_B}": (file_A, file_B, block_size, cube_size, use_store, partition, max_points, min_size,
+                                        streaming, chunk_points)
+             for file_A, file_B in file_pairs}
+    layout = f"octree_p{max_points}_m{min_size}" if partition == 'octree' else f"b{block_size}"
+    manifest = Manifest(os.path.join(
+        MANIFEST_DIR, f"partition_{layout}_c{cube_size}{'_store' if use_store else ''}.jsonl"))
+
+    cache, keys = (ResultCache(CACHE_DIR), {}) if use_cache else (None, None)
+    if cache is not None:
+        for unit_id, (file_A, file_B, *_) in units.items():
+            keys[unit_id] = cache.make_key(
+                'partition', [os.path.join(ORIGIN_DIR, file_A), os.path.join(COMPRESS_DIR, file_B)],
+                block_size=block_size, cube_size=cube_size, overlap=1, use_store=use_store,
+                **({'partition': partition, 'max_points': max_points, 'min_size': min_size}
+                   if partition == 'octree' else {}))
+    failed = run_units(units, partition_unit, manifest, workers, cache, keys)
+    if cache is not None:
+        cache.save()
+    return failed
+
+def pair_block_pc_error(file_a, reconstructed_path, uncompressed_path, save_dir, pc_error_path, isAtoB=False,
+                        resolution=RESOLUTION):
+    """调用 pc_error 计算单个块的点对并保存，返回点对数量"""
+    print(f"Matching: {uncompressed_path} <-> {reconstructed_path}")
+    fileA = uncompressed_path if isAtoB else reconstructed_path
+    fileB = reconstructed_path if isAtoB else uncompressed_path
+    dropdups = 1 if isAtoB else 0
+    command = [
+        pc_error_path,
+        f"--fileA={fileA}",
+        f"--fileB={fileB}",
+        f"--resolution={resolution}",
+        "--color=0",
+        f"--dropdups={dropdups}",
+        "--singlePass=1"
+    ]
+    indices, _, paired_b = stream_points(command, expected=read_header_count(fileA))
+    
+    if len(indices) == 0:
+        return 0
+
+    # 与 pc_error 的 A 索引对齐，缺失的索引保持为 0
+    paired_b = compact_coords(paired_b)
+    if indices[-1] + 1 == len(indices):
+        points_b = paired_b
+    else:
+        points_b = np.zeros((indices[-1] + 1, 3), dtype=paired_b.dtype)
+        points_b[indices] = paired_b
+
+    save_ply(points_b, os.path.join(save_dir, file_a))
+    print(f"Saved new_origin file {file_a} successfully")
+    return len(indices)
+
+def pair_unit(items, save_dir, pc_error_path, isAtoB, engine, resolution=RESOLUTION):
+    """配对任务：native 引擎一次处理整帧的块，pc_error 引擎处理单个块
+
+    Args:
+        items: [(file_a, reconstructed_path, uncompressed_path), ...]
+    """
+    frame = re.search(r'rec_(\d{4})', items[0][0]).group(1)
+    if engine != 'native':
+        points, outputs = 0, []
+        for item in items:
+            count = pair_block_pc_error(*item, save_dir, pc_error_path, isAtoB, resolution)
+            if count:
+                points += count
+                outputs.append(os.path.join(save_dir, item[0]))
+        return {'frame': frame, 'blocks': len(items), 'points': points, 'outputs': outputs}
+
+    blocks_rec = [load_ply(reconstructed_path, compact=True) for _, reconstructed_path, _ in items]
+    blocks_unc = [load_ply(uncompressed_path, compact=True) for _, _, uncompressed_path in items]
+    blocks_a, blocks_b = (blocks_unc, blocks_rec) if isAtoB else (blocks_rec, blocks_unc)
+
+    points, outputs = 0, []
+    for (file_a, _, _), (_, _, paired_b) in zip(items, pair_blocks(blocks_a, blocks_b, 1 if isAtoB else 0)):
+        if len(paired_b) == 0:
+            continue
+        outputs.append(os.path.join(save_dir, file_a))
+        save_ply(paired_b, outputs[-1])
+        points += len(paired_b)
+    print(f"帧 {frame}: 保存 {len(outputs)} 个 new_origin 块")
+    return {'frame': frame, 'blocks': len(outputs), 'points': points, 'outputs': outputs}
+
+def temporal_pair_unit(frames, save_dir, isAtoB, max_change):
+    """时序配对任务：按帧号顺序处理一个序列，占用未变或变化很小的块复用上一帧的点对
+
+    Args:
+        frames: [[(file_a, reconstructed_path, uncompressed_path), ...], ...]，按帧号升序
+    """
+    history = BlockHistory(max_change)
+    points, outputs = 0, []
+    start = time.perf_counter()
+    for items in frames:
+        for file_a, reconstructed_path, uncompressed_path in items:
+            block_rec, block_unc = load_ply(reconstructed_path, compact=True), load_ply(uncompressed_path, compact=True)
+            block_a, block_b = (block_unc, block_rec) if isAtoB else (block_rec, block_unc)
+            if isAtoB:
+                block_a, block_b = drop_duplicates(block_a), drop_duplicates(block_b)
+            if len(block_a) == 0 or len(block_b) == 0:
+                continue
+            block_id = int(NAME_PATTERN.match(file_a).group(3))
+            paired_b = history.process(block_id, block_a, lambda mask: pair_points(block_a[mask], block_b)[2],
+                                       context=block_b)
+            outputs.append(os.path.join(save_dir, file_a))
+            save_ply(paired_b, outputs[-1])
+            points += len(paired_b)
+        history.next_frame()
+
+    stats = history.summary()
+    sequence = NAME_PATTERN.match(frames[0][0][0]).group(1)
+    print(f"序列 {sequence}: {len(frames)} 帧, 块复用率 {stats['hit_rate']:.1%}（完全相同 {stats['exact']} 块）, "
+          f"复用 {stats['reused_points']}/{stats['points']} 点, 估计节省 {stats['time_saved']:.2f}s, "
+          f"实际 {time.perf_counter() - start:.2f}s")
+    return {'frame': sequence, 'blocks': len(outputs), 'points': points, 'outputs': outputs}
 
-def process_point_clouds(origin_dir, compress_dir, save_dir, pc_error_path,isAtoB=False):
+def process_point_clouds(origin_dir, compress_dir, save_dir, pc_error_path,isAtoB=False, engine='native', workers=1,
+                         use_cache=True, temporal=False, max_change=0.0, resolution=RESOLUTION):
     """处理点云配对和保存
     
     Args:
@@ -89,65 +489,186 @@ def process_point_clouds(origin_dir, compress_dir, save_dir, pc_error_path,isAto
         save_dir: 保存结果的目录
         pc_error_path: pc_error可执行文件路径
         isAtoB: 是否是AtoB
+        engine: 'native' 进程内按帧批量求最近邻；'pc_error' 逐块调用 pc_error 子进程
+        workers: 并行进程数
+        use_cache: 输入块内容与参数未变且输出完好的任务直接跳过；运行结束后按
+            CACHE_MAX_BYTES 淘汰最久未用的点对输出
+        temporal: 以序列为任务单位按帧顺序处理，复用相邻帧中未变化块的点对（仅 native 引擎）
+        max_change: 时序复用允许的块占用变化比例，0 表示只复用完全相同的块
+        resolution: 传给 pc_error 的 --resolution（仅 pc_error 引擎）
     """
-    for file_a in os.listdir(compress_dir):
+    if temporal and engine != 'native':
+        raise ValueError("时序复用只支持 native 引擎")
+    os.makedirs(save_dir, exist_ok=True)
+
+    # native 引擎以帧为任务单位，pc_error 引擎以块为任务单位
+    units = {}
+    get_catalog(origin_dir, refresh=True)
+    compress_catalog = get_catalog(compress_dir, refresh=True)
+    for file_a in compress_catalog.blocks():
         try:
             reconstructed_path, uncompressed_path = get_matching_paths(file_a, origin_dir, compress_dir)
-            print(f"Matching: {uncompressed_path} <-> {reconstructed_path}")
-            fileA = uncompressed_path if isAtoB else reconstructed_path
-            fileB = reconstructed_path if isAtoB else uncompressed_path
-            dropdups = 1 if isAtoB else 0
-            command = [
-                pc_error_path,
-                f"--fileA={fileA}",
-                f"--fileB={fileB}",
-                "--resolution=1023",
-                "--color=0",
-                f"--dropdups={dropdups}",
-                "--singlePass=1"
-            ]
-            result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, check=True)
-            point_pairs = extract_points(result.stdout)
-            
-            if not point_pairs:
-                continue
+        except FileNotFoundError as e:
+            print(f"Matching error: {e}")
+            continue
+        entry = compress_catalog.entries[file_a]
+        if temporal:
+            unit_id = entry['sequence']
+        else:
+            unit_id = f"{entry['frame']:04d}" if engine == 'native' else file_a
+        units.setdefault(unit_id, []).append((file_a, reconstructed_path, uncompressed_path))
 
-            max_index = max(point_pairs.keys())
-            points_a = np.zeros((max_index + 1, 3))
-            points_b = np.zeros((max_index + 1, 3))
+    if temporal:
+        for unit_id, items in units.items():
+            frames = {}
+            for item in items:
+                frames.setdefault(compress_catalog.entries[item[0]]['frame'], []).append(item)
+            units[unit_id] = ([frames[frame] for frame in sorted(frames)], save_dir, isAtoB, max_change)
+        worker = temporal_pair_unit
+    else:
+        units = {unit_id: (items, save_dir, pc_error_path, isAtoB, engine, resolution) for unit_id, items in units.items()}
+        worker = pair_unit
+    mode = f"temporal{max_change:g}" if temporal else engine
+    manifest = Manifest(os.path.join(
+        MANIFEST_DIR, f"pair_{os.path.basename(os.path.dirname(save_dir))}_{mode}.jsonl"))
 
-            for i, (point_a, point_b) in point_pairs.items():
-                points_a[i] = point_a
-                points_b[i] = point_b
-                print(f"Point pair: {point_a} <-> {point_b}")
+    cache, keys = (ResultCache(CACHE_DIR), {}) if use_cache else (None, None)
+    if cache is not None:
+        for unit_id, (items, *_) in units.items():
+            if temporal:
+                items = [item for frame_items in items for item in frame_items]
+            inputs = [path for _, reconstructed_path, uncompressed_path in items
+                      for path in (reconstructed_path, uncompressed_path)]
+            params = {'temporal': True, 'max_change': max_change} if temporal else {}
+            if engine == 'pc_error':
+                params['resolution'] = resolution
+            keys[unit_id] = cache.make_key(
+                'pair', inputs, isAtoB=isAtoB, dropdups=1 if isAtoB else 0, engine=engine,
+                save_dir=os.path.abspath(save_dir), **params)
+    failed = run_units(units, worker, manifest, workers, cache, keys)
+    if cache is not None:
+        freed = cache.evict(CACHE_MAX_BYTES, kind='pair')
+        if freed:
+            print(f"缓存淘汰: 释放 {freed / 1e6:.1f} MB")
+        cache.save()
+    return failed
 
-            save_ply(points_b, os.path.join(save_dir, file_a))
-            print(f"Saved new_origin file {file_a} successfully")
+def voxelize_unit(items, voxel_dir, store_dir=None):
+    """体素化任务：量化并去重一帧的 compress 块，每块保存为 <voxel_dir>/<块名>.npz
 
-        except FileNotFoundError as e:
-            print(f"Matching error: {e}")
-        except subprocess.CalledProcessError as e:
-            print(f"Processing error for {file_a}: {e.stderr}")
-        except Exception as e:
-            print(f"Unexpected error processing {file_a}: {str(e)}")
+    Args:
+        items: [(块名, 块PLY路径或分片块存储中的 (sequence, frame, block_id)), ...]
+    """
+    store = BlockStore(store_dir) if store_dir is not None else None
+    points, voxels, outputs = 0, 0, []
+    for name, source in items:
+        block = store.get(*source) if store is not None else load_ply(source, compact=True)
+        result = voxelize(block)
+        outputs.append(voxel_path(voxel_dir, name))
+        save_voxels(outputs[-1], result, source_digest(block))
+        points += len(result['inverse'])
+        voxels += len(result['coords'])
+    frame = NAME_PATTERN.match(items[0][0]).group(2)
+    print(f"帧 {frame}: {len(items)} 块, {points} 点 -> {voxels} 体素（重复点 {points - voxels}）")
+    return {'frame': frame, 'blocks': len(items), 'points': points, 'outputs': outputs}
+
+def process_voxels(compress_dir=COMPRESS_BLOCK_DIR, voxel_dir=VOXEL_DIR, store_dir=None, workers=1, use_cache=True):
+    """将 compress 块量化到单位体素网格并去重，结果供训练直接读取
+
+    体素大小固定为 1，与数据集现场体素化和 inference.make_predictor 一致；
+    每个结果记录输入块的摘要，块重新切分后数据集会发现并改为现场计算。
+
+    Args:
+        store_dir: 给定时从分片块存储读取 compress 块，而不是 compress_dir 下的逐块PLY
+        use_cache: 输入块内容未变且输出完好的帧直接跳过
+    """
+    os.makedirs(voxel_dir, exist_ok=True)
+    units, inputs = {}, {}
+    if store_dir is None:
+        catalog = get_catalog(compress_dir, refresh=True)
+        for name in catalog.blocks():
+            entry = catalog.entries[name]
+            unit_id = f"{entry['sequence']}_{entry['frame']:04d}"
+            units.setdefault(unit_id, []).append((name, catalog.path(name)))
+            inputs.setdefault(unit_id, []).append(catalog.path(name))
+    else:
+        store = BlockStore(store_dir)
+        for (sequence, frame, block_id), entry in sorted(store.entries.items()):
+            unit_id = f"{sequence}_{frame:04d}"
+            units.setdefault(unit_id, []).append((f"{unit_id}_block_{block_id}.ply", (sequence, frame, block_id)))
+            inputs[unit_id] = [os.path.join(store_dir, f"{entry['shard']}.npy")]
+
+    units = {unit_id: (items, voxel_dir, store_dir) for unit_id, items in units.items()}
+    manifest = Manifest(os.path.join(
+        MANIFEST_DIR, f"voxelize_{os.path.basename(os.path.normpath(voxel_dir))}"
+                      f"{'_store' if store_dir is not None else ''}.jsonl"))
+
+    cache, keys = (ResultCache(CACHE_DIR), {}) if use_cache else (None, None)
+    if cache is not None:
+        for unit_id in units:
+            keys[unit_id] = cache.make_key('voxelize', inputs[unit_id], voxel_dir=os.path.abspath(voxel_dir),
+                                           format='source')
+    failed = run_units(units, voxelize_unit, manifest, workers, cache, keys)
+    if cache is not None:
+        cache.save()
+    return failed
 
 def main():
-    # process_all_point_clouds(block_size=160, cube_size=1024)
-
-    # process_point_clouds(
-    #     origin_dir=ORIGIN_BLOCK_DIR,
-    #     compress_dir=COMPRESS_BLOCK_DIR,
-    #     save_dir=NEW_ORIGIN_BLOCK_DIR,
-    #     pc_error_path=PC_ERROR_DIR
-    # )
-
-        process_point_clouds(
-        origin_dir=ORIGIN_BLOCK_DIR,
-        compress_dir=COMPRESS_BLOCK_DIR,
-        save_dir=NEW_ORIGIN_ATOB_BLOCK_DIR,
-        pc_error_path=PC_ERROR_DIR,
-        isAtoB=True
-    )
+    parser = argparse.ArgumentParser(description="点云数据预处理")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    partition = subparsers.add_parser("partition", help="将 origin/compress 帧切块")
+    partition.add_argument("--block-size", type=int, default=160)
+    partition.add_argument("--cube-size", type=int, default=CUBE_SIZE)
+    partition.add_argument("--store", action="store_true", help="写入分片块存储而不是逐块PLY")
+    partition.add_argument("--octree", action="store_true", help="自适应八叉树切块，只细分有点的空间")
+    partition.add_argument("--max-points", type=int, default=20000, help="八叉树每块最多点数")
+    partition.add_argument("--min-size", type=int, default=16, help="八叉树块的最小边长")
+    partition.add_argument("--streaming", action="store_true",
+                           help="流式切块：分块读取并经磁盘分桶，内存与帧大小无关（只支持网格切块与逐块PLY）")
+    partition.add_argument("--chunk-points", type=int, default=1_000_000, help="流式切块每次读取的点数")
+    partition.add_argument("--workers", type=int, default=os.cpu_count())
+    partition.add_argument("--no-cache", action="store_true", help="不使用内容哈希缓存，仅按任务清单跳过已完成的任务")
+
+    pair = subparsers.add_parser("pair", help="计算 compress 块与 origin 块的最近邻点对")
+    pair.add_argument("--atob", action="store_true", help="A->B 方向（origin 遍历，dropdups=1）")
+    pair.add_argument("--engine", choices=["native", "pc_error"], default="native")
+    pair.add_argument("--resolution", type=int, default=RESOLUTION, help="pc_error 的 --resolution（通常为网格边长 - 1）")
+    pair.add_argument("--workers", type=int, default=os.cpu_count())
+    pair.add_argument("--no-cache", action="store_true", help="不使用内容哈希缓存，仅按任务清单跳过已完成的任务")
+    pair.add_argument("--temporal", action="store_true", help="按序列顺序处理，复用相邻帧中未变化块的点对")
+    pair.add_argument("--max-change", type=float, default=0.0, help="时序复用允许的块占用变化比例")
+
+    voxel = subparsers.add_parser("voxelize", help="将 compress 块量化到体素网格并去重（训练与推理的网络输入）")
+    voxel.add_argument("--store", action="store_true", help="从分片块存储读取 compress 块")
+    voxel.add_argument("--workers", type=int, default=os.cpu_count())
+    voxel.add_argument("--no-cache", action="store_true", help="不使用内容哈希缓存，仅按任务清单跳过已完成的任务")
+
+    args = parser.parse_args()
+    if args.command == "partition" and args.streaming and (args.octree or args.store):
+        parser.error("--streaming 只支持网格切块与逐块PLY输出，不能与 --octree / --store 同用")
+    if args.command == "voxelize":
+        failed = process_voxels(COMPRESS_BLOCK_DIR, VOXEL_DIR, COMPRESS_BLOCK_STORE_DIR if args.store else None,
+                                args.workers, not args.no_cache)
+    elif args.command == "partition":
+        failed = process_all_point_clouds(args.block_size, args.cube_size, args.store, args.workers, not args.no_cache,
+                                          'octree' if args.octree else 'grid', args.max_points, args.min_size,
+                                          args.streaming, args.chunk_points)
+    else:
+        failed = process_point_clouds(
+            origin_dir=ORIGIN_BLOCK_DIR,
+            compress_dir=COMPRESS_BLOCK_DIR,
+            save_dir=NEW_ORIGIN_ATOB_BLOCK_DIR if args.atob else NEW_ORIGIN_BLOCK_DIR,
+            pc_error_path=PC_ERROR_DIR,
+            isAtoB=args.atob,
+            engine=args.engine,
+            workers=args.workers,
+            use_cache=not args.no_cache,
+            temporal=args.temporal,
+            max_change=args.max_change,
+            resolution=args.resolution
+        )
+    raise SystemExit(1 if failed else 0)
 
 
     
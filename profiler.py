@@ -0,0 +1,223 @@
+import json
+import time
+import argparse
+from collections import defaultdict
+import numpy as np
+import torch
+from utils import rss_bytes
+
+
+def _features(x):
+    """取稀疏张量的特征矩阵（普通张量原样返回），其他类型返回 None"""
+    if hasattr(x, 'F'):
+        return x.F
+    return x if isinstance(x, torch.Tensor) else None
+
+
+class LayerProfiler:
+    """逐层计时与内存记录（按需挂载，未挂载时没有任何开销）
+
+    对网络中每个子模块记录前向/反向的耗时、输入/输出点数与通道数，以及前后的已分配内存
+    （CUDA 上为 torch.cuda.memory_allocated，CPU 上为进程常驻内存）。
+    前向用 forward_pre/forward hook 计时；反向在输出特征与输入特征上注册梯度 hook，
+    从输出梯度到达到输入梯度算出的间隔即该模块的反向耗时（原地修改输入的模块不计反向）。
+    挂载期间 ME.cat 也会被计时，用于观察跳连拼接的开销。
+
+    用法：
+        with LayerProfiler(model) as prof:
+            loss = ...; loss.backward()
+        prof.save_json('profile.json'); prof.save_chrome_trace('profile.trace.json')
+    """
+
+    def __init__(self, model, record_memory=True):
+        self.model = model
+        self.record_memory = record_memory
+        self.events = []
+        self._handles = []
+        self._stack = {}
+        self._origin = time.perf_counter()
+        self._cat = None
+
+    def _now(self, x=None):
+        features = _features(x)
+        if features is not None and features.is_cuda:
+            torch.cuda.synchronize(features.device)
+        return time.perf_counter()
+
+    def _memory(self, x=None):
+        if not self.record_memory:
+            return 0
+        features = _features(x)
+        if features is not None and features.is_cuda:
+            return torch.cuda.memory_allocated(features.device)
+        return rss_bytes()
+
+    def _record(self, name, phase, start, end, inputs, output, mem_before, mem_after):
+        in_features = _features(inputs[0]) if inputs else None
+        out_features = _features(output)
+        self.events.append({
+            'name': name,
+            'phase': phase,
+            'start': start - self._origin,
+            'duration': end - start,
+            'in_points': int(in_features.shape[0]) if in_features is not None else None,
+            'in_channels': int(in_features.shape[1]) if in_features is not None and in_features.dim() > 1 else None,
+            'out_points': int(out_features.shape[0]) if out_features is not None else None,
+            'out_channels': int(out_features.shape[1]) if out_features is not None and out_features.dim() > 1 else None,
+            'memory_before': mem_before,
+            'memory_after': mem_after,
+        })
+
+    def _pre_hook(self, name):
+        def hook(module, inputs):
+            x = inputs[0] if inputs else None
+            self._stack.setdefault(name, []).append((self._now(x), self._memory(x)))
+        return hook
+
+    def _post_hook(self, name):
+        def hook(module, inputs, output):
+            start, mem_before = self._stack[name].pop()
+            self._record(name, 'forward', start, self._now(output), inputs, output, mem_before, self._memory(output))
+
+            in_features, out_features = _features(inputs[0]) if inputs else None, _features(output)
+            if (not torch.is_grad_enabled() or out_features is None or not out_features.requires_grad
+                    or in_features is None or not in_features.requires_grad
+                    or in_features.data_ptr() == out_features.data_ptr()):
+                return
+            backward = {}
+
+            def on_output_grad(grad):
+                backward['start'] = self._now(grad)
+                backward['memory'] = self._memory(grad)
+
+            def on_input_grad(grad):
+                if 'start' in backward:
+                    self._record(name, 'backward', backward['start'], self._now(grad), [grad], grad,
+                                 backward['memory'], self._memory(grad))
+
+            out_features.register_hook(on_output_grad)
+            in_features.register_hook(on_input_grad)
+        return hook
+
+    def _timed_cat(self, cat):
+        def timed(*tensors, **kwargs):
+            start, mem_before = self._now(tensors[0]), self._memory(tensors[0])
+            output = cat(*tensors, **kwargs)
+            self._record('ME.cat', 'forward', start, self._now(output), tensors, output, mem_before,
+                         self._memory(output))
+            return output
+        return timed
+
+    def attach(self):
+        for name, module in self.model.named_modules():
+            if not name:
+                continue
+            self._handles.append(module.register_forward_pre_hook(self._pre_hook(name)))
+            self._handles.append(module.register_forward_hook(self._post_hook(name)))
+        try:
+            import MinkowskiEngine as ME
+        except ImportError:
+            return self
+        self._cat = ME.cat
+        ME.cat = self._timed_cat(self._cat)
+        return self
+
+    def detach(self):
+        for handle in self._handles:
+            handle.remove()
+        self._handles = []
+        if self._cat is not None:
+            import MinkowskiEngine as ME
+            ME.cat, self._cat = self._cat, None
+
+    def __enter__(self):
+        return self.attach()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.detach()
+
+    def summary(self):
+        """按 (模块名, 阶段) 汇总：调用次数、总耗时、平均点数/通道数、最大内存增量"""
+        groups = defaultdict(list)
+        for event in self.events:
+            groups[(event['name'], event['phase'])].append(event)
+        rows = []
+        for (name, phase), events in groups.items():
+            rows.append({
+                'name': name,
+                'phase': phase,
+                'calls': len(events),
+                'total_time': sum(e['duration'] for e in events),
+                'in_points': int(np.mean([e['in_points'] or 0 for e in events])),
+                'out_points': int(np.mean([e['out_points'] or 0 for e in events])),
+                'in_channels': events[0]['in_channels'],
+                'out_channels': events[0]['out_channels'],
+                'max_memory_delta': max(e['memory_after'] - e['memory_before'] for e in events),
+            })
+        return sorted(rows, key=lambda row: -row['total_time'])
+
+    def print_summary(self, top=20):
+        print(f"{'模块':<36}{'阶段':<10}{'次数':>6}{'耗时 ms':>10}{'输入点数':>10}{'输出点数':>10}"
+              f"{'通道':>10}{'内存增量 MB':>12}")
+        for row in self.summary()[:top]:
+            channels = f"{row['in_channels']}->{row['out_channels']}"
+            print(f"{row['name']:<36}{row['phase']:<10}{row['calls']:>6}{row['total_time'] * 1000:>10.2f}"
+                  f"{row['in_points']:>10}{row['out_points']:>10}{channels:>10}"
+                  f"{row['max_memory_delta'] / 1e6:>12.1f}")
+
+    def save_json(self, path):
+        with open(path, 'w') as f:
+            json.dump({'summary': self.summary(), 'events': self.events}, f, indent=2)
+
+    def save_chrome_trace(self, path):
+        """保存为 Chrome trace（chrome://tracing 或 Perfetto 打开），前向与反向分两行显示"""
+        trace = []
+        for event in self.events:
+            trace.append({
+                'name': event['name'],
+                'cat': event['phase'],
+                'ph': 'X',
+                'ts': event['start'] * 1e6,
+                'dur': event['duration'] * 1e6,
+                'pid': 0,
+                'tid': 0 if event['phase'] == 'forward' else 1,
+                'args': {k: event[k] for k in ('in_points', 'out_points', 'in_channels', 'out_channels',
+                                               'memory_before', 'memory_after')},
+            })
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': trace, 'displayTimeUnit': 'ms'}, f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="对网络做一次前向+反向的逐层计时与内存记录")
+    parser.add_argument("--model", default="SimpleAustinNet")
+    parser.add_argument("--points-per-block", type=int, default=20000)
+    parser.add_argument("--num-blocks", type=int, default=4)
+    parser.add_argument("--no-backward", action="store_true", help="只记录前向")
+    parser.add_argument("--output", default="profile", help="输出文件前缀（<prefix>.json 与 <prefix>.trace.json）")
+    args = parser.parse_args()
+
+    import torch.nn.functional as F
+    import MinkowskiEngine as ME
+    from train import MODELS, forward_batch
+    from export import random_blocks
+
+    model = MODELS[args.model]()
+    blocks = random_blocks(args.num_blocks, args.points_per_block)
+    batch = {'coords': ME.utils.batched_coordinates([np.floor(b) for b in blocks]),
+             'feats': torch.from_numpy(np.concatenate(blocks))}
+    forward_batch(model, batch, 'cpu')  # 预热
+
+    with LayerProfiler(model) as prof:
+        pred = forward_batch(model, batch, 'cpu')
+        if not args.no_backward:
+            F.mse_loss(pred, batch['feats']).backward()
+
+    prof.print_summary()
+    prof.save_json(f"{args.output}.json")
+    prof.save_chrome_trace(f"{args.output}.trace.json")
+    print(f"已保存 {args.output}.json 与 {args.output}.trace.json")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+import os
+import argparse
+import numpy as np
+from ply import write_ply
+
+# 人体各部位的椭球（单位：米，身高约 1.8 米）：(中心 x, y, z), (半轴 x, y, z)
+BODY_PARTS = [
+    ((0.0, 1.65, 0.0), (0.10, 0.12, 0.11)),    # 头
+    ((0.0, 1.50, 0.0), (0.05, 0.06, 0.05)),    # 颈
+    ((0.0, 1.22, 0.0), (0.18, 0.28, 0.11)),    # 躯干
+    ((0.0, 0.92, 0.0), (0.17, 0.12, 0.10)),    # 骨盆
+    ((-0.25, 1.28, 0.0), (0.05, 0.16, 0.05)),  # 上臂
+    ((0.25, 1.28, 0.0), (0.05, 0.16, 0.05)),
+    ((-0.28, 0.98, 0.03), (0.04, 0.15, 0.04)), # 前臂
+    ((0.28, 0.98, 0.03), (0.04, 0.15, 0.04)),
+    ((-0.09, 0.62, 0.0), (0.07, 0.22, 0.07)),  # 大腿
+    ((0.09, 0.62, 0.0), (0.07, 0.22, 0.07)),
+    ((-0.09, 0.22, 0.0), (0.05, 0.20, 0.05)),  # 小腿
+    ((0.09, 0.22, 0.0), (0.05, 0.20, 0.05)),
+    ((-0.09, 0.03, 0.05), (0.05, 0.03, 0.10)), # 脚
+    ((0.09, 0.03, 0.05), (0.05, 0.03, 0.10)),
+]
+BODY_HEIGHT = 1.8
+
+
+def _ellipsoid_area(radii):
+    """椭球表面积的 Thomsen 近似"""
+    a, b, c = radii
+    p = 1.6075
+    return 4 * np.pi * (((a * b) ** p + (a * c) ** p + (b * c) ** p) / 3) ** (1 / p)
+
+
+def human_frame(num_points=800_000, resolution=1024, frame=0, seed=0):
+    """确定性的体素化人体表面点云（与 8i 体素化数据相似：整数坐标、无重复点）
+
+    人体由若干椭球表面组成，按表面积分配采样点，缩放到 resolution 网格高度的 90% 后量化并去重。
+    num_points 为量化前的采样点数，决定表面密度；frame 使手臂摆动、整体平移，用于生成连续帧序列。
+
+    Returns:
+        (N, 3) float64 整数坐标，按采样顺序（去重后）
+    """
+    rng = np.random.default_rng([seed, frame])
+    areas = np.array([_ellipsoid_area(radii) for _, radii in BODY_PARTS])
+    counts = rng.multinomial(num_points, areas / areas.sum())
+
+    swing = 0.15 * np.sin(0.2 * frame)
+    parts = []
+    for (center, radii), count in zip(BODY_PARTS, counts):
+        directions = rng.normal(size=(count, 3))
+        directions /= np.linalg.norm(directions, axis=1, keepdims=True)
+        points = np.array(center) + directions * np.array(radii)
+        if abs(center[0]) > 0.2 and center[1] > 0.8:
+            # 手臂绕肩部前后摆动，左右相反
+            side = np.sign(center[0])
+            pivot = np.array([0.0, 1.44, 0.0])
+            angle = side * swing
+            rel = points - pivot
+            points = pivot + np.stack([rel[:, 0], rel[:, 1] * np.cos(angle) - rel[:, 2] * np.sin(angle),
+                                       rel[:, 1] * np.sin(angle) + rel[:, 2] * np.cos(angle)], axis=1)
+        parts.append(points)
+    points = np.concatenate(parts)
+
+    scale = 0.9 * resolution / BODY_HEIGHT
+    offset = np.array([resolution / 2 + frame, 0.05 * resolution, resolution / 2])
+    voxels = np.clip(np.round(points * scale + offset), 0, resolution - 1)
+    _, first = np.unique(voxels, axis=0, return_index=True)
+    return voxels[np.sort(first)]
+
+
+def vpcc_like(points, resolution=1024, noise=0.5, drop=0.05, duplicate=0.1, seed=0):
+    """模拟 V-PCC 重建的失真：几何量化噪声、丢失点与重复点
+
+    Args:
+        noise: 每个坐标加上四舍五入后的 N(0, noise) 整数偏移
+        drop: 随机丢弃的点比例
+        duplicate: 再复制一份的点比例（对应 patch 重叠处的重复点，pc_error 用 --dropdups 处理）
+
+    Returns:
+        (M, 3) float64 整数坐标，顺序打乱（重建点按 patch 输出，与原始点顺序无关）
+    """
+    rng = np.random.default_rng(seed)
+    points = np.asarray(points, dtype=np.float64)
+    points = points[rng.random(len(points)) >= drop]
+    points = points + np.round(rng.normal(0, noise, points.shape))
+    points = np.concatenate([points, points[rng.random(len(points)) < duplicate]])
+    return np.clip(points[rng.permutation(len(points))], 0, resolution - 1)
+
+
+def sequence_clouds(frames=2, num_points=800_000, resolution=1024, seed=0, noise=0.5, drop=0.05, duplicate=0.1,
+                    first_frame=0):
+    """生成合成序列的逐帧点云（不写文件）
+
+    Returns:
+        [(帧号, 原始点云, 失真点云), ...]
+    """
+    clouds = []
+    for frame in range(first_frame, first_frame + frames):
+        origin = human_frame(num_points, resolution, frame, seed)
+        compress = vpcc_like(origin, resolution, noise, drop, duplicate, seed=seed * 100003 + frame)
+        clouds.append((frame, origin, compress))
+    return clouds
+
+
+def write_clouds(root, clouds, name='synthetic'):
+    """按训练数据集的目录布局写出 sequence_clouds 的结果
+
+    <root>/origin/<name>_vox10_<frame>.ply 与 <root>/compress/<name>_rec_<frame>.ply，均为 ASCII（与 8i 数据相同）。
+
+    Returns:
+        [(origin 路径, compress 路径), ...]
+    """
+    paths = []
+    for d in ('origin', 'compress'):
+        os.makedirs(os.path.join(root, d), exist_ok=True)
+    for frame, origin, compress in clouds:
+        origin_path = os.path.join(root, 'origin', f"{name}_vox10_{frame:04d}.ply")
+        compress_path = os.path.join(root, 'compress', f"{name}_rec_{frame:04d}.ply")
+        write_ply(origin, origin_path, binary=False, with_colors=True)
+        write_ply(compress, compress_path, binary=False, with_colors=True)
+        paths.append((origin_path, compress_path))
+    return paths
+
+
+def write_sequence(root, name='synthetic', frames=2, num_points=800_000, resolution=1024, seed=0, noise=0.5,
+                   drop=0.05, duplicate=0.1, first_frame=0):
+    """生成并写出一个合成序列，目录布局见 write_clouds
+
+    Returns:
+        [(origin 路径, compress 路径), ...]
+    """
+    clouds = sequence_clouds(frames, num_points, resolution, seed, noise, drop, duplicate, first_frame)
+    return write_clouds(root, clouds, name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成合成的人体点云序列及其 V-PCC 式失真版本")
+    parser.add_argument("--output", required=True, help="输出根目录（其下生成 origin/ 与 compress/）")
+    parser.add_argument("--name", default="synthetic")
+    parser.add_argument("--frames", type=int, default=2)
+    parser.add_argument("--first-frame", type=int, default=0)
+    parser.add_argument("--points", type=int, default=800_000, help="每帧量化前的采样点数")
+    parser.add_argument("--resolution", type=int, default=1024)
+    parser.add_argument("--noise", type=float, default=0.5)
+    parser.add_argument("--drop", type=float, default=0.05)
+    parser.add_argument("--duplicate", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for origin_path, compress_path in write_sequence(args.output, args.name, args.frames, args.points,
+                                                     args.resolution, args.seed, args.noise, args.drop,
+                                                     args.duplicate, args.first_frame):
+        print(f"{origin_path} ({os.path.getsize(origin_path) / 1e6:.1f} MB), "
+              f"{compress_path} ({os.path.getsize(compress_path) / 1e6:.1f} MB)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+import time
+import hashlib
+import numpy as np
+
+# 每轴 21 位，可表示 0 ~ 2097151 的体素坐标
+KEY_BITS = 21
+
+
+def voxel_keys(points):
+    """将体素坐标打包为 int64 键，返回升序去重后的键与每个点对应的键下标"""
+    coords = np.floor(np.asarray(points)).astype(np.int64)
+    keys = (coords[:, 0] << (2 * KEY_BITS)) | (coords[:, 1] << KEY_BITS) | coords[:, 2]
+    return np.unique(keys, return_inverse=True)
+
+
+def occupancy_fingerprint(keys):
+    """块占用的指纹：去重后体素键的 blake2b 摘要"""
+    return hashlib.blake2b(np.ascontiguousarray(keys).tobytes(), digest_size=16).hexdigest()
+
+
+def occupancy_change(keys_a, keys_b):
+    """两个占用集合的变化比例：1 - |交集| / |并集|"""
+    if len(keys_a) == 0 and len(keys_b) == 0:
+        return 0.0
+    common = len(np.intersect1d(keys_a, keys_b, assume_unique=True))
+    return 1.0 - common / (len(keys_a) + len(keys_b) - common)
+
+
+class BlockHistory:
+    """相邻帧之间的块结果复用
+
+    记录上一帧每个块的占用（体素键）及逐体素的结果。当前帧同一编号的块占用变化不超过 max_change 时，
+    按体素键取回上一帧的结果，只有新出现的体素需要重新计算；指纹相同时为完全命中。
+    context 为影响结果的其他输入（如配对时的 origin 块），其占用变化同样计入。
+    同一体素内的多个点共用该体素第一个点的结果。
+    """
+
+    def __init__(self, max_change=0.0):
+        self.max_change = max_change
+        self.previous = {}
+        self.current = {}
+        self.stats = {'blocks': 0, 'hits': 0, 'exact': 0, 'points': 0, 'reused_points': 0,
+                      'computed_points': 0, 'compute_time': 0.0, 'lookup_time': 0.0}
+
+    def next_frame(self):
+        """当前帧处理完毕，作为下一帧的参照"""
+        self.previous, self.current = self.current, {}
+
+    def lookup(self, block_id, points, context=None):
+        """查找上一帧同编号块的可复用结果
+
+        Returns:
+            (results, missing, state)：results 为已按体素填入上一帧结果的数组（不能复用时为 None），
+            missing 为仍需计算的点的掩码，state 需随最终结果传给 store
+        """
+        start = time.perf_counter()
+        keys, inverse = voxel_keys(points)
+        context_keys = voxel_keys(context)[0] if context is not None else None
+        state = {'block_id': block_id, 'keys': keys, 'inverse': inverse, 'fingerprint': occupancy_fingerprint(keys),
+                 'context_keys': context_keys, 'exact': False,
+                 'context_fingerprint': occupancy_fingerprint(context_keys) if context is not None else None}
+
+        results, missing = None, np.ones(len(points), dtype=bool)
+        previous = self.previous.get(block_id)
+        if previous is not None and len(previous['keys']):
+            state['exact'] = (previous['fingerprint'] == state['fingerprint']
+                              and previous['context_fingerprint'] == state['context_fingerprint'])
+            if state['exact']:
+                results, missing = previous['results'][inverse], np.zeros(len(points), dtype=bool)
+            else:
+                change = occupancy_change(previous['keys'], keys)
+                if context is not None:
+                    change = max(change, occupancy_change(previous['context_keys'], context_keys))
+                if change <= self.max_change:
+                    pos = np.minimum(np.searchsorted(previous['keys'], keys), len(previous['keys']) - 1)
+                    results = previous['results'][pos][inverse]
+                    missing = (previous['keys'][pos] != keys)[inverse]
+        self.stats['lookup_time'] += time.perf_counter() - start
+        return results, missing, state
+
+    def store(self, state, results, reused_points):
+        """保存块的最终结果供下一帧使用，reused_points 为其中取自上一帧的点数"""
+        inverse = state.pop('inverse')
+        first = np.full(len(state['keys']), len(inverse), dtype=np.int64)
+        np.minimum.at(first, inverse, np.arange(len(inverse)))
+        state['results'] = np.asarray(results)[first]
+        self.current[state['block_id']] = state
+
+        self.stats['blocks'] += 1
+        self.stats['points'] += len(inverse)
+        if reused_points:
+            self.stats['hits'] += 1
+            self.stats['exact'] += int(state['exact'])
+            self.stats['reused_points'] += reused_points
+
+    def record_compute(self, num_points, seconds):
+        """记录实际计算的点数与耗时，用于估计复用节省的时间"""
+        self.stats['computed_points'] += num_points
+        self.stats['compute_time'] += seconds
+
+    def process(self, block_id, points, compute, context=None):
+        """返回块内每个点的结果，能复用时只对新出现的体素调用 compute
+
+        Args:
+            compute: compute(mask) 返回 points[mask] 对应的结果数组
+        """
+        results, missing, state = self.lookup(block_id, points, context)
+        if missing.any():
+            start = time.perf_counter()
+            computed = np.asarray(compute(missing))
+            self.record_compute(int(missing.sum()), time.perf_counter() - start)
+            if results is None:
+                results = computed
+            else:
+                results[missing] = computed
+        self.store(state, results, len(points) - int(missing.sum()))
+        return results
+
+    def summary(self):
+        """命中率与节省时间的估计（按实际计算部分的每点耗时折算复用的点）"""
+        stats = dict(self.stats)
+        stats['hit_rate'] = stats['hits'] / max(stats['blocks'], 1)
+        per_point = stats['compute_time'] / max(stats['computed_points'], 1)
+        stats['time_saved'] = stats['reused_points'] * per_point - stats['lookup_time']
+        return stats
@@ -0,0 +1,21 @@
+import json
+from cache import ResultCache
+
+
+def _index_entries(cache_dir):
+    with open(cache_dir / "index.json") as f:
+        return json.load(f)['entries']
+
+
+def test_maybe_save_batches_index_writes(tmp_path):
+    output = tmp_path / "out.bin"
+    output.write_bytes(b"x")
+    cache = ResultCache(str(tmp_path / "cache"))
+    for i in range(5):
+        cache.store(f"k{i}", [str(output)])
+        cache.maybe_save(every=3, interval=3600)
+    assert sorted(_index_entries(tmp_path / "cache")) == ["k0", "k1", "k2"]
+
+    cache.save()
+    reloaded = ResultCache(str(tmp_path / "cache"))
+    assert all(reloaded.lookup(f"k{i}") for i in range(5))
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+from ply import write_ply
+from catalog import Catalog
+from utils import get_file_pairs
+
+
+def _touch(directory, name):
+    directory.mkdir(exist_ok=True)
+    write_ply(np.zeros((1, 3), dtype=np.uint16), directory / name)
+
+
+def test_one_pair_per_origin_file(tmp_path):
+    origin, compress = tmp_path / "origin", tmp_path / "compress"
+    for frame in (1051, 1052):
+        _touch(origin, f"longdress_vox10_{frame}.ply")
+        _touch(compress, f"S23C03R03_rec_{frame}.ply")
+    _touch(origin, "longdress_vox10_1053.ply")
+    assert get_file_pairs(str(origin), str(compress)) == [
+        ("longdress_vox10_1051.ply", "S23C03R03_rec_1051.ply"),
+        ("longdress_vox10_1052.ply", "S23C03R03_rec_1052.ply"),
+    ]
+
+
+def test_duplicate_keys_are_not_resolved_silently(tmp_path, capsys):
+    # longdress（1051–1350）与 loot（1000–1299）的帧号重叠
+    origin, compress = tmp_path / "origin", tmp_path / "compress"
+    for sequence in ("longdress_vox10", "loot_vox10"):
+        _touch(origin, f"{sequence}_1100.ply")
+        _touch(origin, f"{sequence}_1100_block_3.ply")
+    for sequence in ("S23C03R03_rec", "S24C03R03_rec"):
+        _touch(compress, f"{sequence}_1100.ply")
+
+    catalog = Catalog(str(origin))
+    assert "重复" in capsys.readouterr().out
+    assert catalog.find_all(1100) == ["longdress_vox10_1100.ply", "loot_vox10_1100.ply"]
+    with pytest.raises(ValueError):
+        catalog.find(1100, 3)
+    with pytest.raises(ValueError):
+        get_file_pairs(str(origin), str(compress))
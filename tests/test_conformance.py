@@ -0,0 +1,40 @@
+import os
+import json
+import subprocess
+import pytest
+from config import PC_ERROR_DIR
+from evaluate import evaluate_pair, conformance
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "conformance")
+with open(os.path.join(DATA_DIR, "expected.json")) as f:
+    CASES = json.load(f)['cases']
+
+
+@pytest.mark.parametrize("case", CASES, ids=lambda case: f"{case['file_b'][:-4]}-dropdups{case['dropdups']}")
+def test_compute_metrics_matches_reference(case):
+    actual = evaluate_pair(os.path.join(DATA_DIR, case['file_a']), os.path.join(DATA_DIR, case['file_b']),
+                           case['resolution'], case['dropdups'])
+    for key, expected in case['metrics'].items():
+        if case['source'] == 'pc_error':
+            # pc_error 的输出只保留有限位小数，容差与 evaluate.conformance 相同
+            tolerance = pytest.approx(expected, abs=0.01) if key.startswith('psnr') else pytest.approx(expected, rel=1e-3)
+        else:
+            tolerance = pytest.approx(expected, rel=1e-6)
+        assert actual[key] == tolerance, key
+
+
+def _pc_error_path():
+    """可执行的 pc_error 路径（相对仓库根目录），不存在或无法执行（如架构不符）时返回 None"""
+    path = os.path.join(os.path.dirname(os.path.dirname(DATA_DIR)), "..", PC_ERROR_DIR)
+    try:
+        subprocess.run([path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=30)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return path
+
+
+@pytest.mark.skipif(_pc_error_path() is None, reason="pc_error 不可执行")
+def test_pc_error_binary():
+    for case in CASES:
+        pairs = [(os.path.join(DATA_DIR, case['file_a']), os.path.join(DATA_DIR, case['file_b']))]
+        assert conformance(pairs, case['resolution'], case['dropdups'], pc_error_path=_pc_error_path())
@@ -0,0 +1,18 @@
+import json
+from utils import Manifest
+
+
+def test_torn_last_line_is_truncated(tmp_path):
+    path = tmp_path / "manifest.jsonl"
+    manifest = Manifest(str(path))
+    manifest.mark_done('a', {'blocks': 1})
+    with open(path, 'a') as f:
+        f.write('{"unit": "b", "blo')  # 写到一半时中断
+
+    manifest = Manifest(str(path))
+    assert manifest.is_done('a') and not manifest.is_done('b')
+    manifest.mark_done('c', {'blocks': 3})
+
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [r['unit'] for r in records] == ['a', 'c']
+    assert Manifest(str(path)).is_done('c')
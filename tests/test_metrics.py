@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+from metrics import transfer_normals, compute_metrics
+
+
+def test_transfer_averages_reference_normals_onto_nearest_points():
+    points_ref = np.array([[0, 0, 0], [0, 0, 1], [10, 0, 0]], dtype=np.float64)
+    normals_ref = np.array([[1, 0, 0], [0, 1, 0], [0, 0, 1]], dtype=np.float64)
+    points = np.array([[0, 0, 0.4], [10, 0, 0], [20, 0, 0]], dtype=np.float64)
+    # 前两个参考点都落到第 0 个点上取平均；第 2 个点没有参考点落到，取最近参考点的法向量
+    expected = [[0.5, 0.5, 0], [0, 0, 1], [0, 0, 1]]
+    assert transfer_normals(points_ref, normals_ref, points).tolist() == expected
+    assert transfer_normals(points_ref, normals_ref, points, average=False).tolist() == expected
+
+
+def test_transfer_averages_equidistant_neighbours():
+    points_ref = np.array([[0, 0, 0], [-3, 0, 0], [0, 0, 9], [2, 0, 9]], dtype=np.float64)
+    normals_ref = np.array([[1, 0, 0], [0, 1, 0], [0, 0, 1], [0, 1, 0]], dtype=np.float64)
+    points = np.array([[1, 0, 0], [-1, 0, 0], [1, 0, 14], [1, 0, 30]], dtype=np.float64)
+    # 第 0 个参考点与前两个点等距，两者都计入；第 3 个点没有参考点落到，与后两个参考点等距，取两者的平均
+    assert transfer_normals(points_ref, normals_ref, points).tolist() == \
+        [[1, 0, 0], [0.5, 0.5, 0], [0, 0.5, 0.5], [0, 0.5, 0.5]]
+
+
+def test_transfer_aligns_unoriented_normals_before_averaging():
+    points_ref = np.array([[0, 0, 0], [0, 0, 1]], dtype=np.float64)
+    normals_ref = np.array([[0, 0, 1], [0, 0, -1]], dtype=np.float64)
+    points = np.array([[0, 0, 0.4]], dtype=np.float64)
+    assert transfer_normals(points_ref, normals_ref, points).tolist() == [[0, 0, 0]]
+    assert transfer_normals(points_ref, normals_ref, points, align=True).tolist() == [[0, 0, 1]]
+
+
+def test_both_directions_use_the_reference_normals():
+    grid = np.stack(np.meshgrid(np.arange(0, 40, 4), np.arange(0, 40, 4), indexing='ij'), -1).reshape(-1, 2)
+    points_a = np.column_stack([grid, np.full(len(grid), 300)]).astype(np.float64)
+    points_b = points_a + [1, 0, 2]
+    # 给定 A 的法向量为 x 方向时，两个方向的 D2 都只计 x 分量的误差
+    normals_a = np.tile([1.0, 0.0, 0.0], (len(points_a), 1))
+    result = compute_metrics(points_a, points_b, normals_a=normals_a)
+    assert result['mse1_p2plane'] == pytest.approx(1.0)
+    assert result['mse2_p2plane'] == pytest.approx(1.0)
+    # 回退方案中 B 的法向量由 PCA 独立估计（z 方向），A->B 只计 z 分量的误差
+    fallback = compute_metrics(points_a, points_b, normals_a=normals_a, independent_normals=True)
+    assert fallback['mse1_p2plane'] == pytest.approx(4.0)
+    assert fallback['mse2_p2plane'] == pytest.approx(1.0)
+
+
+def test_dropdups_keeps_given_normals_aligned():
+    points_a = np.array([[0, 0, 0], [4, 0, 0], [0, 0, 0]], dtype=np.float64)
+    normals_a = np.array([[0, 0, 1], [1, 0, 0], [0, 1, 0]], dtype=np.float64)
+    points_b = np.array([[0, 0, 1], [4, 0, 1], [4, 0, 1]], dtype=np.float64)
+    result = compute_metrics(points_a, points_b, dropdups=1, normals_a=normals_a)
+    # 去重后 A 为 (0,0,0)[法向量 z]、(4,0,0)[法向量 x]，B 为 (0,0,1)、(4,0,1)
+    assert result['mse2_p2point'] == pytest.approx(1.0)
+    assert result['mse2_p2plane'] == pytest.approx(0.5)
@@ -0,0 +1,21 @@
+import numpy as np
+from preprocessing import chunk_point_cloud_fixed_size, chunk_point_cloud_sparse, match_blocks
+
+
+def test_sparse_blocks_match_the_full_grid():
+    points = np.random.default_rng(0).integers(0, 64, size=(500, 3)).astype(np.uint16)
+    grid = chunk_point_cloud_fixed_size(points, block_size=20, cube_size=64, overlap=1)
+    sparse = chunk_point_cloud_sparse(points, block_size=20, cube_size=64, overlap=1)
+    assert len(grid) == 4 ** 3
+    assert [b for b, _, _ in sparse] == [b for b, (coords, _) in enumerate(grid) if len(coords)]
+    for b, coords, origin in sparse:
+        assert origin == grid[b][1]
+        assert coords.dtype == np.uint16 and np.array_equal(coords, grid[b][0])
+
+
+def test_match_blocks_keeps_blocks_occupied_on_both_sides():
+    points_a = np.array([[1, 1, 1], [30, 30, 30]], dtype=np.uint16)
+    points_b = np.array([[2, 2, 2], [50, 1, 1]], dtype=np.uint16)
+    matched = match_blocks(chunk_point_cloud_sparse(points_a, 20, 64, 1), chunk_point_cloud_sparse(points_b, 20, 64, 1))
+    assert [(b, a.tolist(), c.tolist(), origin) for b, a, c, origin in matched] == \
+        [(0, [[1, 1, 1]], [[2, 2, 2]], (0, 0, 0))]
@@ -0,0 +1,117 @@
+import numpy as np
+import pytest
+from ply import read_header, read_header_count, read_ply, iter_ply, write_ply, PlyWriter
+
+DTYPES = [np.float64, np.float32, np.int32, np.uint16]
+
+
+@pytest.fixture
+def points():
+    rng = np.random.default_rng(0)
+    return rng.integers(0, 1024, size=(500, 3)).astype(np.float64)
+
+
+@pytest.mark.parametrize("dtype", DTYPES)
+@pytest.mark.parametrize("binary", [True, False])
+@pytest.mark.parametrize("with_colors", [False, True])
+def test_round_trip(tmp_path, points, dtype, binary, with_colors):
+    path = tmp_path / "cloud.ply"
+    expected = points.astype(dtype)
+    write_ply(expected, path, binary=binary, with_colors=with_colors)
+
+    loaded = read_ply(path)
+    assert loaded.shape == expected.shape
+    assert np.array_equal(loaded, expected)
+    if binary:
+        assert loaded.dtype == expected.dtype
+        assert np.array_equal(read_ply(path, mmap=False), expected)
+    else:
+        assert loaded.dtype == np.float64
+
+
+def test_round_trip_fractional_float(tmp_path):
+    expected = np.random.default_rng(1).random((100, 3)) * 1000
+    for dtype in (np.float64, np.float32):
+        path = tmp_path / "cloud.ply"
+        write_ply(expected.astype(dtype), path, binary=False)
+        assert np.array_equal(read_ply(path).astype(dtype), expected.astype(dtype))
+
+
+@pytest.mark.parametrize("binary", [True, False])
+def test_empty_cloud(tmp_path, binary):
+    path = tmp_path / "empty.ply"
+    write_ply(np.zeros((0, 3), dtype=np.float32), path, binary=binary)
+    loaded = read_ply(path)
+    assert loaded.shape == (0, 3)
+    assert read_header_count(path) == 0
+    assert sum(len(chunk) for chunk in iter_ply(path)) == 0
+
+
+@pytest.mark.parametrize("binary", [True, False])
+def test_read_header(tmp_path, points, binary):
+    path = tmp_path / "cloud.ply"
+    write_ply(points.astype(np.float32), path, binary=binary, with_colors=True)
+    with open(path, 'rb') as f:
+        fmt, elements, header_size = read_header(f)
+    assert fmt == ('binary_little_endian' if binary else 'ascii')
+    assert elements == [('vertex', len(points), [('x', 'float'), ('y', 'float'), ('z', 'float'),
+                                                 ('red', 'uchar'), ('green', 'uchar'), ('blue', 'uchar')])]
+    assert open(path, 'rb').read()[:header_size].endswith(b'end_header\n')
+    assert read_header_count(path) == len(points)
+    assert read_header_count(path, element='face') == 0
+
+
+def test_read_header_rejects_non_ply(tmp_path):
+    path = tmp_path / "bad.ply"
+    path.write_bytes(b"not a ply\n")
+    with pytest.raises(ValueError):
+        read_header_count(path)
+
+
+def test_read_skips_preceding_element(tmp_path):
+    # vertex 之前的其他元素（8i 数据中少见，但格式允许）需要按行或字节跳过
+    header = "ply\nformat ascii 1.0\nelement camera 1\nproperty float k\nelement vertex 2\n" \
+             "property float x\nproperty float y\nproperty float z\nend_header\n"
+    path = tmp_path / "cloud.ply"
+    path.write_text(header + "7\n1 2 3\n4 5 6\n")
+    assert np.array_equal(read_ply(path), [[1, 2, 3], [4, 5, 6]])
+    assert np.array_equal(np.concatenate(list(iter_ply(path))), [[1, 2, 3], [4, 5, 6]])
+
+
+@pytest.mark.parametrize("binary", [True, False])
+def test_iter_ply_matches_read_ply(tmp_path, points, binary):
+    path = tmp_path / "cloud.ply"
+    write_ply(points.astype(np.uint16), path, binary=binary, with_colors=True)
+    chunks = list(iter_ply(path, chunk_points=128))
+    assert [len(chunk) for chunk in chunks] == [128, 128, 128, 116]
+    assert np.array_equal(np.concatenate(chunks), read_ply(path))
+
+
+def test_ply_writer(tmp_path, points):
+    path = tmp_path / "stream.ply"
+    with PlyWriter(path, len(points), dtype=np.uint16) as writer:
+        writer.write(points[:200])
+        writer.write(points[200:])
+    assert np.array_equal(read_ply(path), points.astype(np.uint16))
+
+    with pytest.raises(ValueError):
+        with PlyWriter(path, 10) as writer:
+            writer.write(points[:5])
+
+
+@pytest.mark.parametrize("fmt", ["ascii", "binary_little_endian"])
+def test_read_normal_fields(tmp_path, fmt):
+    rows = np.array([[1, 2, 3, 0, 0, 1], [4, 5, 6, 1, 0, 0]], dtype=np.float32)
+    header = (f"ply\nformat {fmt} 1.0\nelement vertex 2\n"
+              + "".join(f"property float {name}\n" for name in ("x", "y", "z", "nx", "ny", "nz")) + "end_header\n")
+    path = tmp_path / "normals.ply"
+    with open(path, "wb") as f:
+        f.write(header.encode("ascii"))
+        if fmt == "ascii":
+            f.write("".join(" ".join(f"{v:g}" for v in row) + "\n" for row in rows).encode("ascii"))
+        else:
+            f.write(rows.astype("<f4").tobytes())
+    assert np.array_equal(read_ply(path, fields=("nx", "ny", "nz")), rows[:, 3:])
+    assert np.array_equal(read_ply(path), rows[:, :3])
+    with pytest.raises(ValueError):
+        read_ply(path, fields=("red", "green", "blue"))
@@ -0,0 +1,24 @@
+import numpy as np
+from voxelize import voxelize, scatter, save_voxels, load_voxels, source_digest
+
+
+def test_voxelize_dedups_and_scatters_back():
+    points = np.array([[1, 2, 3], [0, 0, 0], [1, 2, 3], [5, 5, 5]], dtype=np.uint16)
+    voxels = voxelize(points)
+    assert voxels['coords'].tolist() == [[0, 0, 0], [1, 2, 3], [5, 5, 5]]
+    assert voxels['counts'].tolist() == [1, 2, 1]
+    assert np.array_equal(scatter(voxels['coords'], voxels['inverse']), points)
+    assert np.array_equal(voxels['feats'], voxels['coords'].astype(np.float32))
+
+
+def test_saved_voxels_record_their_source(tmp_path):
+    points = np.array([[1, 2, 3], [4, 5, 6]], dtype=np.uint16)
+    path = str(tmp_path / "block.npz")
+    save_voxels(path, voxelize(points), source_digest(points))
+    loaded = load_voxels(path)
+    # 摘要与读取时的坐标类型无关，内容变化（即使点数不变）时不同
+    assert loaded['source'] == source_digest(points.astype(np.float64))
+    assert loaded['source'] != source_digest(points[::-1])
+
+    np.savez(path, **voxelize(points))  # 旧格式没有摘要
+    assert load_voxels(path)['source'] is None
@@ -0,0 +1,133 @@
+import os
+import argparse
+import torch
+import torch.nn.functional as F
+from torch.utils.data import DistributedSampler
+import MinkowskiEngine as ME
+from config import COMPRESS_BLOCK_DIR, NEW_ORIGIN_BLOCK_DIR, CHECKPOINT_DIR
+from functools import partial
+from network import AustinNet, SimpleAustinNet, AustinUNet, VARIANTS, set_checkpointing
+from dataset import BlockPairDataset, BlockBudgetSampler, make_dataloader, EpochStats
+from profiler import LayerProfiler
+from distributed import launch, is_main, wrap_model, unwrap_model, all_reduce
+
+MODELS = {
+    'AustinNet': AustinNet,
+    'SimpleAustinNet': SimpleAustinNet,
+}
+MODELS.update({name: partial(AustinUNet, **config) for name, config in VARIANTS.items()})
+
+
+def forward_batch(model, batch, device):
+    """前向一个批次，返回与输入点一一对应的预测坐标
+
+    批次带有 'inverse' 时坐标已体素化去重（见 voxelize.py），直接构造稀疏张量，预测按逆映射散回每个点；
+    否则块内的重复坐标在稀疏化时被合并，再通过 slice 映射回每个输入点。
+    """
+    if 'inverse' in batch:
+        x = ME.SparseTensor(features=batch['feats'].to(device), coordinates=batch['coords'].to(device))
+        out = model(x).F
+        if len(x.inverse_mapping):
+            # 稀疏张量的行序可能与输入体素的顺序不同
+            out = out[x.inverse_mapping]
+        return out[batch['inverse'].to(device)]
+    field = ME.TensorField(features=batch['feats'].to(device), coordinates=batch['coords'].to(device))
+    out = model(field.sparse())
+    return out.slice(field).F
+
+
+def train_epoch(model, loader, optimizer, device, profiler=None, profile_steps=0):
+    """训练一个 epoch，返回 (平均损失, EpochStats 统计)
+
+    给定已挂载的 profiler 时，在前 profile_steps 个批次后将其卸载。
+    """
+    model.train()
+    stats = EpochStats()
+    total_loss, batches = 0.0, 0
+    for batch in stats.timed(loader):
+        optimizer.zero_grad()
+        pred = forward_batch(model, batch, device)
+        loss = F.mse_loss(pred, batch['targets'].to(device))
+        loss.backward()
+        optimizer.step()
+        total_loss += loss.item()
+        batches += 1
+        if profiler is not None and batches == profile_steps:
+            profiler.detach()
+    return total_loss / max(batches, 1), stats.summary()
+
+
+def run(rank, world_size, args):
+    """单个训练进程；world_size > 1 时数据按 rank 分片，梯度经 DDP all-reduce，只有 rank 0 打印与保存权重"""
+    device = 'cuda' if torch.cuda.is_available() and world_size == 1 else 'cpu'
+    dataset = BlockPairDataset(COMPRESS_BLOCK_DIR, NEW_ORIGIN_BLOCK_DIR, args.store_dir, args.cache_size)
+    # 各 rank 用相同的种子初始化模型（DDP 也会从 rank 0 广播一次参数）
+    torch.manual_seed(args.seed)
+    sampler = batch_sampler = None
+    if args.max_points:
+        batch_sampler = BlockBudgetSampler(dataset.point_counts, args.max_points, seed=args.seed, rank=rank,
+                                           world_size=world_size)
+    elif world_size > 1:
+        sampler = DistributedSampler(dataset, world_size, rank, seed=args.seed, drop_last=True)
+    loader = make_dataloader(dataset, args.batch_size, args.workers, args.prefetch, batch_sampler=batch_sampler,
+                             sampler=sampler)
+    if is_main():
+        print(f"样本数: {len(dataset)}, 进程数: {world_size}")
+
+    model = MODELS[args.model]().to(device)
+    if args.checkpoint_stages:
+        stages = set_checkpointing(model, args.checkpoint_stages)
+        if is_main():
+            print(f"激活检查点: {', '.join(stages)}")
+    # 可重入检查点在反向中重算前向，DDP 需按静态图处理同一参数的多次使用
+    model = wrap_model(model, static_graph=bool(args.checkpoint_stages))
+    optimizer = torch.optim.Adam(model.parameters(), lr=args.lr)
+    os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+
+    for epoch in range(1, args.epochs + 1):
+        for s in (sampler, batch_sampler):
+            if s is not None:
+                s.set_epoch(epoch)
+        profiler = LayerProfiler(unwrap_model(model)).attach() if args.profile and epoch == 1 and is_main() else None
+        loss, stats = train_epoch(model, loader, optimizer, device, profiler, args.profile_steps)
+        if profiler is not None:
+            profiler.detach()
+            profiler.print_summary()
+            profiler.save_json(f"{args.profile}.json")
+            profiler.save_chrome_trace(f"{args.profile}.trace.json")
+
+        # 汇总所有 rank：样本与点数求和，耗时取最慢的 rank
+        loss, samples, points, data_wait = all_reduce([loss, stats['samples'], stats['points'], stats['data_wait']])
+        elapsed, = all_reduce([stats['elapsed']], op='max')
+        if is_main():
+            print(f"epoch {epoch}: loss {loss / world_size:.6f}, {samples / elapsed:.1f} 样本/s, "
+                  f"{points / elapsed:.0f} 点/s, 等待数据 {data_wait / world_size:.1f}s "
+                  f"({data_wait / world_size / elapsed:.0%})")
+            torch.save({'model': unwrap_model(model).state_dict(), 'epoch': epoch},
+                       os.path.join(CHECKPOINT_DIR, f"{args.model}_epoch{epoch}.pth"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="训练 AustinNet")
+    parser.add_argument("--model", choices=list(MODELS), default="SimpleAustinNet")
+    parser.add_argument("--epochs", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--max-points", type=int, help="按每批总点数组批（替代固定 --batch-size）")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--lr", type=float, default=1e-3)
+    parser.add_argument("--workers", type=int, default=4, help="DataLoader worker 数")
+    parser.add_argument("--prefetch", type=int, default=4, help="每个 worker 预取的批次数")
+    parser.add_argument("--cache-size", type=int, default=0, help="每个 worker 缓存的已解码样本数")
+    parser.add_argument("--store-dir", help="从分片块存储读取压缩块，而不是 COMPRESS_BLOCK_DIR")
+    parser.add_argument("--profile", help="记录第一个 epoch 前若干批次的逐层耗时与内存，保存到该前缀")
+    parser.add_argument("--profile-steps", type=int, default=5)
+    parser.add_argument("--ranks", type=int, default=1, help="本机数据并行的进程数（gloo 后端）")
+    parser.add_argument("--threads", type=int, help="每个进程的计算线程数（缺省平分本机核数）")
+    parser.add_argument("--checkpoint-stages", nargs='*', default=[],
+                        help="对这些 Sequential 阶段做激活检查点（'all' 为全部），以重算换显存")
+    args = parser.parse_args()
+    launch(run, args.ranks, args, threads=args.threads)
+
+
+if __name__ == '__main__':
+    main()
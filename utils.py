@@ -1,50 +1,80 @@
+import io
 import os
 import re
-import open3d as o3d
+import json
+import tempfile
+import subprocess
 import numpy as np
-import torch
+from config import COORD_DTYPE
+from ply import read_ply, write_ply
+from catalog import NAME_PATTERN, get_catalog
 
 def get_file_pairs(file_A, file_B):
-    """匹配文件名中四位数字相同的文件对"""
-    files_A = [f for f in os.listdir(file_A) if f.endswith('.ply')]
-    files_B = [f for f in os.listdir(file_B) if f.endswith('.ply')]
-    print(f"找到 {len(files_A)} 个PLY文件和 {len(files_B)} 个PLY文件")
-    pattern = r'_(\d{4})\.ply$'
-    
-    # 为压缩文件创建数字到文件名的映射
-    number_to_fileB = {
-        re.search(pattern, file_B).group(1): file_B 
-        for file_B in files_B 
-        if re.search(pattern, file_B)
-    }
+    """匹配文件名中四位数字相同的文件对（通过目录索引查询，不重复扫描目录）
+
+    A 中每个帧文件各产生一对；B 中同一帧号有多个文件（不同序列混放）时无法按帧号配对，抛出 ValueError。
+    """
+    catalog_A = get_catalog(file_A, refresh=True)
+    catalog_B = get_catalog(file_B, refresh=True)
+    print(f"找到 {len(catalog_A.entries)} 个PLY文件和 {len(catalog_B.entries)} 个PLY文件")
 
     # 匹配文件对
-    pairs = [
-        (file_A, number_to_fileB[number])
-        for file_A in files_A
-        if (match := re.search(pattern, file_A)) 
-        and (number := match.group(1)) in number_to_fileB
-    ]
+    pairs, unmatched = [], 0
+    for name, entry in catalog_A.entries.items():
+        if entry['block_id'] is not None:
+            continue
+        name_B = catalog_B.find(entry['frame'])
+        if name_B is None:
+            unmatched += 1
+            continue
+        pairs.append((name, name_B))
     
     pairs.sort()
-    print(f"找到 {len(pairs)} 对匹配的文件")
+    print(f"找到 {len(pairs)} 对匹配的文件" + (f"，{unmatched} 个文件没有匹配" if unmatched else ""))
     for pair in pairs:
         print(f"匹配: {pair[0]} <-> {pair[1]}")
         
     return pairs
 
 
-def load_ply(file_path):
-    """加载PLY文件，返回点云坐标"""
-    pcd = o3d.io.read_point_cloud(file_path)
-    return np.asarray(pcd.points)
+def parse_frame_name(file_name):
+    """从帧文件名解析 (序列名, 帧号)，如 soldier_vox10_0536.ply -> ('soldier_vox10', 536)"""
+    match = re.search(r'^(.*)_(\d{4})\.ply$', os.path.basename(file_name))
+    if not match:
+        raise ValueError(f"无法解析帧文件名: {file_name}")
+    return match.group(1), int(match.group(2))
+
+def compact_coords(points, dtype=COORD_DTYPE):
+    """将体素坐标转为紧凑的整数类型
+
+    全为整数且在 dtype 范围内时转为 dtype（超出时退而使用 int32），含小数的坐标（如网络预测）原样返回。
+    """
+    points = np.asarray(points)
+    dtype = np.dtype(dtype)
+    if points.dtype == dtype or len(points) == 0:
+        return points.astype(dtype, copy=False)
+    if points.dtype.kind == 'f' and not np.array_equal(points, np.floor(points)):
+        return points
+    low, high = points.min(), points.max()
+    for candidate in (dtype, np.dtype(np.int32)):
+        info = np.iinfo(candidate)
+        if info.min <= low and high <= info.max:
+            return points.astype(candidate)
+    return points
+
+def load_ply(file_path, compact=False):
+    """加载PLY文件，返回点云坐标
+
+    compact=False 时保持文件中的类型（ASCII 为 float64）；
+    compact=True 时体素坐标转为 COORD_DTYPE（见 compact_coords），块文件本身已是该类型时为零拷贝视图。
+    紧凑坐标为无符号整数，相减会静默回绕，只在切块/配对等预处理路径中使用，做距离计算前需先转为浮点。
+    """
+    points = read_ply(file_path)
+    return compact_coords(points) if compact else points
 
-def save_ply(points, file_path):
-    """保存点云坐标为PLY文件"""
-    pcd = o3d.geometry.PointCloud()
-    pcd.points = o3d.utility.Vector3dVector(points)
-    pcd.colors = o3d.utility.Vector3dVector(np.zeros((len(points), 3)))
-    o3d.io.write_point_cloud(file_path, pcd, write_ascii=True)
+def save_ply(points, file_path, binary=True, with_colors=False):
+    """保存点云坐标为PLY文件（默认二进制小端，不附加颜色）"""
+    write_ply(points, file_path, binary=binary, with_colors=with_colors)
 
 def get_matching_paths(file_a, origin_dir, compress_dir):
     """获取匹配的文件完整路径
@@ -57,35 +87,155 @@ def get_matching_paths(file_a, origin_dir, compress_dir):
     Returns:
         (uncompressed_path, reconstructed_path)
     """
-    # 获取file_a的特征数字
-    four_digit = re.search(r'rec_(\d{4})', file_a).group(1)
-    block_num = re.search(r'block_(\d+)\.ply', file_a).group(1)
-    
-    # 在origin_dir中查找匹配文件
-    for file_b in os.listdir(origin_dir):
-        if (re.search(rf'vox10_({four_digit})', file_b) 
-            and re.search(rf'block_({block_num})\.ply', file_b)):
-            return (
-                os.path.join(compress_dir, file_a),
-                os.path.join(origin_dir, file_b)
-            )
-            
-    raise FileNotFoundError(f"No matching file found for {file_a}")
+    # 获取file_a的帧号和块编号，在 origin_dir 的目录索引中 O(1) 查找
+    match = NAME_PATTERN.match(os.path.basename(file_a))
+    file_b = None
+    if match and match.group(3) is not None:
+        file_b = get_catalog(origin_dir).find(int(match.group(2)), int(match.group(3)))
+    if file_b is None:
+        raise FileNotFoundError(f"No matching file found for {file_a}")
+    return (
+        os.path.join(compress_dir, file_a),
+        os.path.join(origin_dir, file_b)
+    )
+
+def _parse_point_line(line):
+    """解析一行 "Point A[i] (x, y, z) -> B[j] (x, y, z)"，失败返回 None"""
+    try:
+        a_index = int(line.split('A[')[1].split(']')[0])
+        parts = line.split(' -> ')
+        if len(parts) == 2:
+            a_part = parts[0].split('(')[1].split(')')[0]
+            ax, ay, az = map(float, a_part.split(','))
+            b_part = parts[1].split('(')[1].split(')')[0]
+            bx, by, bz = map(float, b_part.split(','))
+            return a_index, (ax, ay, az), (bx, by, bz)
+    except Exception:
+        pass
+    return None
 
 def extract_points(output):
     """pc_error工具提取匹配的点对"""
     point_pairs = {}
     for line in output.splitlines():
         if 'Point A[' in line:
-            try:
-                a_index = int(line.split('A[')[1].split(']')[0])
-                parts = line.split(' -> ')
-                if len(parts) == 2:
-                    a_part = parts[0].split('(')[1].split(')')[0]
-                    ax, ay, az = map(float, a_part.split(','))
-                    b_part = parts[1].split('(')[1].split(')')[0]
-                    bx, by, bz = map(float, b_part.split(','))
-                    point_pairs[a_index] = ((ax, ay, az), (bx, by, bz))
-            except Exception:
-                continue
-    return point_pairs
\ No newline at end of file
+            parsed = _parse_point_line(line)
+            if parsed is not None:
+                point_pairs[parsed[0]] = (parsed[1], parsed[2])
+    return point_pairs
+
+def _parse_point_batch(lines):
+    """向量化解析一批点对行（bytes），返回 (indices, points_a, points_b)"""
+    text = b''.join(lines).replace(b'->', b' ').translate(None, b'PointAB[](),')
+    try:
+        rows = np.loadtxt(io.BytesIO(text), dtype=np.float64, ndmin=2)
+    except ValueError:
+        rows = None
+    if rows is not None and len(rows) == len(lines) and rows.shape[1] == 8:
+        # A[i] (ax, ay, az) -> B[j] (bx, by, bz)
+        return rows[:, 0].astype(np.int64), rows[:, 1:4], rows[:, 5:8]
+    if rows is not None and len(rows) == len(lines) and rows.shape[1] == 7:
+        # A[i] (ax, ay, az) -> B (bx, by, bz)
+        return rows[:, 0].astype(np.int64), rows[:, 1:4], rows[:, 4:7]
+
+    # 格式不符时逐行解析，跳过无法解析的行
+    parsed = [p for p in (_parse_point_line(line.decode(errors='replace')) for line in lines) if p is not None]
+    indices = np.array([p[0] for p in parsed], dtype=np.int64)
+    return indices, np.array([p[1] for p in parsed]).reshape(-1, 3), np.array([p[2] for p in parsed]).reshape(-1, 3)
+
+def stream_points(command, expected=0, batch_lines=65536):
+    """通过 Popen 增量读取 pc_error 输出，按批解析点对到预分配的数组
+
+    只缓存一批文本行，峰值内存与点对数量成正比，而不是与输出文本成正比。
+
+    Args:
+        command: pc_error 命令行
+        expected: 预计的点对数量（通常为 fileA 点数），用于预分配
+        batch_lines: 每批解析的行数
+
+    Returns:
+        (indices, points_a, points_b)，按 A 索引升序的连续数组
+
+    Raises:
+        subprocess.CalledProcessError: pc_error 返回非零
+    """
+    capacity = max(int(expected), 1)
+    indices = np.empty(capacity, dtype=np.int64)
+    points_a = np.empty((capacity, 3), dtype=np.float64)
+    points_b = np.empty((capacity, 3), dtype=np.float64)
+    size = 0
+
+    def flush(lines):
+        nonlocal indices, points_a, points_b, size, capacity
+        batch_indices, batch_a, batch_b = _parse_point_batch(lines)
+        n = len(batch_indices)
+        if size + n > capacity:
+            capacity = max(2 * capacity, size + n)
+            indices = np.resize(indices, capacity)
+            points_a = np.resize(points_a, (capacity, 3))
+            points_b = np.resize(points_b, (capacity, 3))
+        indices[size:size + n] = batch_indices
+        points_a[size:size + n] = batch_a
+        points_b[size:size + n] = batch_b
+        size += n
+
+    with tempfile.TemporaryFile() as stderr:
+        with subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr) as proc:
+            batch = []
+            for line in proc.stdout:
+                if b'Point A[' in line:
+                    batch.append(line)
+                    if len(batch) >= batch_lines:
+                        flush(batch)
+                        batch = []
+            if batch:
+                flush(batch)
+        if proc.returncode != 0:
+            stderr.seek(0)
+            raise subprocess.CalledProcessError(proc.returncode, command, stderr=stderr.read().decode(errors='replace'))
+
+    indices, points_a, points_b = indices[:size], points_a[:size], points_b[:size]
+    if size > 1 and np.any(indices[1:] < indices[:-1]):
+        order = np.argsort(indices, kind='stable')
+        indices, points_a, points_b = indices[order], points_a[order], points_b[order]
+    return indices, points_a, points_b
+
+
+def rss_bytes(field='VmRSS'):
+    """当前进程的常驻内存（字节）；field='VmHWM' 时为峰值（exec 后重新计，不继承父进程的 ru_maxrss）"""
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+class Manifest:
+    """任务清单：JSON lines 文件，每行记录一个已完成的任务及其统计"""
+
+    def __init__(self, path):
+        self.path = path
+        self.done = {}
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        if os.path.exists(path):
+            with open(path, 'rb+') as f:
+                data = f.read()
+                # 中断时可能留下没有换行的不完整最后一行，截掉它，否则之后追加的记录会接在它后面一起损坏
+                complete = data.rfind(b'\n') + 1
+                if complete < len(data):
+                    f.truncate(complete)
+            for line in data[:complete].decode().splitlines():
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                self.done[record['unit']] = record
+
+    def is_done(self, unit):
+        return unit in self.done
+
+    def mark_done(self, unit, stats):
+        record = {'unit': unit, **stats}
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+        self.done[unit] = record
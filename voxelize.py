@@ -0,0 +1,81 @@
+import os
+import hashlib
+import numpy as np
+from temporal import KEY_BITS
+
+
+def quantize(points, voxel_size=1):
+    """量化到体素网格，返回 int32 体素坐标 floor(p / voxel_size)"""
+    points = np.asarray(points)
+    if voxel_size == 1 and points.dtype.kind in 'iu':
+        return points.astype(np.int32)
+    if voxel_size != 1:
+        points = points / voxel_size
+    return np.floor(points).astype(np.int32)
+
+
+def voxelize(points, voxel_size=1):
+    """量化并去重，保留逆映射
+
+    与 ME.TensorField 的默认稀疏化（UNWEIGHTED_AVERAGE）一致：每个体素的特征为落入其中的点的坐标均值。
+    体素按打包键升序排列（即坐标字典序）。特征保持原始坐标单位，voxel_size != 1 时与 coords 的单位不同；
+    训练与推理的网络输入固定使用 voxel_size=1。
+
+    Returns:
+        {'coords': (M, 3) int32 去重后的体素坐标,
+         'feats': (M, 3) float32 每个体素内点坐标的均值,
+         'inverse': (N,) int64 每个原始点所在体素的行号，values[inverse] 即可映射回原始点,
+         'counts': (M,) int32 每个体素内的点数（重复点的重数）}
+    """
+    points = np.asarray(points)
+    coords = quantize(points, voxel_size)
+    if len(coords) == 0:
+        return {'coords': np.zeros((0, 3), dtype=np.int32), 'feats': np.zeros((0, 3), dtype=np.float32),
+                'inverse': np.zeros(0, dtype=np.int64), 'counts': np.zeros(0, dtype=np.int32)}
+
+    low = coords.min(axis=0)
+    shifted = (coords - low).astype(np.int64)
+    if shifted.max() < (1 << KEY_BITS):
+        keys = (shifted[:, 0] << (2 * KEY_BITS)) | (shifted[:, 1] << KEY_BITS) | shifted[:, 2]
+        keys, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        unique = coords[first]
+    else:
+        unique, inverse = np.unique(coords, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1).astype(np.int64)
+
+    counts = np.bincount(inverse, minlength=len(unique))
+    feats = np.stack([np.bincount(inverse, weights=points[:, axis], minlength=len(unique))
+                      for axis in range(3)], axis=1) / counts[:, None]
+    return {'coords': unique.astype(np.int32), 'feats': feats.astype(np.float32), 'inverse': inverse,
+            'counts': counts.astype(np.int32)}
+
+
+def scatter(values, inverse):
+    """将逐体素的结果映射回每个原始点（重复点得到相同的值）"""
+    return np.asarray(values)[inverse]
+
+
+def voxel_path(voxel_dir, block_name):
+    """块 <name>.ply 对应的体素化结果路径 <voxel_dir>/<name>.npz"""
+    return os.path.join(voxel_dir, os.path.splitext(os.path.basename(block_name))[0] + '.npz')
+
+
+def source_digest(points):
+    """输入块坐标的内容摘要（与读取时的坐标类型无关），用于发现块重新切分后过期的体素化结果"""
+    points = np.ascontiguousarray(points, dtype=np.float64)
+    return hashlib.blake2b(points.tobytes(), digest_size=16).hexdigest()
+
+
+def save_voxels(path, voxels, source):
+    """保存体素化结果及其输入块的摘要 source；先写临时文件再替换，读取方不会看到写了一半的结果"""
+    tmp_path = path + '.tmp.npz'
+    np.savez(tmp_path, source=np.array(source), **voxels)
+    os.replace(tmp_path, path)
+
+
+def load_voxels(path):
+    """读取体素化结果，'source' 为输入块摘要（旧文件中没有时为 None）"""
+    with np.load(path) as data:
+        voxels = {key: data[key] for key in ('coords', 'feats', 'inverse', 'counts')}
+        voxels['source'] = str(data['source']) if 'source' in data.files else None
+    return voxels